@@ -28,12 +28,67 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # orjson-backed JSON for jsonify() and request parsing (falls back to the stdlib encoder)
+    try:
+        from eventrift.utils.json_provider import OrjsonProvider
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        pass
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     api.init_app(app)
     jwt.init_app(app)
 
+    # Socket.IO for real-time dashboards; the message queue fans emits out across workers
+    try:
+        from eventrift.extensions import socketio
+        from eventrift.config import SOCKETIO_MESSAGE_QUEUE
+        socketio.init_app(app, message_queue=SOCKETIO_MESSAGE_QUEUE)
+    except ImportError:
+        pass
+
+    # Full-text search: create the SQLite FTS5 table once (Postgres uses events.search_vector)
+    try:
+        from eventrift.utils.event_search import ensure_search_index
+        with app.app_context():
+            ensure_search_index()
+    except ImportError:
+        pass
+
+    # CLI maintenance commands (e.g. `flask rebuild-event-stats`)
+    try:
+        from eventrift.commands import register_commands
+        register_commands(app)
+    except ImportError:
+        pass
+
+    # Queue-mode M-Pesa callbacks: background workers drain the callback outbox
+    try:
+        from eventrift.config import MPESA_CALLBACK_MODE
+        if MPESA_CALLBACK_MODE == 'queue':
+            from eventrift.utils.callback_queue import callback_worker_pool
+            callback_worker_pool.start(app)
+    except ImportError:
+        pass
+
+    # Fails event posters whose upload job was lost (jobs only live in worker memory)
+    try:
+        from eventrift.utils.image_upload_queue import image_upload_queue
+        image_upload_queue.start_sweeper(app)
+    except ImportError:
+        pass
+
+    # Settles payments whose M-Pesa callback never arrived (STK Query)
+    try:
+        from eventrift.config import RECONCILE_ENABLED
+        if RECONCILE_ENABLED:
+            from eventrift.utils.payment_reconciler import payment_reconciler
+            payment_reconciler.start(app)
+    except ImportError:
+        pass
+
     @app.route('/')
     def hello():
         return {'message': 'EventRift Server is running!'}
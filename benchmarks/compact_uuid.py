@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: ticket UUIDs stored as 36-character text versus 16-byte blobs on SQLite.
+
+    python benchmarks/compact_uuid.py [--rows 500000] [--lookups 100000]
+
+Builds two tickets-like tables with a unique index on uuid, then reports the index and file
+sizes and the latency of random point lookups by uuid for each layout.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+
+
+def _build(path, rows, as_bytes):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tickets (id INTEGER PRIMARY KEY, uuid BLOB NOT NULL, event_id INTEGER NOT NULL)")
+    conn.execute("CREATE UNIQUE INDEX ix_tickets_uuid ON tickets (uuid)")
+    values = []
+    for i in range(rows):
+        value = uuid.uuid4()
+        values.append(value)
+        if len(values) == 10000 or i == rows - 1:
+            conn.executemany(
+                "INSERT INTO tickets (uuid, event_id) VALUES (?, ?)",
+                [(v.bytes if as_bytes else str(v), j % 100) for j, v in enumerate(values)]
+            )
+            values = []
+    conn.commit()
+    conn.execute("VACUUM")
+    return conn
+
+
+def _index_bytes(conn):
+    try:
+        return conn.execute("SELECT sum(pgsize) FROM dbstat WHERE name = 'ix_tickets_uuid'").fetchone()[0]
+    except sqlite3.OperationalError: # SQLite built without the dbstat virtual table
+        return None
+
+
+def _lookup_micros(conn, lookups):
+    keys = [row[0] for row in conn.execute("SELECT uuid FROM tickets ORDER BY random() LIMIT ?", (lookups,))]
+    random.shuffle(keys)
+    started = time.perf_counter()
+    for key in keys:
+        conn.execute("SELECT id, event_id FROM tickets WHERE uuid = ?", (key,)).fetchone()
+    return (time.perf_counter() - started) / len(keys) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, as_bytes in (('text', False), ('blob', True)):
+            path = os.path.join(directory, f"{label}.db")
+            conn = _build(path, args.rows, as_bytes)
+            index_bytes = _index_bytes(conn)
+            index = f"{index_bytes / 1e6:.1f} MB" if index_bytes is not None else 'n/a'
+            micros = _lookup_micros(conn, min(args.lookups, args.rows))
+            print(f"{label:<5} {args.rows} rows  index {index}  file {os.path.getsize(path) / 1e6:.1f} MB  lookup {micros:.1f} us")
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: CompiledSchema.dump() against marshmallow's schema.dump() on 10k rows.
+
+    python benchmarks/serializers.py [--rows 10000] [--repeat 5]
+
+Dumps event rows through the shipped events schema, and ticket-shaped rows with nested user,
+event and attendance objects. Checks that both paths produce identical output before timing.
+"""
+import argparse
+import decimal
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The package modules import each other as `app` (see tests/conftest.py)
+import eventrift
+sys.modules['app'] = eventrift
+from app.extensions import db
+eventrift.db = db
+
+from marshmallow import Schema, fields
+from app.schemas.user_schema import UserSchema # noqa: F401 Registers the schema nested by name
+from app.schemas.event_schema import events_schema
+from app.utils.fast_serializers import CompiledSchema
+
+
+class AttendanceRowSchema(Schema):
+    id = fields.Integer()
+    is_checked_in = fields.Boolean()
+    checked_in_at = fields.DateTime()
+
+
+class TicketRowSchema(Schema):
+    id = fields.Integer()
+    status = fields.String()
+    ticket_type = fields.String()
+    created_at = fields.DateTime()
+    qr_code_content = fields.String(attribute='encoded_qr_data')
+    user = fields.Nested('UserSchema', only=('id', 'username', 'email'))
+    event = fields.Nested('EventSchema', only=('id', 'name', 'date_time', 'location'))
+    attendance = fields.Nested(AttendanceRowSchema, allow_none=True)
+
+
+def _event(i, start):
+    return SimpleNamespace(
+        id=i, organizer_id=i % 50, category_id=i % 12 or None, name=f"Event {i}",
+        description='Live music and food in the park', location='Uhuru Gardens, Nairobi',
+        date_time=start + timedelta(hours=i), ticket_price=decimal.Decimal('1500.50'), capacity=500,
+        image_url=None, image_status='READY', is_published=i % 7 != 0, created_at=start, updated_at=start
+    )
+
+
+def _ticket(i, event, user, start):
+    attendance = SimpleNamespace(id=i, is_checked_in=True, checked_in_at=start) if i % 3 == 0 else None
+    return SimpleNamespace(
+        id=i, status='PAID', ticket_type='General Admission', created_at=start,
+        encoded_qr_data=f"v1.k1.{i:032x}.c2lnbmF0dXJl", user=user, event=event, attendance=attendance
+    )
+
+
+def _best_of(repeat, fn, rows):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2026, 11, 6, 19, 30)
+    user = SimpleNamespace(id=1, username='goer', email='goer@example.com', role='Goer')
+    events = [_event(i, start) for i in range(args.rows)]
+    tickets = [_ticket(i, events[i % 100], user, start) for i in range(args.rows)]
+
+    ticket_schema = TicketRowSchema(many=True)
+    for name, schema, rows in (('events', events_schema, events), ('tickets (nested)', ticket_schema, tickets)):
+        compiled = CompiledSchema(schema)
+        assert compiled.dump(rows) == schema.dump(rows), f"{name}: compiled output differs from marshmallow"
+        baseline = _best_of(args.repeat, schema.dump, rows)
+        fast = _best_of(args.repeat, compiled.dump, rows)
+        print(f"{name:<18} {args.rows} rows  marshmallow {baseline:.3f}s  compiled {fast:.3f}s  ({baseline / fast:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
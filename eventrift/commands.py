@@ -0,0 +1,116 @@
+import click
+from flask.cli import with_appcontext
+
+@click.command('rebuild-event-stats')
+@click.option('--event-id', type=int, default=None, help='Rebuild a single event instead of all events.')
+@with_appcontext
+def rebuild_event_stats_command(event_id):
+    """Recomputes the event_stats table from tickets and attendance."""
+    from app.utils.event_stats import rebuild_event_stats
+    rebuild_event_stats(event_id)
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Re-indexes every event for full-text search (after deploying search, or to repair the index)."""
+    from app.utils.event_search import rebuild_search_index
+    click.echo(f"Search index rebuilt for {rebuild_search_index()} events.")
+
+@click.command('migrate-ticket-uuids')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Rows converted per transaction (SQLite only).')
+@click.option('--check', is_flag=True, help='Only report unconverted rows; exits with status 1 if there are any (SQLite only).')
+@with_appcontext
+def migrate_ticket_uuids_command(batch_size, check):
+    """
+    Converts tickets.uuid from 36-character text to native UUID (Postgres) or 16-byte BLOB (SQLite).
+    Required deploy step on SQLite: lookups bind 16-byte values, so rows still stored as text match nothing.
+    """
+    import uuid
+    from sqlalchemy import text
+    from app import db
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        if check:
+            click.echo("--check only applies to SQLite.")
+            return
+        # Rewrites the table and rebuilds the unique index in one statement
+        db.session.execute(text("ALTER TABLE tickets ALTER COLUMN uuid TYPE uuid USING uuid::uuid"))
+        db.session.commit()
+        click.echo("tickets.uuid converted to the native uuid type.")
+        return
+
+    if check:
+        remaining = db.session.execute(text("SELECT count(*) FROM tickets WHERE typeof(uuid) = 'text'")).scalar()
+        click.echo(f"{remaining} ticket uuids still stored as text.")
+        if remaining:
+            raise SystemExit(1)
+        return
+
+    # SQLite stores any value in any column, so the text values are rewritten in place as blobs
+    converted = 0
+    while True:
+        rows = db.session.execute(
+            text("SELECT id, uuid FROM tickets WHERE typeof(uuid) = 'text' LIMIT :limit"),
+            {'limit': batch_size}
+        ).all()
+        if not rows:
+            break
+        db.session.execute(
+            text("UPDATE tickets SET uuid = :value WHERE id = :id"),
+            [{'id': row_id, 'value': uuid.UUID(value).bytes} for row_id, value in rows]
+        )
+        db.session.commit()
+        converted += len(rows)
+    click.echo(f"Converted {converted} ticket uuids to 16-byte binary.")
+
+@click.command('requeue-dead-callbacks')
+@click.option('--id', 'entry_ids', type=int, multiple=True, help='Requeue only these outbox ids (repeatable).')
+@with_appcontext
+def requeue_dead_callbacks_command(entry_ids):
+    """Gives dead-lettered M-Pesa callbacks a fresh set of attempts."""
+    from app.utils.callback_queue import requeue_dead_callbacks
+    click.echo(f"Requeued {requeue_dead_callbacks(list(entry_ids))} callbacks.")
+
+@click.command('replay-dead-checkins')
+@click.argument('event_id', type=int)
+@with_appcontext
+def replay_dead_checkins_command(event_id):
+    """Writes live check-ins and scans that were dead-lettered after repeated flush failures."""
+    from app.utils.live_checkin import replay_dead_letters
+    click.echo(f"Replayed {replay_dead_letters(event_id)} dead-lettered entries.")
+
+@click.command('manifest-public-key')
+def manifest_public_key_command():
+    """Prints the public key gate scanners use to verify check-in manifests."""
+    from app.utils.checkin_manifest import manifest_public_key
+    click.echo(manifest_public_key())
+
+@click.command('reconcile-payments')
+@with_appcontext
+def reconcile_payments_command():
+    """Settles stale pending payments via the Daraja STK Query API (one pass)."""
+    from app.utils.payment_reconciler import payment_reconciler
+    report = payment_reconciler.run_once()
+    click.echo(report if report is not None else "Another reconciliation pass is running on this host.")
+
+@click.command('daraja-stub')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', type=int, default=8089, show_default=True)
+@click.option('--result-code', type=int, default=0, show_default=True, help='Result for every STK Push (0 = paid, 1032 = cancelled).')
+@click.option('--delay', type=float, default=2.0, show_default=True, help='Seconds until a push is final.')
+@click.option('--drop-callbacks', type=float, default=0.0, show_default=True, help='Share of callbacks never sent (0-1).')
+def daraja_stub_command(host, port, result_code, delay, drop_callbacks):
+    """Runs a local Daraja stub (OAuth, STK Push, STK Query). Set MPESA_BASE_URL to its address."""
+    from app.utils.daraja_stub import DarajaStub
+    click.echo(f"Daraja stub listening on http://{host}:{port}")
+    DarajaStub(result_code=result_code, delay=delay, callback_drop_rate=drop_callbacks).serve(host, port, background=False)
+
+def register_commands(app):
+    app.cli.add_command(rebuild_event_stats_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(migrate_ticket_uuids_command)
+    app.cli.add_command(requeue_dead_callbacks_command)
+    app.cli.add_command(replay_dead_checkins_command)
+    app.cli.add_command(manifest_public_key_command)
+    app.cli.add_command(reconcile_payments_command)
+    app.cli.add_command(daraja_stub_command)
@@ -54,4 +54,111 @@ CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
 
 # --- SendGrid Configuration (BE-302) ---
 SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
-SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'no-reply@eventrift.com')
\ No newline at end of file
+SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'no-reply@eventrift.com')
+# --- Response Cache (public read endpoints) ---
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60)) # Seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+# Optional shared backend (e.g. redis://localhost:6379/0) so all gunicorn workers share entries
+RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')
+
+# --- Background Image Uploads (event posters) ---
+# 'cloudinary' in production, 'stub' to store files locally (tests / local development)
+IMAGE_UPLOAD_BACKEND = os.environ.get('IMAGE_UPLOAD_BACKEND', 'cloudinary')
+IMAGE_UPLOAD_WORKERS = int(os.environ.get('IMAGE_UPLOAD_WORKERS', 4))
+IMAGE_UPLOAD_MAX_ATTEMPTS = int(os.environ.get('IMAGE_UPLOAD_MAX_ATTEMPTS', 3))
+IMAGE_UPLOAD_STUB_DIR = os.environ.get('IMAGE_UPLOAD_STUB_DIR', '/tmp/eventrift_uploads')
+# Upload jobs live in worker memory; events still PENDING after this long lost theirs (e.g. a restart)
+IMAGE_UPLOAD_STALE_MINUTES = int(os.environ.get('IMAGE_UPLOAD_STALE_MINUTES', 15))
+IMAGE_UPLOAD_SWEEP_INTERVAL = int(os.environ.get('IMAGE_UPLOAD_SWEEP_INTERVAL', 300)) # Seconds
+
+# --- Bulk Event Import ---
+EVENT_IMPORT_BATCH_SIZE = int(os.environ.get('EVENT_IMPORT_BATCH_SIZE', 500)) # Rows per transaction
+
+# --- Ticket Inventory ---
+# How long tickets stay held while the buyer completes the STK Push prompt
+TICKET_RESERVATION_TTL_SECONDS = int(os.environ.get('TICKET_RESERVATION_TTL_SECONDS', 300))
+
+# --- Offline Check-in Manifests ---
+# Base64 of the 32-byte Ed25519 private key that signs the ticket manifests downloaded by gate
+# scanners. Scanners only get the public key (`flask manifest-public-key`), so a leaked scanner
+# cannot forge manifests. Generate one with:
+#   python -c "import base64, os; print(base64.b64encode(os.urandom(32)).decode())"
+# Left unset (development only), a key is derived from SECRET_KEY.
+MANIFEST_SIGNING_KEY = os.environ.get('MANIFEST_SIGNING_KEY', '')
+
+# --- Signed Ticket QR Codes ---
+# Comma-separated "key_id:secret" pairs. Keep retired keys listed so already-issued codes still verify.
+QR_SIGNING_KEYS = os.environ.get('QR_SIGNING_KEYS', '')
+# Key used to sign new codes (must be one of QR_SIGNING_KEYS; checked at startup)
+QR_SIGNING_ACTIVE_KEY_ID = os.environ.get('QR_SIGNING_ACTIVE_KEY_ID', 'k1')
+# Accept the original unsigned base64(UUID) codes until all issued tickets have been re-rendered
+QR_ACCEPT_LEGACY_CODES = os.environ.get('QR_ACCEPT_LEGACY_CODES', 'true').lower() == 'true'
+
+# --- Live Event Check-in (in-memory hot set with write-behind) ---
+# 'sqlite' shares the hot set between workers on one host; 'memory' keeps it in this process and
+# is only correct with a single worker (each worker would otherwise admit a ticket once)
+LIVE_CHECKIN_STORE = os.environ.get('LIVE_CHECKIN_STORE', 'sqlite')
+LIVE_CHECKIN_DIR = os.environ.get('LIVE_CHECKIN_DIR', '/tmp/eventrift_live_checkin') # Journals and shared store
+LIVE_CHECKIN_FLUSH_INTERVAL = float(os.environ.get('LIVE_CHECKIN_FLUSH_INTERVAL', 1.0)) # Seconds
+LIVE_CHECKIN_FLUSH_BATCH = int(os.environ.get('LIVE_CHECKIN_FLUSH_BATCH', 500))
+# Failed flushes back off exponentially up to this many seconds between attempts
+LIVE_CHECKIN_MAX_BACKOFF = float(os.environ.get('LIVE_CHECKIN_MAX_BACKOFF', 60.0))
+# After this many failed attempts a batch is written entry by entry; entries that still fail are
+# moved to the event's dead-letter file (see `flask replay-dead-checkins`)
+LIVE_CHECKIN_MAX_ATTEMPTS = int(os.environ.get('LIVE_CHECKIN_MAX_ATTEMPTS', 8))
+
+# --- Check-in Scan Log ---
+# Rejected scans are buffered per worker and written by a background thread
+CHECKIN_LOG_FLUSH_INTERVAL = float(os.environ.get('CHECKIN_LOG_FLUSH_INTERVAL', 1.0)) # Seconds
+CHECKIN_LOG_FLUSH_BATCH = int(os.environ.get('CHECKIN_LOG_FLUSH_BATCH', 500))
+# Oldest buffered entries are dropped past this (e.g. while the database is unreachable)
+CHECKIN_LOG_BUFFER_LIMIT = int(os.environ.get('CHECKIN_LOG_BUFFER_LIMIT', 50000))
+
+# --- Real-time Dashboard Updates (Socket.IO) ---
+# Shared queue for Flask-SocketIO emits across workers (e.g. redis://localhost:6379/0)
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+# Minimum time between two broadcasts for the same event
+REALTIME_COALESCE_MS = int(os.environ.get('REALTIME_COALESCE_MS', 500))
+# 'local' (single worker) or 'sqlite' (local stand-in for a message queue shared by workers on one host)
+REALTIME_CHANGE_BUS = os.environ.get('REALTIME_CHANGE_BUS', 'local')
+REALTIME_CHANGE_BUS_PATH = os.environ.get('REALTIME_CHANGE_BUS_PATH', '/tmp/eventrift_realtime.db')
+
+# --- Ticket Rendering (QR PNG/SVG, printable PDF) ---
+TICKET_RENDER_CACHE_DIR = os.environ.get('TICKET_RENDER_CACHE_DIR', '/tmp/eventrift_ticket_renders')
+TICKET_RENDER_CACHE_MAX_BYTES = int(os.environ.get('TICKET_RENDER_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# --- Daraja HTTP Client ---
+DARAJA_CONNECT_TIMEOUT = float(os.environ.get('DARAJA_CONNECT_TIMEOUT', 3.05)) # Seconds
+DARAJA_READ_TIMEOUT = float(os.environ.get('DARAJA_READ_TIMEOUT', 15)) # Seconds
+DARAJA_MAX_RETRIES = int(os.environ.get('DARAJA_MAX_RETRIES', 2)) # Extra attempts after the first
+DARAJA_RETRY_BACKOFF = float(os.environ.get('DARAJA_RETRY_BACKOFF', 0.5)) # Seconds, doubled per retry
+DARAJA_POOL_SIZE = int(os.environ.get('DARAJA_POOL_SIZE', 10)) # Keep-alive connections per worker
+DARAJA_ASYNC_WORKERS = int(os.environ.get('DARAJA_ASYNC_WORKERS', 4))
+
+# --- Daraja OAuth Token Cache ---
+# 'file' shares one token between all workers on a host (with a file lock); 'memory' is per worker
+DARAJA_TOKEN_STORE = os.environ.get('DARAJA_TOKEN_STORE', 'file')
+DARAJA_TOKEN_PATH = os.environ.get('DARAJA_TOKEN_PATH', '/tmp/eventrift_daraja_token.json')
+# Refresh this many seconds before expiry so requests never wait for a new token
+DARAJA_TOKEN_REFRESH_MARGIN = int(os.environ.get('DARAJA_TOKEN_REFRESH_MARGIN', 300))
+
+# --- M-Pesa Callback Ingestion ---
+# 'sync' processes callbacks in the request; 'queue' stores them in an outbox table, answers
+# Safaricom immediately and lets a background worker pool apply them
+MPESA_CALLBACK_MODE = os.environ.get('MPESA_CALLBACK_MODE', 'sync')
+CALLBACK_WORKERS = int(os.environ.get('CALLBACK_WORKERS', 2)) # Threads per gunicorn worker
+CALLBACK_BATCH_SIZE = int(os.environ.get('CALLBACK_BATCH_SIZE', 50))
+CALLBACK_POLL_INTERVAL = float(os.environ.get('CALLBACK_POLL_INTERVAL', 1.0)) # Seconds
+CALLBACK_MAX_ATTEMPTS = int(os.environ.get('CALLBACK_MAX_ATTEMPTS', 8)) # Then dead-lettered
+CALLBACK_RETRY_BACKOFF = float(os.environ.get('CALLBACK_RETRY_BACKOFF', 2.0)) # Seconds, doubled per attempt
+CALLBACK_LEASE_SECONDS = int(os.environ.get('CALLBACK_LEASE_SECONDS', 120)) # Reclaim rows from crashed workers
+
+# --- Pending Payment Reconciliation (STK Query) ---
+RECONCILE_ENABLED = os.environ.get('RECONCILE_ENABLED', 'false').lower() == 'true'
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get('RECONCILE_INTERVAL_SECONDS', 60))
+RECONCILE_AFTER_SECONDS = int(os.environ.get('RECONCILE_AFTER_SECONDS', 120)) # Give the callback this long first
+RECONCILE_GIVE_UP_SECONDS = int(os.environ.get('RECONCILE_GIVE_UP_SECONDS', 24 * 3600)) # Then fail the payment
+RECONCILE_BATCH_SIZE = int(os.environ.get('RECONCILE_BATCH_SIZE', 100)) # Per payment kind and pass
+RECONCILE_CONCURRENCY = int(os.environ.get('RECONCILE_CONCURRENCY', 4))
+RECONCILE_RATE_PER_SECOND = float(os.environ.get('RECONCILE_RATE_PER_SECOND', 5)) # Stay under Daraja's TPS limit
+RECONCILE_LOCK_PATH = os.environ.get('RECONCILE_LOCK_PATH', '/tmp/eventrift_reconcile.lock') # One pass at a time per host
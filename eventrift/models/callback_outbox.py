@@ -0,0 +1,32 @@
+from datetime import datetime
+from app import db # Assuming 'db' is initialized in app/__init__.py
+
+class CallbackOutbox(db.Model):
+    """
+    M-Pesa callbacks accepted but not yet applied (MPESA_CALLBACK_MODE='queue').
+    Rows move PENDING -> PROCESSING -> DONE, or to DEAD after CALLBACK_MAX_ATTEMPTS failures.
+    """
+    __tablename__ = 'mpesa_callback_outbox'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer(), 'sqlite'), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False) # 'ticket' or 'stall'
+    checkout_request_id = db.Column(db.String(50), nullable=True)
+    payload = db.Column(db.Text, nullable=False) # Raw callback body, exactly as received
+
+    status = db.Column(db.String(20), default='PENDING', nullable=False) # PENDING, PROCESSING, DONE, DEAD
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    outcome = db.Column(db.String(20), nullable=True) # finalize_payment result once DONE
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Worker claim query: due rows in arrival order
+        db.Index('ix_mpesa_callback_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<CallbackOutbox {self.id} {self.kind} {self.status}>"
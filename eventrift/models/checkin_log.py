@@ -0,0 +1,47 @@
+from datetime import datetime
+from app import db # Assuming 'db' is initialized in app/__init__.py
+from app.models.types import CompactUUID
+
+class CheckInEvent(db.Model):
+    """
+    Append-only log of every scan at the gate: admissions, duplicates and rejected codes.
+    Rows are never updated; arrival analytics read the per-minute rollups instead.
+    """
+    __tablename__ = 'check_in_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer(), 'sqlite'), primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_check_in_events_event_id'), nullable=True) # NULL when a rejected code names no event
+    ticket_uuid = db.Column(CompactUUID(), nullable=True) # NULL for unreadable or forged codes
+    scanner_user_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_check_in_events_scanner_user_id'), nullable=True)
+    gate_id = db.Column(db.String(50), nullable=True) # Entrance or scanner device
+
+    outcome = db.Column(db.String(20), nullable=False) # CHECKED_IN, DUPLICATE, REJECTED
+    reason = db.Column(db.String(200), nullable=True)
+    scanned_at = db.Column(db.DateTime, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_check_in_events_event_id_scanned_at', 'event_id', 'scanned_at'),
+    )
+
+    def __repr__(self):
+        return f"<CheckInEvent {self.outcome} Event:{self.event_id} Gate:{self.gate_id}>"
+
+class CheckInRollup(db.Model):
+    """
+    Scan counts per event, gate and minute, incremented alongside the log
+    (see utils/checkin_log.py) so arrival curves never scan the raw log.
+    """
+    __tablename__ = 'check_in_rollups'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_check_in_rollups_event_id'), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True) # Minute the scans fall in (UTC)
+    gate_id = db.Column(db.String(50), primary_key=True, default='', server_default='') # '' when the scanner sent none
+
+    checked_in = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    duplicates = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rejected = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    def __repr__(self):
+        return f"<CheckInRollup Event:{self.event_id} {self.bucket_start} Gate:{self.gate_id}>"
@@ -1,11 +1,25 @@
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app.extensions import db # Assuming you initialize SQLAlchemy in app/extensions.py or app/__init__.py
+from app.utils.event_search import index_event, remove_event
+from app.utils.response_cache import response_cache
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        # Supports keyset pagination ordered by (date_time, id)
+        db.Index('ix_events_date_time_id', 'date_time', 'id'),
+        # Listing filters: published date window, per-category and per-organizer pages
+        db.Index('ix_events_is_published_date_time', 'is_published', 'date_time'),
+        db.Index('ix_events_category_id_date_time', 'category_id', 'date_time'),
+        db.Index('ix_events_organizer_id_date_time', 'organizer_id', 'date_time'),
+        # Full-text search (Postgres); SQLite uses the events_fts FTS5 table instead
+        db.Index('ix_events_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     organizer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('event_categories.id'), nullable=True) # See EventCategory.events backref
     
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -15,7 +29,12 @@ class Event(db.Model):
     capacity = db.Column(db.Integer, nullable=False)
     
     image_url = db.Column(db.String(500), nullable=True) # Optional image link
+    image_status = db.Column(db.String(20), default='NONE', server_default='NONE', nullable=False) # NONE, PENDING, READY, FAILED
     is_published = db.Column(db.Boolean, default=False)
+
+    # Weighted name/location/description vector, maintained by save() (see utils/event_search.py)
+    # Deferred so regular listings never load it
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite'), nullable=True))
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -29,8 +48,13 @@ class Event(db.Model):
 
     def save(self):
         db.session.add(self)
+        db.session.flush() # Assigns the id so the search index can reference it
+        index_event(self)
         db.session.commit()
+        response_cache.invalidate('events')
 
     def delete(self):
+        remove_event(self.id)
         db.session.delete(self)
         db.session.commit()
+        response_cache.invalidate('events')
@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db # Assuming 'db' is initialized in app/__init__.py
+
+class EventStats(db.Model):
+    """
+    Pre-aggregated organizer dashboard numbers, one row per event.
+    Maintained incrementally on ticket issuance and check-in (see utils/event_stats.py),
+    so the dashboard never scans tickets or attendance.
+    """
+    __tablename__ = 'event_stats'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_event_stats_event_id'), primary_key=True)
+    tickets_sold = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    checked_in_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    revenue = db.Column(db.Numeric(12, 2), default=0, server_default='0', nullable=False) # KES
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<EventStats Event:{self.event_id} Sold:{self.tickets_sold} CheckedIn:{self.checked_in_count}>"
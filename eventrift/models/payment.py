@@ -0,0 +1,57 @@
+from datetime import datetime
+from app import db # Assuming 'db' is initialized in app/__init__.py
+
+class Payment(db.Model):
+    """Tracks the M-Pesa payment transaction for a ticket purchase."""
+    __tablename__ = 'payments'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Unique reference returned by the STK Push (the callback looks payments up by it)
+    checkout_request_id = db.Column(db.String(50), unique=True, nullable=True)
+    merchant_request_id = db.Column(db.String(50), nullable=True)
+    account_reference = db.Column(db.String(100), nullable=True)
+
+    # What is being bought
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_payments_user_id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_payments_event_id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    # Core payment details
+    amount = db.Column(db.Numeric(10, 2), nullable=False) # KES
+    phone_number = db.Column(db.String(15), nullable=False)
+    status = db.Column(db.String(20), default='PENDING', nullable=False) # PENDING, PAID, FAILED, REFUND_REQUIRED
+
+    # Confirmation details
+    result_code = db.Column(db.Integer, nullable=True)
+    result_desc = db.Column(db.String(255), nullable=True)
+    mpesa_receipt_number = db.Column(db.String(20), unique=True, nullable=True)
+    transaction_date = db.Column(db.DateTime, nullable=True) # Transaction completion time
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Reconciliation: pending payments by age
+        db.Index('ix_payments_status_created_at', 'status', 'created_at'),
+    )
+
+    tickets = db.relationship('Ticket', backref='payment', lazy=True)
+
+    def __repr__(self):
+        return f"<Payment {self.id} - Status: {self.status}>"
+
+class ProcessedCallback(db.Model):
+    """
+    One row per M-Pesa callback that has been applied. Inserted in the same transaction as
+    the payment update, so a retried callback finds the row and is a cheap no-op.
+    """
+    __tablename__ = 'processed_callbacks'
+
+    checkout_request_id = db.Column(db.String(50), primary_key=True)
+    result_code = db.Column(db.Integer, nullable=True)
+    processed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ProcessedCallback {self.checkout_request_id}>"
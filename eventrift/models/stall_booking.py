@@ -14,6 +14,7 @@ class StallType(db.Model):
     price = db.Column(db.Float, nullable=False) # Price per stall in KES
     size = db.Column(db.String(50), nullable=True) # e.g., '3m x 3m'
     description = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # Drives the stall types ETag
     
     # Relationship to StallBooking
     stall_bookings = db.relationship('StallBooking', backref='stall_type', lazy=True)
@@ -2,7 +2,8 @@ from datetime import datetime
 from sqlalchemy.ext.hybrid import hybrid_property
 from app import db # Assuming 'db' is initialized in app/__init__.py
 import uuid
-import base64
+from app.utils.qr_signing import sign_ticket_qr
+from app.models.types import CompactUUID
 
 class Ticket(db.Model):
     """Represents a ticket purchased for an event."""
@@ -10,12 +11,12 @@ class Ticket(db.Model):
 
     # Core Fields
     id = db.Column(db.Integer, primary_key=True)
-    uuid = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    uuid = db.Column(CompactUUID(), unique=True, nullable=False, default=lambda: str(uuid.uuid4())) # 16 bytes on disk, string in Python
     
     # Relationships
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_tickets_user_id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_tickets_event_id'), nullable=False)
-    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id', name='fk_tickets_payment_id'), nullable=False)
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id', name='fk_tickets_payment_id'), nullable=True) # NULL for complimentary tickets
     
     # Ticket Status
     status = db.Column(db.String(20), default='PENDING', nullable=False) # e.g., PENDING, PAID, REFUNDED
@@ -28,21 +29,25 @@ class Ticket(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Ticket wallet: a user's tickets, optionally narrowed to upcoming events
+        db.Index('ix_tickets_user_id_event_id', 'user_id', 'event_id'),
+    )
+
     # Relationships
-    # user = db.relationship("User", backref="tickets") # Assuming a User model exists
-    # event = db.relationship("Event", backref="tickets") # Assuming an Event model exists
+    user = db.relationship("User", backref="tickets")
+    event = db.relationship("Event", backref="tickets")
     attendance = db.relationship("Attendance", uselist=False, backref="ticket", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Ticket {self.uuid} for Event {self.event_id}>"
 
-    # Hybrid property to generate QR data content (e.g., Base64 encoded UUID)
+    # Hybrid property to generate QR data content (HMAC-signed, event-scoped UUID)
     @hybrid_property
     def encoded_qr_data(self):
-        """Generates a secure, base64-encoded string for use in QR codes."""
-        # Use the UUID and optionally a secret key (though standard UUID is usually enough)
-        data_to_encode = f"{self.uuid}"
-        return base64.b64encode(data_to_encode.encode()).decode()
+        """Generates a signed string for use in QR codes (see utils/qr_signing.py)."""
+        # Signed so forged or garbage scans are rejected at the gate without a database lookup
+        return sign_ticket_qr(self.uuid, event_id=self.event_id)
 
     @encoded_qr_data.expression
     def encoded_qr_data(cls):
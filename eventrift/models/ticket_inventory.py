@@ -0,0 +1,49 @@
+from datetime import datetime
+from app import db # Assuming 'db' is initialized in app/__init__.py
+
+class EventInventory(db.Model):
+    """
+    Per-event ticket counters. Updated only with single conditional UPDATE statements
+    (see utils/ticket_inventory.py) so concurrent buyers can never push sold + reserved past
+    Event.capacity.
+    """
+    __tablename__ = 'event_inventory'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_event_inventory_event_id'), primary_key=True)
+    sold = db.Column(db.Integer, default=0, server_default='0', nullable=False) # Tickets issued after payment
+    reserved = db.Column(db.Integer, default=0, server_default='0', nullable=False) # Held during STK Push
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.CheckConstraint('sold >= 0 AND reserved >= 0', name='ck_event_inventory_non_negative'),
+    )
+
+    def __repr__(self):
+        return f"<EventInventory Event:{self.event_id} Sold:{self.sold} Reserved:{self.reserved}>"
+
+class TicketReservation(db.Model):
+    """A short-lived hold on tickets while the buyer completes the M-Pesa prompt."""
+    __tablename__ = 'ticket_reservations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', name='fk_ticket_reservations_event_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', name='fk_ticket_reservations_user_id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    # Links the hold to the STK Push so the callback can confirm or release it
+    checkout_request_id = db.Column(db.String(50), unique=True, nullable=True)
+
+    status = db.Column(db.String(20), default='HELD', nullable=False) # HELD, CONFIRMED, RELEASED, EXPIRED
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Finds expired holds for an event without scanning every reservation
+        db.Index('ix_ticket_reservations_event_status_expires', 'event_id', 'status', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<TicketReservation {self.id} Event:{self.event_id} Qty:{self.quantity} {self.status}>"
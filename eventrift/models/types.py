@@ -0,0 +1,39 @@
+import uuid
+
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+
+class CompactUUID(TypeDecorator):
+    """
+    UUID stored compactly: the native 16-byte uuid type on Postgres and a 16-byte BLOB elsewhere.
+    Python code keeps seeing the canonical lowercase hyphenated string, so URLs, QR payloads
+    and serialized output are unchanged.
+
+    Existing text values must be converted with `flask migrate-ticket-uuids` when deploying this
+    type: on SQLite a text row reads back correctly but never equals the bound 16-byte value.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            parsed = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        except ValueError:
+            # Lookups by a malformed id (e.g. from a URL) simply match nothing
+            return None
+        return str(parsed) if dialect.name == 'postgresql' else parsed.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, memoryview)):
+            return str(uuid.UUID(bytes=bytes(value)))
+        return str(value) # Native uuid, or a SQLite row not yet converted by migrate-ticket-uuids
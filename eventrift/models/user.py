@@ -3,7 +3,7 @@ from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
-    __tablename__ = 'user'
+    __tablename__ = 'users' # Every foreign key references users.id
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -16,8 +16,7 @@ class User(db.Model):
     
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
-    # Relationships (Simplified for base)
-    events_organized = db.relationship('Event', backref='organizer', lazy=True)
+    # Relationships: User.events comes from the Event.organizer backref
     
     @hybrid_property
     def password_hash(self):
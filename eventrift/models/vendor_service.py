@@ -10,7 +10,7 @@ class VendorService(db.Model):
     service_description = db.Column(db.Text, nullable=False)
     service_category = db.Column(db.String(100), nullable=False)
     pricing_model = db.Column(db.String(50), nullable=False)  # 'per_hour', 'fixed', 'per_person'
-    base_price = db.Column(db.Decimal(10, 2), nullable=False)
+    base_price = db.Column(db.Numeric(10, 2), nullable=False)
     availability_status = db.Column(db.String(20), default='Available')  # 'Available', 'Booked', 'Unavailable'
     license_status = db.Column(db.String(20), default='Pending')  # 'Pending', 'Verified', 'Suspended'
     licensing_document_url = db.Column(db.String(500))
@@ -0,0 +1,18 @@
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from app.routes.user_routes import role_required
+from app.utils.response_cache import response_cache
+
+class CacheStatsResource(Resource):
+    @jwt_required()
+    @role_required('Admin')
+    def get(self):
+        """Admin-only: Response cache hit/miss counters for the worker serving this request."""
+        return {
+            'backend': type(response_cache.backend).__name__,
+            'ttl_seconds': response_cache.ttl,
+            'namespaces': response_cache.stats()
+        }, 200
+
+def initialize_cache_routes(api):
+    api.add_resource(CacheStatsResource, '/cache/stats')
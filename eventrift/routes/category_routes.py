@@ -5,8 +5,15 @@ from app.models import db
 from app.schemas.category_schema import category_schema, categories_schema
 from flask_jwt_extended import jwt_required
 from app.routes.user_routes import role_required
+from app.utils.response_cache import cached_response, response_cache
+from app.utils.conditional import conditional_get, aggregate_version
+
+def _categories_version(self):
+    return aggregate_version(EventCategory.query, EventCategory.updated_at)
 
 class CategoryListResource(Resource):
+    @conditional_get(_categories_version)
+    @cached_response('categories')
     def get(self):
         """Public: Get all event categories."""
         categories = EventCategory.query.all()
@@ -24,6 +31,7 @@ class CategoryListResource(Resource):
             new_category = EventCategory(**validated_data)
             db.session.add(new_category)
             db.session.commit()
+            response_cache.invalidate('categories')
             return category_schema.dump(new_category), 201
         except Exception as e:
             db.session.rollback()
@@ -49,6 +57,7 @@ class CategoryResource(Resource):
                 setattr(category, key, value)
             
             db.session.commit()
+            response_cache.invalidate('categories')
             return category_schema.dump(category), 200
         except Exception as e:
             db.session.rollback()
@@ -63,6 +72,7 @@ class CategoryResource(Resource):
         try:
             db.session.delete(category)
             db.session.commit()
+            response_cache.invalidate('categories')
             return {'message': 'Category deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
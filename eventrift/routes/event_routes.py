@@ -1,46 +1,75 @@
 from flask import Blueprint, request
 from flask_restful import Resource, Api
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from marshmallow import ValidationError
 from datetime import datetime
 import json # Used to parse JSON data if sent in a 'data' form field
 from app.extensions import db # Assuming db is initialized here or passed via extensions
 
-from app.schemas.event_schema import event_schema, events_schema
+from app.schemas.event_schema import event_schema, fast_events_schema
 from app.schemas.pagination_schema import pagination_schema
 from app.models.event import Event
+from app.models.event_stats import EventStats
 from app.decorators import requires_roles 
-from app.utils.cloudinary_upload import upload_event_image # <-- Cloudinary Utility
+from app.utils.image_upload_queue import image_upload_queue, IMAGE_STATUS_PENDING # <-- Background Cloudinary uploads
+from app.utils.pagination import keyset_paginate, offset_paginate
+from app.utils.event_filters import published_events, filtered_events
+from app.utils.event_import import import_events, iter_csv_rows, iter_ndjson_rows
+from app.utils.event_search import search_event_ids, RESULT_LIMIT
+from app.utils.response_cache import cached_response
+from app.utils.conditional import conditional_get, aggregate_version
+from app.utils.json_provider import use_fast_json
 
 # Create a Blueprint for event routes
 events_bp = Blueprint('events_bp', __name__)
-api = Api(events_bp)
+api = use_fast_json(Api(events_bp))
+
+def _events_version(self):
+    return aggregate_version(published_events(), Event.updated_at)
 
 class EventListResource(Resource):
     
+    @conditional_get(_events_version)
+    @cached_response('events')
     def get(self):
-        """Public route: List all active events with pagination."""
+        """
+        Public route: List all published events with pagination.
+        Filters: ?from=&to= (ISO 8601), ?category_id=, ?organizer_id=, ?location= (substring match).
+        Offset mode (default): ?page=&per_page=
+        Cursor mode: ?cursor= (empty for the first page) and follow pagination.next_cursor.
+        Use ?total=exact|approximate|none to control how the total item count is computed.
+        """
         
         # 1. Get query parameters with defaults
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 12, type=int) # Default 12 items per page
+        cursor = request.args.get('cursor')
 
         # Ensure per_page is reasonable (e.g., max 50)
         if per_page > 50:
             per_page = 50
 
+        try:
+            query = filtered_events(request.args)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
         # 2. Execute pagination query
-        pagination = Event.query.filter_by(status='Active').paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False # Return empty page instead of 404 if out of bounds
-        )
+        try:
+            if cursor is not None:
+                # Keyset pagination: no OFFSET scan, and no COUNT(*) unless asked for
+                pagination = keyset_paginate(query, Event, per_page, cursor=cursor, total_mode=request.args.get('total', 'none'))
+            else:
+                # Out-of-range pages come back empty instead of 404
+                pagination = offset_paginate(query, Event, page, per_page, total_mode=request.args.get('total', 'exact'))
+        except ValueError as e: # Malformed cursor or unknown ?total=
+            return {'message': str(e)}, 400
 
         events = pagination.items
         
         # 3. Create the serialized response structure
         response_data = {
-            'events': events_schema.dump(events),
+            'events': fast_events_schema.dump(events),
             'pagination': pagination_schema.dump(pagination)
         }
         
@@ -50,7 +79,7 @@ class EventListResource(Resource):
     @jwt_required()
     @requires_roles('Organizer') 
     def post(self):
-        """Creates a new event, handling optional Cloudinary image upload."""
+        """Creates a new event. An optional image is uploaded to Cloudinary in the background."""
         
         current_user_id = get_jwt_identity()
 
@@ -81,18 +110,13 @@ class EventListResource(Resource):
         if not event_data:
             return {'message': 'No event data provided.'}, 400
 
-        # --- 2. Cloudinary Upload (BE-301) ---
-        image_url = None
-        if image_file:
-            # Upload the image and get the secure URL
-            image_url = upload_event_image(image_file)
-            
-            if not image_url:
-                # If upload failed, stop the process and notify the user
-                return {"success": False, "message": "Image upload failed. Check Cloudinary settings or file format."}, 500
+        # --- 2. Read the image (BE-301) ---
+        # The upload itself happens after the event is saved, off the request thread.
+        # The bytes must be read now because the request stream is gone once we respond.
+        image_bytes = image_file.read() if image_file else None
         
-        # Inject the resulting URL into the data for Marshmallow validation
-        event_data['image_url'] = image_url 
+        # image_url is filled in by the upload worker once Cloudinary responds
+        event_data['image_url'] = None 
 
         try:
             # --- 3. Validate and Deserialize (BE-204) ---
@@ -101,8 +125,13 @@ class EventListResource(Resource):
             # --- 4. Create and Save Event ---
             new_event = Event(**validated_data)
             new_event.organizer_id = current_user_id 
+            if image_bytes:
+                new_event.image_status = IMAGE_STATUS_PENDING
             
             new_event.save() 
+
+            if image_bytes:
+                image_upload_queue.enqueue(new_event.id, image_bytes, image_file.filename)
             
             # --- 5. Return Response ---
             result = event_schema.dump(new_event)
@@ -120,5 +149,86 @@ class EventListResource(Resource):
             print(f"Error creating event: {e}")
             return {"success": False, "message": "An unexpected error occurred."}, 500
 
+class EventImportResource(Resource):
+
+    @jwt_required()
+    @requires_roles('Organizer', 'Admin')
+    def post(self):
+        """
+        Bulk-creates events from a streamed CSV (text/csv) or NDJSON (application/x-ndjson) body.
+        Rows are validated with EventSchema; the response reports created ids and per-row errors.
+        Admins may import on behalf of an organizer with ?organizer_id=.
+        """
+        current_user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        organizer_id = current_user_id
+        if claims.get('role') == 'Admin':
+            organizer_id = request.args.get('organizer_id', current_user_id, type=int)
+
+        content_type = request.mimetype
+        if content_type in ('text/csv', 'application/csv'):
+            rows = iter_csv_rows(request.stream)
+        elif content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonlines'):
+            rows = iter_ndjson_rows(request.stream)
+        else:
+            return {'message': 'Send the events as text/csv or application/x-ndjson.'}, 415
+
+        report = import_events(rows, organizer_id)
+        status = 201 if report['created'] else 422
+        return {"success": report['failed'] == 0, **report}, status
+
+class EventStatsResource(Resource):
+
+    @jwt_required()
+    def get(self, event_id):
+        """Organizer (own events) or Admin: tickets sold, checked-in count and revenue for an event."""
+        # One indexed lookup: the event's owner plus its pre-aggregated stats row
+        row = db.session.query(Event.organizer_id, EventStats).outerjoin(
+            EventStats, EventStats.event_id == Event.id
+        ).filter(Event.id == event_id).first()
+
+        if not row:
+            return {'message': 'Event not found.'}, 404
+
+        organizer_id, stats = row
+        if get_jwt().get('role') != 'Admin' and str(organizer_id) != str(get_jwt_identity()):
+            return {'message': 'Only the event organizer can view these stats.'}, 403
+
+        return {
+            'event_id': event_id,
+            'tickets_sold': stats.tickets_sold if stats else 0,
+            'checked_in_count': stats.checked_in_count if stats else 0,
+            'revenue': str(stats.revenue) if stats else '0.00',
+            'updated_at': stats.updated_at.isoformat() if stats and stats.updated_at else None
+        }, 200
+
+class EventSearchResource(Resource):
+
+    def get(self):
+        """Public route: Full-text search over event name, description and location, best match first."""
+        q = request.args.get('q', '').strip()
+        if not q:
+            return {'message': "Query parameter 'q' is required."}, 400
+
+        limit = min(request.args.get('limit', 20, type=int), RESULT_LIMIT)
+
+        ranked = search_event_ids(q, limit=limit)
+        if not ranked:
+            return {'events': [], 'query': q}, 200
+
+        # Fetch the matching rows in one query, then restore the ranked order
+        ids = [event_id for event_id, _ in ranked]
+        events_by_id = {
+            event.id: event
+            for event in published_events().filter(Event.id.in_(ids)).all()
+        }
+        events = [events_by_id[event_id] for event_id in ids if event_id in events_by_id]
+
+        return {'events': fast_events_schema.dump(events), 'query': q}, 200
+
 # Register the resource with the API blueprint
 api.add_resource(EventListResource, '/events')
+api.add_resource(EventImportResource, '/events/import')
+api.add_resource(EventSearchResource, '/events/search')
+api.add_resource(EventStatsResource, '/events/<int:event_id>/stats')
@@ -0,0 +1,38 @@
+from flask import current_app, request
+from flask_jwt_extended import decode_token
+from flask_socketio import join_room, leave_room, emit
+from app.extensions import socketio
+from app.models.event import Event
+from app.utils.realtime import counter_broadcaster, event_room, snapshot_counters
+
+# Socket.IO handlers for organizer dashboards.
+# Client: emit('join_event', {'event_id': 12, 'token': '<JWT>'}), then listen for 'event_counters'.
+
+def _authorized_for_event(token, event_id):
+    try:
+        claims = decode_token(token)
+    except Exception:
+        return False
+    if claims.get('role') == 'Admin':
+        return True
+    event = Event.query.get(event_id)
+    return bool(event) and str(event.organizer_id) == str(claims.get('sub'))
+
+@socketio.on('join_event')
+def handle_join_event(data):
+    data = data or {}
+    event_id = data.get('event_id')
+    if not isinstance(event_id, int) or not _authorized_for_event(data.get('token'), event_id):
+        emit('error', {'message': 'Not allowed to follow this event.'})
+        return
+
+    join_room(event_room(event_id))
+    counter_broadcaster.start(current_app._get_current_object())
+    # Send the current numbers right away so the dashboard does not wait for the next change
+    emit('event_counters', snapshot_counters([event_id])[event_id])
+
+@socketio.on('leave_event')
+def handle_leave_event(data):
+    event_id = (data or {}).get('event_id')
+    if isinstance(event_id, int):
+        leave_room(event_room(event_id))
@@ -3,10 +3,15 @@ from flask_restful import Resource, Api
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db # Database session
 from app.models.stall_booking import StallBooking, StallPayment, StallType
-from app.schemas.stall_schemas import stall_booking_schema, stall_bookings_schema, stall_types_schema
+from app.schemas.stall_schemas import stall_booking_schema, fast_stall_bookings_schema, stall_types_schema
 # Import shared Daraja Utility and Config constants
 from app.utils.daraja_api import mpesa_api
-from app.config import ACCOUNT_REFERENCE 
+from app.config import ACCOUNT_REFERENCE, MPESA_CALLBACK_MODE
+from app.utils.payment_processing import parse_stk_callback, finalize_stall_payment
+from app.utils.callback_queue import accept_queued_callback
+
+from app.utils.conditional import conditional_get, aggregate_version
+from app.utils.json_provider import use_fast_json
 
 from sqlalchemy.orm import joinedload
 from datetime import datetime
@@ -14,7 +19,7 @@ import json
 
 # Create the Blueprint for stall-related routes
 stall_bp = Blueprint('stall_bp', __name__)
-api = Api(stall_bp)
+api = use_fast_json(Api(stall_bp))
 
 class StallBookingListResource(Resource):
     @jwt_required()
@@ -84,8 +89,10 @@ class StallBookingListResource(Resource):
                     "booking_id": new_booking.id
                 }, 202 
             else:
-                # If STK Push fails immediately, mark payment/booking as failed and rollback
-                db.session.rollback() 
+                # If STK Push fails immediately, mark payment/booking as failed (both are already committed)
+                new_payment.status = 'FAILED'
+                new_booking.status = 'CANCELLED'
+                db.session.commit()
                 return {
                     "success": False, 
                     "message": f"Payment initiation failed: {daraja_result['message']}",
@@ -106,73 +113,39 @@ class StallBookingListResource(Resource):
             joinedload(StallBooking.payment),
             joinedload(StallBooking.stall_type)
         ).all()
-        return jsonify(stall_bookings_schema.dump(bookings)), 200
+        return jsonify(fast_stall_bookings_schema.dump(bookings)), 200
 
 class StallBookingCallbackResource(Resource):
     def post(self):
         """2. Receives the M-Pesa payment confirmation and finalizes the booking."""
+        if MPESA_CALLBACK_MODE == 'queue':
+            return accept_queued_callback('stall')
+
         try:
             callback_data = request.get_json()
             
-            # Extract STK callback data safely
-            stk_callback = callback_data.get('Body', {}).get('stkCallback', {})
-            result_code = stk_callback.get('ResultCode')
-            checkout_request_id = stk_callback.get('CheckoutRequestID')
-            
-            # 1. Find the PENDING payment record using the unique CheckoutRequestID
-            payment_record = StallPayment.query.filter_by(checkout_request_id=checkout_request_id).first()
-            if not payment_record:
-                print(f"ERROR: Callback received for unknown Stall CheckoutRequestID: {checkout_request_id}")
+            # Idempotent: retried callbacks for an already processed payment are no-ops
+            result = parse_stk_callback(callback_data)
+            outcome = finalize_stall_payment(result)
+            if outcome == 'unknown':
+                print(f"ERROR: Callback received for unknown Stall CheckoutRequestID: {result['checkout_request_id']}")
                 return {"ResultCode": 1, "ResultDesc": "Invalid reference"}, 200
-            
-            booking_record = payment_record.booking
-            
-            if result_code == 0:
-                # SUCCESSFUL PAYMENT
-                callback_metadata = stk_callback.get('CallbackMetadata', {}).get('Item', [])
-                
-                def find_item(name):
-                    return next((item['Value'] for item in callback_metadata if item.get('Name') == name), None)
-                
-                mpesa_receipt_number = find_item('MpesaReceiptNumber')
-                transaction_date_str = find_item('TransactionDate')
-                
-                # --- Finalize Booking ---
-                try:
-                    # Update Payment Status
-                    payment_record.status = 'PAID'
-                    payment_record.mpesa_receipt_number = mpesa_receipt_number
-                    
-                    # Convert Daraja timestamp (YYYYMMDDHHMMSS) to datetime object
-                    if transaction_date_str:
-                        payment_record.transaction_date = datetime.strptime(transaction_date_str, '%Y%m%d%H%M%S')
-                    
-                    # Update Booking Status
-                    booking_record.status = 'CONFIRMED'
-                    
-                    db.session.commit()
-                    print(f"Stall Booking {booking_record.id} CONFIRMED. Receipt: {mpesa_receipt_number}")
-                    
-                except Exception as e:
-                    db.session.rollback()
-                    print(f"FATAL DB ERROR: Failed to finalize booking {booking_record.id} after success: {e}")
-
-            else:
-                # FAILED or CANCELLED TRANSACTION
-                payment_record.status = 'FAILED'
-                booking_record.status = 'CANCELLED' 
-                db.session.commit()
-                print(f"Transaction FAILED for booking {booking_record.id}. Code: {result_code}")
+            print(f"Stall callback for CheckoutRequestID {result['checkout_request_id']}: {outcome} (code {result['result_code']})")
                 
             # Safaricom expects a simple 200 OK response
             return {"ResultCode": 0, "ResultDesc": "Callback received and processed."}, 200
 
         except Exception as e:
+            db.session.rollback()
             print(f"Error processing Stall M-Pesa callback: {e}")
             return {"ResultCode": 1, "ResultDesc": "Internal Server Error during processing"}, 200
 
 # Route for fetching available stall types for an event
+def _stall_types_version(self, event_id):
+    return aggregate_version(StallType.query, StallType.updated_at)
+
 class StallTypeResource(Resource):
+    @conditional_get(_stall_types_version)
     def get(self, event_id):
         """Fetches all available stall types for a specific event."""
         # NOTE: In a real app, you would filter stall types by event_id, but here we return all types for now
@@ -1,9 +1,26 @@
 from flask import Blueprint, request, jsonify
 from flask_restful import Resource, Api
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app import db # Assuming db is available
 from app.models.ticket_attendance import Ticket, Attendance
-from app.schemas.ticket_schemas import tickets_schema, ticket_schema
+from app.models.event import Event
+from app.schemas.ticket_schemas import fast_tickets_schema, ticket_schema
+from app.schemas.pagination_schema import pagination_schema
+from app.utils.conditional import conditional_get
+from app.utils.event_stats import record_check_ins, record_tickets_sold
+from app.utils.json_provider import use_fast_json
+from app.utils.checkin_manifest import build_manifest, apply_offline_checkins
+from app.utils.checkin_service import decode_qr_data, check_in_batch
+from app.utils.live_checkin import open_gate, close_gate, get_gate
+from app.utils.ticket_render import render_ticket, render_response, RenderingUnavailable, CONTENT_TYPES
+from app.utils.ticket_issuance import issue_tickets, COMP_TICKET_TYPE
+from app.utils.checkin_log import (
+    record_scans, record_rejected_scans, scan_entry, arrival_histogram, HISTOGRAM_BUCKET_MINUTES,
+    OUTCOME_CHECKED_IN, OUTCOME_DUPLICATE, OUTCOME_REJECTED
+)
+from app.utils.ticket_inventory import allocate_tickets, SoldOutError
+from app.utils.ticket_wallet import wallet_query, wallet_version
+from app.models.user import User
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 
@@ -12,22 +29,34 @@ from datetime import datetime
 # from app.models.event_models import Event 
 
 ticket_bp = Blueprint('ticket_bp', __name__)
-api = Api(ticket_bp)
+api = use_fast_json(Api(ticket_bp))
+
+def _upcoming_only():
+    return request.args.get('upcoming', '').lower() in ('1', 'true', 'yes')
+
+def _user_tickets_version(self):
+    return (get_jwt_identity(),) + wallet_version(get_jwt_identity(), upcoming=_upcoming_only())
 
 class UserTicketListResource(Resource):
     @jwt_required()
+    @conditional_get(_user_tickets_version)
     def get(self):
-        """(Goer) Retrieves all tickets belonging to the authenticated user."""
+        """
+        (Goer) Retrieves the authenticated user's tickets, newest first, with pagination.
+        Query parameters: ?page=&per_page= (max 50), ?upcoming=true for tickets to events not yet started.
+        """
         current_user_id = get_jwt_identity()
-        
-        # Eager load relationships to prevent N+1 queries
-        tickets = Ticket.query.filter_by(user_id=current_user_id).options(
-            joinedload(Ticket.attendance)
-            # joinedload(Ticket.event), # Load event data
-            # joinedload(Ticket.user)   # Load user data
-        ).all()
-        
-        return jsonify(tickets_schema.dump(tickets)), 200
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 20, type=int), 50)
+
+        pagination = wallet_query(current_user_id, upcoming=_upcoming_only()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return {
+            'tickets': fast_tickets_schema.dump(pagination.items),
+            'pagination': pagination_schema.dump(pagination)
+        }, 200
 
 class TicketDetailResource(Resource):
     @jwt_required()
@@ -44,37 +73,111 @@ class TicketDetailResource(Resource):
         return jsonify(ticket_schema.dump(ticket)), 200
 
 
+class TicketRenderResource(Resource):
+    @jwt_required()
+    def get(self, uuid, fmt):
+        """
+        (Goer) Renders the ticket's QR code as PNG or SVG, or a printable PDF ticket.
+        Rendered files are cached on disk by content hash. The hash is the ETag: clients may store
+        the response but must revalidate it, since the same URL serves new content when it changes.
+        """
+        fmt = fmt.lower()
+        if fmt not in CONTENT_TYPES:
+            return {"message": f"Unsupported format. Use one of: {', '.join(CONTENT_TYPES)}."}, 400
+
+        ticket = Ticket.query.options(joinedload(Ticket.event)).filter_by(uuid=uuid, user_id=get_jwt_identity()).first()
+        if not ticket:
+            return {"message": "Ticket not found or access denied."}, 404
+
+        details = None
+        if fmt == 'pdf':
+            event = ticket.event
+            details = [
+                ('Event', event.name),
+                ('Date', event.date_time.strftime('%a %d %b %Y, %H:%M')),
+                ('Location', event.location),
+                ('Type', ticket.ticket_type),
+                ('Ticket', ticket.uuid),
+            ]
+
+        try:
+            data, content_hash = render_ticket(ticket.uuid, ticket.encoded_qr_data, fmt, details)
+        except RenderingUnavailable as e:
+            return {"message": str(e)}, 501
+
+        filename = f"ticket-{ticket.uuid}.pdf" if fmt == 'pdf' else None
+        return render_response(data, content_hash, fmt, filename)
+
+
+# Answers for scans resolved from a live gate's hot set ('unknown' falls back to the database)
+LIVE_SCAN_RESPONSES = {
+    'checked_in': ({"message": "Check-in successful!", "mode": "live"}, 200),
+    'duplicate': ({"message": "Ticket already checked in.", "mode": "live"}, 400),
+    'not_paid': ({"message": "Ticket is not paid. Cannot check in.", "mode": "live"}, 400),
+}
+
+
+def _optional_int(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
 class CheckInResource(Resource):
     # This route is protected and restricted to Organizer/Staff roles
     @jwt_required()
     def post(self):
         """
         (Organizer/Staff) Checks in a ticket using its QR code content (UUID).
-        Input payload: {"qr_data": "base64_encoded_uuid"}
+        Input payload: {"qr_data": "signed_qr_content", "event_id": 12 (optional, rejects other events' tickets),
+                        "gate_id": "north-1" (optional, for arrival analytics)}
         """
         current_user_id = get_jwt_identity()
         # NOTE: Implement proper RBAC here (e.g., check if current_user_id has role 'Organizer' or 'Staff')
         
         data = request.get_json()
-        qr_data = data.get('qr_data') # This is the Base64 encoded UUID from the frontend
+        qr_data = data.get('qr_data') # Signed QR content (legacy Base64 encoded UUIDs still accepted)
         
         if not qr_data:
             return {"message": "QR data is required."}, 400
 
-        try:
-            # Decode the base64 QR data back to the original UUID string
-            ticket_uuid = base64.b64decode(qr_data.encode()).decode()
-        except Exception:
-            return {"message": "Invalid QR code format."}, 400
+        event_id = _optional_int(data.get('event_id'))
+        gate_id = data.get('gate_id')
+
+        # Verify the signature before touching the database; forged codes stop here
+        ticket_uuid, error = decode_qr_data(qr_data, event_id=event_id)
+        if not ticket_uuid:
+            record_rejected_scans([error], current_user_id, event_id=event_id, gate_id=gate_id)
+            return {"message": error}, 400
+
+        # Live-event mode: answer from the hot set, Attendance is written behind in batches
+        gate = get_gate(event_id)
+        if gate:
+            outcome = gate.scan(ticket_uuid, current_user_id, gate_id)
+            if outcome in LIVE_SCAN_RESPONSES:
+                body, status = LIVE_SCAN_RESPONSES[outcome]
+                return {**body, "ticket_uuid": ticket_uuid}, status
         
         # 1. Find the ticket using the decoded UUID
         ticket = Ticket.query.options(joinedload(Ticket.attendance)).filter_by(uuid=ticket_uuid).first()
+        scanned_at = datetime.utcnow()
 
-        if not ticket:
+        def log_scan(outcome, reason=None):
+            record_scans([scan_entry(
+                event_id if event_id is not None else (ticket.event_id if ticket else None), ticket_uuid, outcome,
+                scanned_at, gate_id, current_user_id, reason
+            )])
+
+        if not ticket or (event_id is not None and ticket.event_id != event_id):
+            log_scan(OUTCOME_REJECTED, 'Ticket not found.')
+            db.session.commit()
             return {"message": "Invalid ticket or ticket not found."}, 404
             
         # 2. Check ticket status (must be PAID)
         if ticket.status != 'PAID':
+            log_scan(OUTCOME_REJECTED, f"Ticket status is '{ticket.status}'.")
+            db.session.commit()
             return {"message": f"Ticket status is '{ticket.status}'. Cannot check in."}, 400
 
         # 3. Check attendance status
@@ -86,15 +189,21 @@ class CheckInResource(Resource):
             db.session.commit()
             
         if attendance.is_checked_in:
+            log_scan(OUTCOME_DUPLICATE)
+            db.session.commit()
             return {"message": f"Ticket already checked in at {attendance.checked_in_at.strftime('%Y-%m-%d %H:%M:%S')}."}, 400
             
         # 4. Perform check-in (BE-403)
         attendance.is_checked_in = True
-        attendance.checked_in_at = datetime.utcnow()
+        attendance.checked_in_at = scanned_at
         attendance.checked_in_by_user_id = current_user_id
         
         try:
+            record_check_ins(ticket.event_id)
+            log_scan(OUTCOME_CHECKED_IN)
             db.session.commit()
+            if gate:
+                gate.store.remember(ticket.uuid) # Sold after gate open; later rescans hit the hot set
             return {"message": "Check-in successful!", "ticket": ticket_schema.dump(ticket)}, 200
         except Exception as e:
             db.session.rollback()
@@ -102,7 +211,208 @@ class CheckInResource(Resource):
             return {"message": "An error occurred during check-in."}, 500
 
 
+class BatchCheckInResource(Resource):
+    MAX_BATCH_SIZE = 200
+
+    @jwt_required()
+    def post(self):
+        """
+        (Organizer/Staff) Checks in several queued scans at once.
+        Input payload: {"qr_data": ["signed_qr_content", ...], "event_id": 12 (optional), "gate_id": "north-1" (optional)}
+        Returns one result per QR payload, in the submitted order.
+        """
+        current_user_id = get_jwt_identity()
+
+        data = request.get_json() or {}
+        qr_payloads = data.get('qr_data')
+        if not isinstance(qr_payloads, list) or not qr_payloads:
+            return {"message": "A non-empty 'qr_data' list is required."}, 400
+        if len(qr_payloads) > self.MAX_BATCH_SIZE:
+            return {"message": f"At most {self.MAX_BATCH_SIZE} scans per batch."}, 400
+
+        event_id = _optional_int(data.get('event_id'))
+        gate_id = data.get('gate_id')
+        scanned_at = datetime.utcnow()
+
+        # Codes failing signature/expiry/event checks are answered without a database lookup
+        results = [None] * len(qr_payloads)
+        valid_indexes, scans = [], []
+        gate = get_gate(event_id)
+        for i, qr in enumerate(qr_payloads):
+            ticket_uuid, error = decode_qr_data(qr, event_id=event_id)
+            if not ticket_uuid:
+                results[i] = {'ticket_uuid': None, 'status': 'rejected', 'reason': error}
+                continue
+            if gate:
+                outcome = gate.scan(ticket_uuid, current_user_id, gate_id)
+                if outcome in LIVE_SCAN_RESPONSES:
+                    status = 'rejected' if outcome == 'not_paid' else outcome
+                    results[i] = {'ticket_uuid': ticket_uuid, 'status': status, 'mode': 'live'}
+                    continue
+            valid_indexes.append(i)
+            scans.append((ticket_uuid, scanned_at))
+
+        rejections = [result['reason'] for result in results if result and result['status'] == 'rejected' and 'mode' not in result]
+        if rejections:
+            record_rejected_scans(rejections, current_user_id, event_id=event_id, gate_id=gate_id)
+
+        if scans:
+            try:
+                batch_results = check_in_batch(scans, current_user_id, event_id=event_id, gate_id=gate_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Batch check-in failed: {e}")
+                return {"message": "An error occurred during check-in."}, 500
+            for i, result in zip(valid_indexes, batch_results):
+                results[i] = result
+
+        for qr, result in zip(qr_payloads, results):
+            result['qr_data'] = qr
+        return {"results": results}, 200
+
+
+def _can_manage_event(event_id):
+    """Admins manage every event; organizers only their own."""
+    if get_jwt().get('role') == 'Admin':
+        return True
+    event = Event.query.get(event_id)
+    return bool(event) and str(event.organizer_id) == str(get_jwt_identity())
+
+
+class CheckInManifestResource(Resource):
+    @jwt_required()
+    def get(self, event_id):
+        """
+        (Organizer/Admin) Exports a signed ticket manifest so gate scanners can validate
+        tickets and detect duplicate entries while offline.
+        """
+        if not _can_manage_event(event_id):
+            return {"message": "Only the event organizer can export its manifest."}, 403
+
+        return build_manifest(event_id), 200
+
+
+class CompTicketResource(Resource):
+    MAX_QUANTITY = 1000
+
+    @jwt_required()
+    def post(self, event_id):
+        """
+        (Organizer/Admin) Issues complimentary tickets to a user, taken from the event's capacity.
+        Input payload: {"user_id": 7, "quantity": 20, "ticket_type": "Complimentary" (optional)}
+        """
+        if not _can_manage_event(event_id):
+            return {"message": "Event not found or access denied."}, 403
+
+        data = request.get_json() or {}
+        user_id = _optional_int(data.get('user_id'))
+        quantity = _optional_int(data.get('quantity'))
+        if not user_id or not quantity or not 1 <= quantity <= self.MAX_QUANTITY:
+            return {"message": f"'user_id' and a 'quantity' between 1 and {self.MAX_QUANTITY} are required."}, 400
+        if not db.session.get(User, user_id):
+            return {"message": "User not found."}, 404
+
+        try:
+            allocate_tickets(event_id, quantity)
+            ticket_uuids = issue_tickets(
+                user_id, event_id, quantity,
+                ticket_type=data.get('ticket_type') or COMP_TICKET_TYPE
+            )
+            record_tickets_sold(event_id, quantity) # Complimentary: no revenue
+            db.session.commit()
+        except SoldOutError:
+            db.session.rollback()
+            return {"message": "Not enough tickets left for this event."}, 409
+        except Exception as e:
+            db.session.rollback()
+            print(f"Complimentary ticket issuance failed: {e}")
+            return {"message": "An error occurred while issuing tickets."}, 500
+
+        return {"message": f"Issued {quantity} complimentary tickets.", "ticket_uuids": ticket_uuids}, 201
+
+
+class LiveGateResource(Resource):
+    @jwt_required()
+    def post(self, event_id):
+        """
+        (Organizer/Admin) Opens the gate in live mode: loads the event's tickets into the
+        in-memory hot set and starts write-behind of check-ins to Attendance.
+        """
+        if not _can_manage_event(event_id):
+            return {"message": "Only the event organizer can open the gate."}, 403
+
+        gate, replayed = open_gate(event_id)
+        return {"message": "Live check-in mode enabled.", "event_id": event_id, "replayed_check_ins": replayed}, 200
+
+    @jwt_required()
+    def delete(self, event_id):
+        """(Organizer/Admin) Flushes pending check-ins and leaves live mode."""
+        if not _can_manage_event(event_id):
+            return {"message": "Only the event organizer can close the gate."}, 403
+
+        if not close_gate(event_id):
+            return {"message": "Live check-in mode is not enabled for this event on this server."}, 404
+        return {"message": "Live check-in mode disabled.", "event_id": event_id}, 200
+
+
+class OfflineCheckInSyncResource(Resource):
+    @jwt_required()
+    def post(self, event_id):
+        """
+        (Organizer/Staff) Uploads check-ins a scanner recorded while offline.
+        Input payload: {"device_id": "gate-3", "checkins": [{"ticket_uuid": "...", "scanned_at": "ISO 8601"}]}
+        """
+        if not _can_manage_event(event_id):
+            return {"message": "Only the event organizer can sync check-ins."}, 403
+
+        data = request.get_json() or {}
+        scans = data.get('checkins')
+        if not isinstance(scans, list) or not scans:
+            return {"message": "A non-empty 'checkins' list is required."}, 400
+
+        try:
+            results = apply_offline_checkins(event_id, scans, get_jwt_identity(), gate_id=data.get('device_id'))
+        except Exception as e:
+            db.session.rollback()
+            print(f"Offline check-in sync failed for event {event_id} (device {data.get('device_id')}): {e}")
+            return {"message": "An error occurred while syncing check-ins."}, 500
+
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        return {"device_id": data.get('device_id'), "summary": summary, "results": results}, 200
+
+
+class ArrivalHistogramResource(Resource):
+    @jwt_required()
+    def get(self, event_id):
+        """
+        (Organizer/Admin) Arrival curve and per-gate throughput, from pre-aggregated per-minute rollups.
+        Query params: bucket (minutes: 1, 5, 15 or 60), gate_id, from / to (ISO 8601, UTC).
+        """
+        if not _can_manage_event(event_id):
+            return {"message": "Only the event organizer can view arrival analytics."}, 403
+
+        bucket_minutes = request.args.get('bucket', default=1, type=int)
+        if bucket_minutes not in HISTOGRAM_BUCKET_MINUTES:
+            return {"message": f"'bucket' must be one of {', '.join(map(str, HISTOGRAM_BUCKET_MINUTES))}."}, 400
+        try:
+            since = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+            until = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError:
+            return {"message": "'from' and 'to' must be ISO 8601 datetimes."}, 400
+
+        return arrival_histogram(event_id, bucket_minutes, gate_id=request.args.get('gate_id'), since=since, until=until), 200
+
+
 # Register the resources with the API blueprint
 api.add_resource(UserTicketListResource, '/user')
 api.add_resource(TicketDetailResource, '/<string:uuid>')
+api.add_resource(TicketRenderResource, '/<string:uuid>/render/<string:fmt>')
 api.add_resource(CheckInResource, '/checkin')
+api.add_resource(BatchCheckInResource, '/checkin/batch')
+api.add_resource(CheckInManifestResource, '/events/<int:event_id>/manifest')
+api.add_resource(CompTicketResource, '/events/<int:event_id>/comp')
+api.add_resource(LiveGateResource, '/events/<int:event_id>/live')
+api.add_resource(OfflineCheckInSyncResource, '/events/<int:event_id>/checkins/sync')
+api.add_resource(ArrivalHistogramResource, '/events/<int:event_id>/arrivals')
@@ -1,9 +1,11 @@
 from marshmallow import Schema, fields, validate, post_load
 from app.models.event import Event
+from app.utils.fast_serializers import CompiledSchema
 
 class EventSchema(Schema):
     id = fields.Int(dump_only=True)
     organizer_id = fields.Int(dump_only=True) # Organizer ID is set on the backend from auth token
+    category_id = fields.Int(allow_none=True, required=False)
     
     name = fields.Str(required=True, validate=validate.Length(min=3, max=100))
     description = fields.Str(required=True, validate=validate.Length(min=10))
@@ -25,6 +27,7 @@ class EventSchema(Schema):
     )
     
     image_url = fields.Url(allow_none=True, required=False)
+    image_status = fields.Str(dump_only=True) # PENDING until the background upload finishes
     is_published = fields.Bool(dump_only=True)
     
     created_at = fields.DateTime(dump_only=True)
@@ -35,7 +38,18 @@ class EventSchema(Schema):
         """Turn validated data into an Event model instance."""
         return Event(**data)
 
+class EventImportSchema(EventSchema):
+    """Same validation as EventSchema, but rows stay plain dicts so they can be inserted in bulk."""
+
+    @post_load
+    def make_event(self, data, **kwargs):
+        return data
+
 # Instance for single event serialization/deserialization
 event_schema = EventSchema()
 # Instance for list of events serialization
 events_schema = EventSchema(many=True)
+# Precompiled dump path for list endpoints (same output as events_schema.dump)
+fast_events_schema = CompiledSchema(events_schema)
+# Instance for bulk import rows
+event_import_schema = EventImportSchema()
@@ -7,5 +7,7 @@ class PaginationSchema(Schema):
     current_page = fields.Int(attribute='page', dump_only=True)
     has_next = fields.Bool(dump_only=True)
     has_prev = fields.Bool(dump_only=True)
+    # Only present for cursor (keyset) pagination; pass it back as ?cursor= to get the next page
+    next_cursor = fields.Str(dump_only=True, allow_none=True)
 
 pagination_schema = PaginationSchema()
\ No newline at end of file
@@ -3,6 +3,7 @@ from app.models.stall_booking import StallType, StallPayment, StallBooking
 # Assuming 'ma' (Marshmallow) and 'db' are initialized in app/__init__.py
 from app import ma 
 from app import db 
+from app.utils.fast_serializers import CompiledSchema
 
 class StallTypeSchema(ma.SQLAlchemyAutoSchema):
     """Schema for serializing StallType details."""
@@ -44,3 +45,5 @@ stall_type_schema = StallTypeSchema()
 stall_types_schema = StallTypeSchema(many=True)
 stall_booking_schema = StallBookingSchema()
 stall_bookings_schema = StallBookingSchema(many=True)
+# Precompiled dump path for list endpoints (same output as stall_bookings_schema.dump)
+fast_stall_bookings_schema = CompiledSchema(stall_bookings_schema)
@@ -1,6 +1,10 @@
 from marshmallow import fields, Schema
 from app.models.ticket_attendance import Ticket, Attendance # Assuming models are importable
 from app import ma # Assuming 'ma' (Marshmallow) is initialized in app/__init__.py
+from app.utils.fast_serializers import CompiledSchema
+# Registers the schemas referenced by name in the Nested fields below
+from app.schemas.user_schema import UserSchema
+from app.schemas.event_schema import EventSchema
 
 class AttendanceSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -26,7 +30,7 @@ class TicketSchema(ma.SQLAlchemyAutoSchema):
 
     # Relationships (Assuming you have UserSchema and EventSchema defined elsewhere)
     user = fields.Nested('UserSchema', only=('id', 'username', 'email')) 
-    event = fields.Nested('EventSchema', only=('id', 'name', 'start_date'))
+    event = fields.Nested('EventSchema', only=('id', 'name', 'date_time', 'location'))
     
     # Include attendance status details
     attendance = fields.Nested(AttendanceSchema, required=False)
@@ -34,4 +38,6 @@ class TicketSchema(ma.SQLAlchemyAutoSchema):
 # Instantiations
 ticket_schema = TicketSchema()
 tickets_schema = TicketSchema(many=True)
+# Precompiled dump path for list endpoints (same output as tickets_schema.dump)
+fast_tickets_schema = CompiledSchema(tickets_schema)
 attendance_schema = AttendanceSchema()
@@ -0,0 +1,10 @@
+from marshmallow import Schema, fields
+
+class UserSchema(Schema):
+    """Public user fields, used for nested user data (e.g. on tickets)."""
+    id = fields.Int(dump_only=True)
+    username = fields.Str(dump_only=True)
+    email = fields.Email(dump_only=True)
+    role = fields.Str(dump_only=True)
+
+user_schema = UserSchema()
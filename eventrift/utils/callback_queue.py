@@ -0,0 +1,217 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from flask import request
+from sqlalchemy import select, update, insert, or_, and_
+from app import db
+from app.config import (
+    CALLBACK_WORKERS, CALLBACK_BATCH_SIZE, CALLBACK_POLL_INTERVAL, CALLBACK_MAX_ATTEMPTS,
+    CALLBACK_RETRY_BACKOFF, CALLBACK_LEASE_SECONDS
+)
+from app.models.callback_outbox import CallbackOutbox
+from app.utils.payment_processing import parse_stk_callback, finalize_payment, finalize_stall_payment
+
+# Queue mode for M-Pesa callbacks: the HTTP handler only validates the body and appends it to
+# mpesa_callback_outbox (one INSERT + commit), then acknowledges Safaricom. Worker threads claim
+# due rows in batches, apply them with the same idempotent finalize functions as sync mode, and
+# retry failures with exponential backoff until they are dead-lettered.
+
+PROCESSORS = {
+    'ticket': finalize_payment,
+    'stall': finalize_stall_payment,
+}
+
+
+class RetryableCallbackError(Exception):
+    """The callback could not be applied yet (e.g. it arrived before its payment was saved)."""
+
+
+def validate_callback(callback_data):
+    """Returns the CheckoutRequestID of a well-formed STK callback, or raises ValueError."""
+    stk_callback = callback_data.get('Body', {}).get('stkCallback') if isinstance(callback_data, dict) else None
+    if not isinstance(stk_callback, dict):
+        raise ValueError("Missing Body.stkCallback.")
+    checkout_request_id = stk_callback.get('CheckoutRequestID')
+    if not isinstance(checkout_request_id, str) or not checkout_request_id or len(checkout_request_id) > 50:
+        raise ValueError("Missing or invalid CheckoutRequestID.")
+    if not isinstance(stk_callback.get('ResultCode'), int):
+        raise ValueError("Missing or invalid ResultCode.")
+    return checkout_request_id
+
+
+def enqueue_callback(kind, raw_body, checkout_request_id):
+    """Durably stores a callback for the workers. Commits before the caller acknowledges Safaricom."""
+    now = datetime.utcnow()
+    db.session.execute(insert(CallbackOutbox).values(
+        kind=kind, checkout_request_id=checkout_request_id, payload=raw_body,
+        status='PENDING', attempts=0, next_attempt_at=now, created_at=now
+    ))
+    db.session.commit()
+    callback_worker_pool.wake()
+
+
+def accept_queued_callback(kind):
+    """
+    Queue mode: validates the callback, stores it in the outbox and acknowledges Safaricom
+    straight away; CallbackWorkerPool applies it later. Returns the (body, status) response.
+    """
+    raw_body = request.get_data(as_text=True)
+    try:
+        checkout_request_id = validate_callback(json.loads(raw_body))
+    except ValueError as e: # json.JSONDecodeError is a ValueError
+        print(f"Rejected malformed {kind} M-Pesa callback: {e}")
+        return {"ResultCode": 1, "ResultDesc": "Invalid callback payload"}, 200
+
+    try:
+        enqueue_callback(kind, raw_body, checkout_request_id)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error queueing {kind} M-Pesa callback {checkout_request_id}: {e}")
+        return {"ResultCode": 1, "ResultDesc": "Internal Server Error"}, 200
+    return {"ResultCode": 0, "ResultDesc": "Callback received successfully."}, 200
+
+
+def _due(now):
+    return or_(
+        and_(CallbackOutbox.status == 'PENDING', CallbackOutbox.next_attempt_at <= now),
+        # Claimed by a worker that died before finishing
+        and_(CallbackOutbox.status == 'PROCESSING', CallbackOutbox.locked_at < now - timedelta(seconds=CALLBACK_LEASE_SECONDS))
+    )
+
+
+def claim_batch(limit=CALLBACK_BATCH_SIZE):
+    """Marks up to limit due rows PROCESSING for this worker and returns them."""
+    now = datetime.utcnow()
+    query = select(CallbackOutbox.id).where(_due(now)).order_by(CallbackOutbox.id).limit(limit)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True) # Workers never block on each other's rows
+    ids = db.session.execute(query).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return []
+
+    # Re-checking "due" in the UPDATE keeps two workers from claiming the same row where SKIP LOCKED is unavailable
+    db.session.execute(
+        update(CallbackOutbox)
+        .where(CallbackOutbox.id.in_(ids), _due(now))
+        .values(status='PROCESSING', locked_at=now, attempts=CallbackOutbox.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return (
+        CallbackOutbox.query
+        .filter(CallbackOutbox.id.in_(ids), CallbackOutbox.status == 'PROCESSING', CallbackOutbox.locked_at == now)
+        .order_by(CallbackOutbox.id)
+        .all()
+    )
+
+
+def process_entry(kind, payload):
+    """Applies one stored callback. Returns the finalize outcome; raises to retry."""
+    result = parse_stk_callback(json.loads(payload))
+    outcome = PROCESSORS[kind](result)
+    if outcome == 'unknown':
+        raise RetryableCallbackError(f"No payment with CheckoutRequestID {result['checkout_request_id']} (yet).")
+    return outcome
+
+
+def _record_failure(entry_id, attempts, error):
+    dead = attempts >= CALLBACK_MAX_ATTEMPTS
+    db.session.execute(
+        update(CallbackOutbox)
+        .where(CallbackOutbox.id == entry_id)
+        .values(
+            status='DEAD' if dead else 'PENDING',
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=CALLBACK_RETRY_BACKOFF * 2 ** (attempts - 1)),
+            locked_at=None,
+            last_error=str(error)[:2000]
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if dead:
+        print(f"M-Pesa callback {entry_id} dead-lettered after {attempts} attempts: {error}")
+
+
+def process_batch(limit=CALLBACK_BATCH_SIZE):
+    """Claims and applies one batch. Returns the number of rows claimed."""
+    # Plain values: the finalize functions commit, which would expire the ORM objects
+    claimed = [(entry.id, entry.attempts, entry.kind, entry.payload) for entry in claim_batch(limit)]
+    done = {}
+    for entry_id, attempts, kind, payload in claimed:
+        try:
+            done.setdefault(process_entry(kind, payload), []).append(entry_id)
+        except Exception as e:
+            db.session.rollback()
+            _record_failure(entry_id, attempts, e)
+
+    now = datetime.utcnow()
+    for outcome, entry_ids in done.items():
+        db.session.execute(
+            update(CallbackOutbox)
+            .where(CallbackOutbox.id.in_(entry_ids))
+            .values(status='DONE', outcome=outcome, processed_at=now, locked_at=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return len(claimed)
+
+
+def requeue_dead_callbacks(entry_ids=None):
+    """Moves dead-lettered callbacks back to PENDING with a fresh attempt budget. Commits; returns the count."""
+    query = update(CallbackOutbox).where(CallbackOutbox.status == 'DEAD')
+    if entry_ids:
+        query = query.where(CallbackOutbox.id.in_(entry_ids))
+    count = db.session.execute(
+        query.values(status='PENDING', attempts=0, next_attempt_at=datetime.utcnow(), locked_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    callback_worker_pool.wake()
+    return count
+
+
+class CallbackWorkerPool:
+    """Background threads draining the callback outbox. Every gunicorn worker runs its own pool."""
+
+    def __init__(self, workers=CALLBACK_WORKERS, poll_interval=CALLBACK_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self, app):
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(app,), name=f"mpesa-callbacks-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self, app):
+        while not self._stop.is_set():
+            claimed = 0
+            try:
+                with app.app_context():
+                    claimed = process_batch()
+            except Exception as e:
+                print(f"M-Pesa callback worker error: {e}")
+            if not claimed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+callback_worker_pool = CallbackWorkerPool()
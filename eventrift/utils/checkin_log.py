@@ -0,0 +1,214 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.config import CHECKIN_LOG_FLUSH_INTERVAL, CHECKIN_LOG_FLUSH_BATCH, CHECKIN_LOG_BUFFER_LIMIT
+from app.models.checkin_log import CheckInEvent, CheckInRollup
+
+# Every scan is appended to check_in_events and counted into its (event, gate, minute) rollup
+# in the same transaction as the check-in itself. Histograms are then a range read over a few
+# hundred rollup rows per event instead of a scan of the raw log. Codes rejected before any
+# ticket lookup have no transaction to join; they are buffered and written behind instead.
+
+OUTCOME_CHECKED_IN = 'CHECKED_IN'
+OUTCOME_DUPLICATE = 'DUPLICATE'
+OUTCOME_REJECTED = 'REJECTED'
+
+_ROLLUP_COLUMNS = {
+    OUTCOME_CHECKED_IN: 'checked_in',
+    OUTCOME_DUPLICATE: 'duplicates',
+    OUTCOME_REJECTED: 'rejected',
+}
+
+# check_in_batch / live gate result statuses -> log outcomes
+RESULT_OUTCOMES = {
+    'checked_in': OUTCOME_CHECKED_IN,
+    'duplicate': OUTCOME_DUPLICATE,
+    'rejected': OUTCOME_REJECTED,
+}
+
+HISTOGRAM_BUCKET_MINUTES = (1, 5, 15, 60)
+
+
+def scan_entry(event_id, ticket_uuid, outcome, scanned_at, gate_id=None, scanner_user_id=None, reason=None):
+    return {
+        'event_id': event_id,
+        'ticket_uuid': ticket_uuid,
+        'scanner_user_id': scanner_user_id,
+        'gate_id': str(gate_id)[:50] if gate_id else None,
+        'outcome': outcome,
+        'reason': reason[:200] if reason else None,
+        'scanned_at': scanned_at,
+    }
+
+
+def _bucket(scanned_at):
+    return scanned_at.replace(second=0, microsecond=0)
+
+
+def _ensure_rollup_row(event_id, bucket_start, gate_id):
+    if db.session.get(CheckInRollup, (event_id, bucket_start, gate_id)) is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CheckInRollup(event_id=event_id, bucket_start=bucket_start, gate_id=gate_id, checked_in=0, duplicates=0, rejected=0))
+    except IntegrityError:
+        pass # Created concurrently by another scanner
+
+
+def record_scans(entries):
+    """
+    Appends scan entries (built with scan_entry) to the log and adds them to the rollups.
+    Runs inside the caller's transaction.
+    """
+    if not entries:
+        return
+
+    now = datetime.utcnow()
+    db.session.execute(insert(CheckInEvent), [{**entry, 'created_at': now} for entry in entries])
+
+    increments = {}
+    for entry in entries:
+        if entry['event_id'] is None:
+            continue # Nothing to attribute the scan to; it stays in the raw log only
+        key = (entry['event_id'], _bucket(entry['scanned_at']), entry['gate_id'] or '')
+        counts = increments.setdefault(key, {})
+        column = _ROLLUP_COLUMNS[entry['outcome']]
+        counts[column] = counts.get(column, 0) + 1
+
+    for (event_id, bucket_start, gate_id), counts in increments.items():
+        _ensure_rollup_row(event_id, bucket_start, gate_id)
+        db.session.execute(
+            update(CheckInRollup)
+            .where(
+                CheckInRollup.event_id == event_id,
+                CheckInRollup.bucket_start == bucket_start,
+                CheckInRollup.gate_id == gate_id
+            )
+            .values({column: getattr(CheckInRollup, column) + count for column, count in counts.items()})
+            .execution_options(synchronize_session=False)
+        )
+
+
+class RejectedScanLog:
+    """
+    Buffers scans refused before any ticket lookup and writes them behind on a background
+    thread, so a burst of forged or expired codes costs the request no database round trips.
+    The buffer is per worker and bounded; entries still buffered when the process dies are lost
+    (they only feed analytics).
+    """
+
+    def __init__(self, interval=CHECKIN_LOG_FLUSH_INTERVAL, batch_size=CHECKIN_LOG_FLUSH_BATCH, limit=CHECKIN_LOG_BUFFER_LIMIT):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._entries = deque(maxlen=limit)
+        self._app = None
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, app):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._app = app
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='checkin-scan-log', daemon=True)
+            self._thread.start()
+
+    def add(self, entries):
+        if self._thread is None:
+            self.start(current_app._get_current_object()) # The flusher needs its own app context
+        self._entries.extend(entries)
+
+    def pending(self):
+        return len(self._entries)
+
+    def flush(self):
+        """Writes up to one batch of buffered entries. Returns how many were committed."""
+        with self._flush_lock:
+            entries = []
+            while self._entries and len(entries) < self.batch_size:
+                entries.append(self._entries.popleft())
+            if not entries:
+                return 0
+            try:
+                with self._app.app_context():
+                    record_scans(entries)
+                    db.session.commit()
+            except Exception as e:
+                with self._app.app_context():
+                    db.session.rollback()
+                self._entries.extendleft(reversed(entries)) # Retry on the next tick, in order
+                print(f"Rejected scan log flush failed, will retry: {e}")
+                return 0
+            return len(entries)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            while self.flush():
+                pass
+
+    def stop(self):
+        """Stops the flusher after writing everything still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while self.flush():
+            pass
+
+
+rejected_scan_log = RejectedScanLog()
+
+
+def record_rejected_scans(rejections, scanner_user_id, event_id=None, gate_id=None):
+    """Queues scans refused before any ticket lookup (bad signature, expired, wrong event) for the log."""
+    scanned_at = datetime.utcnow()
+    rejected_scan_log.add([
+        scan_entry(event_id, None, OUTCOME_REJECTED, scanned_at, gate_id, scanner_user_id, reason)
+        for reason in rejections
+    ])
+
+
+def arrival_histogram(event_id, bucket_minutes=1, gate_id=None, since=None, until=None):
+    """
+    Arrival curve and per-gate throughput for an event, read from the per-minute rollups.
+    Buckets are bucket_minutes wide and aligned to the hour; empty buckets are omitted.
+    """
+    query = db.session.query(
+        CheckInRollup.bucket_start, CheckInRollup.gate_id,
+        CheckInRollup.checked_in, CheckInRollup.duplicates, CheckInRollup.rejected
+    ).filter(CheckInRollup.event_id == event_id)
+    if gate_id is not None:
+        query = query.filter(CheckInRollup.gate_id == gate_id)
+    if since is not None:
+        query = query.filter(CheckInRollup.bucket_start >= since)
+    if until is not None:
+        query = query.filter(CheckInRollup.bucket_start < until)
+
+    buckets, gates = {}, {}
+    for bucket_start, row_gate_id, checked_in, duplicates, rejected in query.order_by(CheckInRollup.bucket_start).all():
+        start = bucket_start - timedelta(minutes=bucket_start.minute % bucket_minutes)
+        bucket = buckets.setdefault(start, {'start': start.isoformat(), 'checked_in': 0, 'duplicates': 0, 'rejected': 0})
+        bucket['checked_in'] += checked_in
+        bucket['duplicates'] += duplicates
+        bucket['rejected'] += rejected
+
+        gate = gates.setdefault(row_gate_id, {'gate_id': row_gate_id or None, 'checked_in': 0, 'duplicates': 0, 'rejected': 0, 'peak_per_minute': 0})
+        gate['checked_in'] += checked_in
+        gate['duplicates'] += duplicates
+        gate['rejected'] += rejected
+        gate['peak_per_minute'] = max(gate['peak_per_minute'], checked_in)
+
+    return {
+        'event_id': event_id,
+        'bucket_minutes': bucket_minutes,
+        'buckets': list(buckets.values()),
+        'gates': sorted(gates.values(), key=lambda gate: -gate['checked_in']),
+    }
@@ -0,0 +1,124 @@
+import base64
+import binascii
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from app import db
+from app.config import MANIFEST_SIGNING_KEY
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.checkin_service import check_in_batch
+
+# Manifest format ("sorted-uuid16"):
+#   tickets    - base64 of the PAID ticket UUIDs as 16-byte values, sorted, concatenated.
+#                Scanners binary-search it: 20k tickets is ~320 KB before base64.
+#   checked_in - base64 bitmap, bit i (LSB first within each byte) set if ticket i is checked in.
+#   signature  - base64 Ed25519 signature over the canonical JSON of every other field. Scanners
+#                hold only the public key, so they can verify a manifest came from us before
+#                trusting it offline, but cannot sign one themselves.
+
+MANIFEST_FORMAT = 'sorted-uuid16'
+SIGNATURE_ALGORITHM = 'ed25519'
+
+
+def _canonical(manifest):
+    unsigned = {key: value for key, value in manifest.items() if key != 'signature'}
+    return json.dumps(unsigned, sort_keys=True, separators=(',', ':')).encode()
+
+
+def _load_signing_key(encoded=MANIFEST_SIGNING_KEY):
+    """
+    Loads the Ed25519 private key from its base64 raw form. Raises RuntimeError at import for a
+    malformed key, so a bad deploy fails at startup instead of on every manifest.
+    """
+    if not encoded:
+        # No key configured: derive one from the app secret so development setups work unconfigured
+        secret = os.environ.get('SECRET_KEY', 'another-default-secret')
+        return Ed25519PrivateKey.from_private_bytes(hashlib.sha256(f"manifest-signing:{secret}".encode()).digest())
+    try:
+        seed = base64.b64decode(encoded, validate=True)
+    except binascii.Error:
+        seed = b''
+    if len(seed) != 32:
+        raise RuntimeError("MANIFEST_SIGNING_KEY must be the base64 of a 32-byte Ed25519 private key.")
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
+
+_SIGNING_KEY = _load_signing_key()
+
+
+def manifest_public_key():
+    """Base64 of the raw Ed25519 public key that scanners are provisioned with."""
+    return base64.b64encode(_SIGNING_KEY.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)).decode()
+
+
+def sign_manifest(manifest, signing_key=None):
+    return base64.b64encode((signing_key or _SIGNING_KEY).sign(_canonical(manifest))).decode()
+
+
+def verify_manifest(manifest, public_key=None):
+    """Checks the signature the way a scanner does, with only the base64 public key."""
+    key = Ed25519PublicKey.from_public_bytes(base64.b64decode(public_key or manifest_public_key()))
+    try:
+        key.verify(base64.b64decode(manifest.get('signature', '')), _canonical(manifest))
+    except (InvalidSignature, binascii.Error):
+        return False
+    return True
+
+
+def build_manifest(event_id):
+    """Builds the signed manifest for an event from a single tickets + attendance query."""
+    rows = (
+        db.session.query(Ticket.uuid, Attendance.is_checked_in)
+        .outerjoin(Attendance, Attendance.ticket_id == Ticket.id)
+        .filter(Ticket.event_id == event_id, Ticket.status == 'PAID')
+        .all()
+    )
+    entries = sorted((uuid.UUID(ticket_uuid).bytes, bool(is_checked_in)) for ticket_uuid, is_checked_in in rows)
+
+    bitmap = bytearray((len(entries) + 7) // 8)
+    for index, (_, is_checked_in) in enumerate(entries):
+        if is_checked_in:
+            bitmap[index // 8] |= 1 << (index % 8)
+
+    manifest = {
+        'event_id': event_id,
+        'format': MANIFEST_FORMAT,
+        'signature_algorithm': SIGNATURE_ALGORITHM,
+        'generated_at': datetime.utcnow().isoformat(),
+        'count': len(entries),
+        'tickets': base64.b64encode(b''.join(ticket_bytes for ticket_bytes, _ in entries)).decode(),
+        'checked_in': base64.b64encode(bytes(bitmap)).decode()
+    }
+    manifest['signature'] = sign_manifest(manifest)
+    return manifest
+
+
+def _parse_scanned_at(value):
+    if not value:
+        return datetime.utcnow()
+    scanned_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None) # Stored as naive UTC
+    return scanned_at
+
+
+def apply_offline_checkins(event_id, scans, checked_in_by_user_id, gate_id=None):
+    """
+    Ingests check-ins recorded offline by scanner devices in one transaction.
+    scans are dicts with 'ticket_uuid' and 'scanned_at' (ISO 8601). Conflicts resolve to the
+    earliest scan time (see check_in_batch); gate_id is the uploading device. Returns one result per submitted scan, in order.
+    """
+    parsed = []
+    for scan in scans:
+        try:
+            parsed.append((str(uuid.UUID(str(scan.get('ticket_uuid')))), _parse_scanned_at(scan.get('scanned_at'))))
+        except (ValueError, TypeError, AttributeError):
+            parsed.append((None, None))
+    return check_in_batch(parsed, checked_in_by_user_id, event_id=event_id, gate_id=gate_id)
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.event_stats import record_check_ins
+from app.utils.checkin_log import record_scans, scan_entry, RESULT_OUTCOMES, OUTCOME_DUPLICATE
+from app.utils.qr_signing import verify_ticket_qr, InvalidQRCode
+
+
+def decode_qr_data(qr_data, event_id=None):
+    """
+    Verifies QR content and returns (ticket_uuid, None), or (None, reason) for codes that fail
+    signature, expiry or event-scope checks. No database access.
+    """
+    try:
+        return verify_ticket_qr(qr_data, event_id=event_id), None
+    except InvalidQRCode as e:
+        return None, str(e)
+
+
+def check_in_batch(scans, checked_in_by_user_id, event_id=None, gate_id=None, commit=True):
+    """
+    Checks in many tickets in one transaction.
+
+    scans is a list of (ticket_uuid, scanned_at) pairs; ticket_uuid None marks an unreadable
+    scan. All tickets are resolved with a single IN query (attendance eager-loaded) and locked
+    FOR UPDATE on Postgres so concurrent batches cannot admit the same ticket twice.
+    A ticket is admitted once; the earliest scan time wins and later scans are duplicates.
+    If event_id is given, tickets for other events are rejected.
+    Every scan is appended to the check-in log under gate_id.
+    Returns one result dict per scan, in the submitted order. Commits unless commit is False
+    (the caller then commits it together with other batches).
+    """
+    ticket_uuids = {ticket_uuid for ticket_uuid, _ in scans if ticket_uuid}
+    tickets = {}
+    if ticket_uuids:
+        query = Ticket.query.options(joinedload(Ticket.attendance)).filter(Ticket.uuid.in_(ticket_uuids))
+        if db.session.get_bind().dialect.name == 'postgresql':
+            query = query.with_for_update(of=Ticket)
+        tickets = {ticket.uuid: ticket for ticket in query.all()}
+
+    # Process in scan-time order so the earliest scan in the batch is the admitting one
+    order = sorted(range(len(scans)), key=lambda i: scans[i][1] or datetime.min)
+    results = [None] * len(scans)
+    newly_checked_in = {}
+
+    for i in order:
+        ticket_uuid, scanned_at = scans[i]
+        if not ticket_uuid:
+            results[i] = {'ticket_uuid': None, 'status': 'rejected', 'reason': 'Invalid QR code or scan data.'}
+            continue
+
+        ticket = tickets.get(ticket_uuid)
+        if not ticket or (event_id is not None and ticket.event_id != event_id):
+            results[i] = {'ticket_uuid': ticket_uuid, 'status': 'rejected', 'reason': 'Ticket not found.'}
+            continue
+        if ticket.status != 'PAID':
+            results[i] = {'ticket_uuid': ticket_uuid, 'status': 'rejected', 'reason': f"Ticket status is '{ticket.status}'."}
+            continue
+
+        attendance = ticket.attendance
+        if not attendance:
+            attendance = Attendance(ticket_id=ticket.id, is_checked_in=False)
+            ticket.attendance = attendance
+
+        if not attendance.is_checked_in:
+            attendance.is_checked_in = True
+            attendance.checked_in_at = scanned_at
+            attendance.checked_in_by_user_id = checked_in_by_user_id
+            newly_checked_in[ticket.event_id] = newly_checked_in.get(ticket.event_id, 0) + 1
+            results[i] = {'ticket_uuid': ticket_uuid, 'status': 'checked_in', 'checked_in_at': scanned_at.isoformat()}
+            continue
+
+        if attendance.checked_in_at and scanned_at < attendance.checked_in_at:
+            # An offline scan that happened before the recorded one is the real entry time
+            attendance.checked_in_at = scanned_at
+            attendance.checked_in_by_user_id = checked_in_by_user_id
+            results[i] = {'ticket_uuid': ticket_uuid, 'status': 'checked_in', 'checked_in_at': scanned_at.isoformat(), 'resolved': 'earliest_scan_wins'}
+            continue
+
+        results[i] = {
+            'ticket_uuid': ticket_uuid,
+            'status': 'duplicate',
+            'checked_in_at': attendance.checked_in_at.isoformat() if attendance.checked_in_at else None
+        }
+
+    log_entries = []
+    for (ticket_uuid, scanned_at), result in zip(scans, results):
+        ticket = tickets.get(ticket_uuid)
+        outcome = RESULT_OUTCOMES[result['status']]
+        if result.get('resolved'):
+            outcome = OUTCOME_DUPLICATE # Only moves the entry time back; the arrival was already counted
+        log_entries.append(scan_entry(
+            event_id if event_id is not None else (ticket.event_id if ticket else None), ticket_uuid, outcome,
+            scanned_at or datetime.utcnow(), gate_id, checked_in_by_user_id,
+            result.get('reason') or result.get('resolved')
+        ))
+    record_scans(log_entries)
+
+    for checked_in_event_id, count in newly_checked_in.items():
+        record_check_ins(checked_in_event_id, count)
+    if commit:
+        db.session.commit()
+    return results
@@ -0,0 +1,58 @@
+import hashlib
+from functools import wraps
+
+from flask import request, make_response, Response
+from sqlalchemy import func
+
+
+def compute_etag(*parts):
+    """Builds a strong ETag value from anything that identifies the representation."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def aggregate_version(query, *columns):
+    """
+    Returns (max(column) for each column..., row count) for the query in a single aggregate
+    statement. This is the cheap "has anything changed?" probe behind conditional GETs.
+    """
+    aggregates = [func.max(column) for column in columns]
+    return tuple(query.order_by(None).with_entities(*aggregates, func.count()).one())
+
+
+def conditional_get(version_fn):
+    """
+    Decorator for Resource.get methods. version_fn receives the same arguments as the view
+    (including the resource instance) and returns a tuple describing the current data version (see aggregate_version).
+    If the client's If-None-Match matches, a bodyless 304 is returned without running the view,
+    so no listing query and no marshmallow dump happens.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            version = version_fn(*args, **kwargs)
+            etag = compute_etag(request.path, sorted(request.args.items(multi=True)), version)
+
+            if request.if_none_match.contains(etag):
+                not_modified = make_response('', 304)
+                not_modified.set_etag(etag)
+                return not_modified
+
+            result = fn(*args, **kwargs)
+            body, status, headers = result, 200, None
+            if isinstance(result, tuple):
+                body, status = result[0], result[1]
+                headers = result[2] if len(result) > 2 else None
+            if status != 200:
+                return result
+
+            if isinstance(body, Response):
+                body.set_etag(etag)
+                body.headers['Cache-Control'] = 'no-cache'
+                return body, status
+
+            headers = dict(headers or {})
+            headers['ETag'] = f'"{etag}"'
+            headers['Cache-Control'] = 'no-cache' # Clients may store it but must revalidate
+            return body, status, headers
+        return decorator
+    return wrapper
@@ -1,33 +1,184 @@
 import requests
 import base64
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta # Import timedelta
 import os # Import os for environment variables in case config.py isn't used for direct access
 
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
 # Import configuration variables from the app's config.py
+from app.utils.daraja_token import TokenCache, build_token_store
 from app.config import ( # Corrected import path
     CONSUMER_KEY, CONSUMER_SECRET, MPESA_BASE_URL, BUSINESS_SHORT_CODE, LNM_PASSKEY, 
-    CALLBACK_URL, TRANSACTION_TYPE
+    CALLBACK_URL, TRANSACTION_TYPE,
+    DARAJA_CONNECT_TIMEOUT, DARAJA_READ_TIMEOUT, DARAJA_MAX_RETRIES, DARAJA_RETRY_BACKOFF,
+    DARAJA_POOL_SIZE, DARAJA_ASYNC_WORKERS
 )
 
+# Responses worth retrying for idempotent calls (token fetch); everything else is final
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# STK Query answers HTTP 500 with this code while the buyer has not responded yet
+STK_QUERY_PENDING_ERROR_CODE = '500.001.1001'
+
+
+class RateLimiter:
+    """Token bucket shared by the threads of one process: at most rate calls per second, bursts up to burst."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _never_sent(error):
+    """True if the connection could not be opened, so the request never reached Safaricom."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class DarajaMetrics:
+    """Per-operation call counts and latency (recent-sample percentiles) for this worker."""
+
+    SAMPLE_SIZE = 512
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def record(self, operation, seconds, ok, retries):
+        with self._lock:
+            stats = self._operations.setdefault(operation, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'samples': deque(maxlen=self.SAMPLE_SIZE)
+            })
+            stats['calls'] += 1
+            stats['errors'] += 0 if ok else 1
+            stats['retries'] += retries
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['samples'].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for operation, stats in self._operations.items():
+                samples = sorted(stats['samples'])
+
+                def percentile(p):
+                    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1) if samples else None
+
+                result[operation] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'avg_ms': round(stats['total_seconds'] / stats['calls'] * 1000, 1),
+                    'p50_ms': percentile(0.5),
+                    'p95_ms': percentile(0.95),
+                    'max_ms': round(stats['max_seconds'] * 1000, 1),
+                }
+            return result
+
+
 class DarajaAPI:
     """
     Handles token generation, STK Push initiation, and password encoding for the M-Pesa Daraja API.
+    All calls share one pooled keep-alive session and are bounded by connect/read timeouts.
     """
     
-    _access_token = None
-    _token_expiry = None
+    def __init__(self, base_url=MPESA_BASE_URL, timeout=(DARAJA_CONNECT_TIMEOUT, DARAJA_READ_TIMEOUT),
+                 max_retries=DARAJA_MAX_RETRIES, backoff_seconds=DARAJA_RETRY_BACKOFF,
+                 pool_size=DARAJA_POOL_SIZE, async_workers=DARAJA_ASYNC_WORKERS, token_store=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.metrics = DarajaMetrics()
 
-    def _generate_access_token(self):
-        """Generates a new access token using Consumer Key and Secret."""
-        
-        if DarajaAPI._access_token and DarajaAPI._token_expiry and datetime.now() < DarajaAPI._token_expiry:
-            print("Using cached M-Pesa token.")
-            return DarajaAPI._access_token
+        # Reusing connections skips a TCP + TLS handshake on every call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # One token for all threads (and all workers with the file store), refreshed ahead of expiry
+        self.token_cache = TokenCache(token_store or build_token_store(), self._fetch_access_token)
+
+        self._async_workers = async_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _request(self, operation, method, url, idempotent=False, retry_statuses=RETRY_STATUS_CODES, **kwargs):
+        """
+        Sends one Daraja call with timeouts and bounded retries, recording its latency.
+        Failed connections are always retried (nothing reached Safaricom). Read timeouts and
+        retryable status codes are only retried for idempotent calls, so a slow STK Push is
+        never sent twice and the buyer never gets two prompts.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.monotonic()
+        retries = 0
+        ok = False
+        try:
+            while True:
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                    if not (idempotent and response.status_code in retry_statuses and retries < self.max_retries):
+                        ok = response.ok
+                        return response
+                except requests.exceptions.ConnectionError as e:
+                    if retries >= self.max_retries or not (idempotent or _never_sent(e)):
+                        raise
+                except requests.exceptions.Timeout:
+                    if retries >= self.max_retries or not idempotent:
+                        raise
+                retries += 1
+                time.sleep(self.backoff_seconds * 2 ** (retries - 1) * random.uniform(0.5, 1.5))
+        finally:
+            self.metrics.record(operation, time.monotonic() - started, ok, retries)
 
+    def _submit(self, fn, *args, **kwargs):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._async_workers, thread_name_prefix='daraja')
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def stk_query_async(self, checkout_request_id):
+        """Runs stk_query on the client's thread pool. Returns a Future with the same result dict."""
+        return self._submit(self.stk_query, checkout_request_id)
+
+    def stk_push_initiate_async(self, *args, **kwargs):
+        """Runs stk_push_initiate on the client's thread pool. Returns a Future with the same result dict."""
+        return self._submit(self.stk_push_initiate, *args, **kwargs)
+
+    def _fetch_access_token(self):
+        """Requests a new access token using Consumer Key and Secret. Returns (token, expires_in) or None."""
         key_secret = f"{CONSUMER_KEY}:{CONSUMER_SECRET}".encode('utf-8')
         encoded_auth = base64.b64encode(key_secret).decode('utf-8')
         
-        token_url = f"{MPESA_BASE_URL}/oauth/v1/generate?grant_type=client_credentials"
+        token_url = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
         
         headers = {
             'Authorization': f'Basic {encoded_auth}',
@@ -35,23 +186,25 @@ class DarajaAPI:
         }
         
         try:
-            response = requests.get(token_url, headers=headers)
+            response = self._request('oauth_token', 'GET', token_url, idempotent=True, headers=headers)
             response.raise_for_status() 
             data = response.json()
             
             if 'access_token' in data:
-                DarajaAPI._access_token = data['access_token']
-                # Token expiry is typically 3599 seconds. We use 3500 for safety.
-                DarajaAPI._token_expiry = datetime.now() + timedelta(seconds=3500)
                 print("M-Pesa token generated successfully.")
-                return DarajaAPI._access_token
+                # Token expiry is typically 3599 seconds
+                return data['access_token'], int(data.get('expires_in') or 3599)
             else:
                 print(f"Token generation failed: {data}")
                 return None
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"HTTP request error during token generation: {e}")
             return None
 
+    def _generate_access_token(self):
+        """Returns a valid access token from the shared cache (see utils/daraja_token.py)."""
+        return self.token_cache.get()
+
     def _generate_password(self):
         """Generates the base64 encoded password required for STK Push."""
         
@@ -75,7 +228,7 @@ class DarajaAPI:
         if phone_number.startswith('0'):
             phone_number = '254' + phone_number[1:]
         
-        stk_push_url = f"{MPESA_BASE_URL}/mpesa/stkpush/v1/processrequest"
+        stk_push_url = f"{self.base_url}/mpesa/stkpush/v1/processrequest"
         
         payload = {
             "BusinessShortCode": BUSINESS_SHORT_CODE,
@@ -98,7 +251,15 @@ class DarajaAPI:
         
         try:
             print(f"Initiating STK Push for {phone_number} with Amount: {amount}")
-            response = requests.post(stk_push_url, headers=headers, json=payload)
+            response = self._request('stk_push', 'POST', stk_push_url, headers=headers, json=payload)
+            if response.status_code == 401:
+                # Token revoked early; a rejected request never reached the buyer, so resend once
+                self.token_cache.invalidate(token)
+                token = self._generate_access_token()
+                if not token:
+                    return {"success": False, "message": "Failed to get M-Pesa access token."}
+                headers['Authorization'] = f'Bearer {token}'
+                response = self._request('stk_push', 'POST', stk_push_url, headers=headers, json=payload)
             response.raise_for_status()
             daraja_response = response.json()
             
@@ -111,4 +272,51 @@ class DarajaAPI:
             print(f"HTTP request error during STK Push: {e}")
             return {"success": False, "message": f"Network error: {e}"}
 
-mpesa_api = DarajaAPI()
\ No newline at end of file
+    def stk_query(self, checkout_request_id):
+        """
+        Asks Daraja for the final result of an STK Push (Lipa Na M-Pesa Online Query).
+        Returns {"success": True, "result_code": int, "result_desc": str, "data": ...} once the
+        transaction is final, or {"success": False, "pending": bool, "message": str} otherwise;
+        pending is True while the buyer has not answered the prompt yet.
+        """
+        token = self._generate_access_token()
+        if not token:
+            return {"success": False, "pending": False, "message": "Failed to get M-Pesa access token."}
+
+        password, timestamp = self._generate_password()
+        payload = {
+            "BusinessShortCode": BUSINESS_SHORT_CODE,
+            "Password": password,
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id
+        }
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+
+        try:
+            # A query changes nothing, so it may be retried; HTTP 500 is the normal "still processing" answer
+            response = self._request(
+                'stk_query', 'POST', f"{self.base_url}/mpesa/stkpushquery/v1/query",
+                idempotent=True, retry_statuses=RETRY_STATUS_CODES - {500}, headers=headers, json=payload
+            )
+            if response.status_code == 401:
+                self.token_cache.invalidate(token)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"HTTP request error during STK Query for {checkout_request_id}: {e}")
+            return {"success": False, "pending": False, "message": f"Network error: {e}"}
+
+        if data.get('errorCode') == STK_QUERY_PENDING_ERROR_CODE:
+            return {"success": False, "pending": True, "data": data, "message": data.get('errorMessage', 'The transaction is being processed.')}
+        if response.ok and data.get('ResponseCode') == '0' and data.get('ResultCode') is not None:
+            return {
+                "success": True,
+                "result_code": int(data['ResultCode']),
+                "result_desc": data.get('ResultDesc'),
+                "data": data
+            }
+        return {"success": False, "pending": False, "data": data, "message": data.get('errorMessage', 'Daraja request failed.')}
+
+mpesa_api = DarajaAPI()
@@ -0,0 +1,158 @@
+import json
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Daraja endpoints EventRift uses (OAuth, STK Push, STK Query), for
+# development and tests. Point MPESA_BASE_URL at it, e.g. `flask daraja-stub --port 8089` and
+# MPESA_BASE_URL=http://127.0.0.1:8089. Standard library only, so it can also run in-process:
+#
+#     stub = DarajaStub(result_code=0, callback_drop_rate=1.0) # Never calls back: exercises reconciliation
+#     server = stub.serve(port=0)                              # server.server_port is the chosen port
+#
+# Each STK Push becomes final `delay` seconds after it was accepted. Until then STK Query answers
+# "being processed" exactly like Daraja; afterwards it returns the push's result code. The result
+# code is taken from `outcomes` by phone number, falling back to `result_code`.
+
+RESULT_DESCRIPTIONS = {
+    0: 'The service request is processed successfully.',
+    1: 'The balance is insufficient for the transaction.',
+    1032: 'Request cancelled by user',
+    1037: 'DS timeout user cannot be reached',
+}
+
+
+class DarajaStub:
+    def __init__(self, result_code=0, delay=2.0, outcomes=None, send_callbacks=True, callback_drop_rate=0.0, token_ttl=3599):
+        self.result_code = result_code
+        self.delay = delay
+        self.outcomes = outcomes or {}
+        self.send_callbacks = send_callbacks
+        self.callback_drop_rate = callback_drop_rate
+        self.token_ttl = token_ttl
+        self.pushes = {} # CheckoutRequestID -> push state
+        self.requests = {'oauth': 0, 'stk_push': 0, 'stk_query': 0}
+        self._lock = threading.Lock()
+
+    def _final_result(self, push):
+        code = push['result_code']
+        result = {
+            'MerchantRequestID': push['merchant_request_id'],
+            'CheckoutRequestID': push['checkout_request_id'],
+            'ResultCode': code,
+            'ResultDesc': RESULT_DESCRIPTIONS.get(code, 'The transaction failed.'),
+        }
+        if code == 0:
+            result['CallbackMetadata'] = {'Item': [
+                {'Name': 'Amount', 'Value': push['amount']},
+                {'Name': 'MpesaReceiptNumber', 'Value': push['receipt']},
+                {'Name': 'TransactionDate', 'Value': int(time.strftime('%Y%m%d%H%M%S'))},
+                {'Name': 'PhoneNumber', 'Value': int(push['phone_number'])},
+            ]}
+        return result
+
+    def _send_callback(self, push):
+        if random.random() < self.callback_drop_rate:
+            return # Simulates a callback that never arrives
+        body = json.dumps({'Body': {'stkCallback': self._final_result(push)}}).encode()
+        request = urllib.request.Request(push['callback_url'], data=body, headers={'Content-Type': 'application/json'})
+        try:
+            urllib.request.urlopen(request, timeout=10).read()
+        except Exception as e:
+            print(f"Daraja stub: callback to {push['callback_url']} failed: {e}")
+
+    def stk_push(self, payload):
+        phone_number = str(payload.get('PhoneNumber', ''))
+        push = {
+            'checkout_request_id': f"ws_CO_{uuid.uuid4().hex[:20]}",
+            'merchant_request_id': f"{random.randint(10000, 99999)}-{random.randint(1000000, 9999999)}-1",
+            'phone_number': phone_number or '0',
+            'amount': payload.get('Amount'),
+            'callback_url': payload.get('CallBackURL'),
+            'result_code': self.outcomes.get(phone_number, self.result_code),
+            'receipt': uuid.uuid4().hex[:10].upper(),
+            'final_at': time.monotonic() + self.delay,
+        }
+        with self._lock:
+            self.pushes[push['checkout_request_id']] = push
+        if self.send_callbacks and push['callback_url']:
+            timer = threading.Timer(self.delay, self._send_callback, args=(push,))
+            timer.daemon = True
+            timer.start()
+        return 200, {
+            'MerchantRequestID': push['merchant_request_id'],
+            'CheckoutRequestID': push['checkout_request_id'],
+            'ResponseCode': '0',
+            'ResponseDescription': 'Success. Request accepted for processing',
+            'CustomerMessage': 'Success. Request accepted for processing',
+        }
+
+    def stk_query(self, payload):
+        with self._lock:
+            push = self.pushes.get(payload.get('CheckoutRequestID'))
+        if push is None:
+            return 400, {'requestId': uuid.uuid4().hex, 'errorCode': '400.002.02', 'errorMessage': 'Bad Request - Invalid CheckoutRequestID'}
+        if time.monotonic() < push['final_at']:
+            return 500, {'requestId': uuid.uuid4().hex, 'errorCode': '500.001.1001', 'errorMessage': 'The transaction is being processed'}
+        result = self._final_result(push)
+        return 200, {
+            'ResponseCode': '0',
+            'ResponseDescription': 'The service request has been accepted successsfully',
+            'MerchantRequestID': result['MerchantRequestID'],
+            'CheckoutRequestID': result['CheckoutRequestID'],
+            'ResultCode': str(result['ResultCode']),
+            'ResultDesc': result['ResultDesc'],
+        }
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, like the real API
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith('/oauth/v1/generate'):
+                    stub.requests['oauth'] += 1
+                    return self._reply(200, {'access_token': uuid.uuid4().hex, 'expires_in': str(stub.token_ttl)})
+                self._reply(404, {'errorMessage': 'Not found'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return self._reply(400, {'errorCode': '400.002.02', 'errorMessage': 'Bad Request - Invalid JSON'})
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    return self._reply(401, {'errorCode': '404.001.03', 'errorMessage': 'Invalid Access Token'})
+                if self.path == '/mpesa/stkpush/v1/processrequest':
+                    stub.requests['stk_push'] += 1
+                    return self._reply(*stub.stk_push(payload))
+                if self.path == '/mpesa/stkpushquery/v1/query':
+                    stub.requests['stk_query'] += 1
+                    return self._reply(*stub.stk_query(payload))
+                self._reply(404, {'errorMessage': 'Not found'})
+
+        return Handler
+
+    def serve(self, host='127.0.0.1', port=8089, background=True):
+        """Starts the HTTP server. In the background (default) the server is returned; call shutdown() to stop it."""
+        server = ThreadingHTTPServer((host, port), self.handler_class())
+        if not background:
+            server.serve_forever()
+            return server
+        threading.Thread(target=server.serve_forever, name='daraja-stub', daemon=True).start()
+        return server
@@ -0,0 +1,174 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from app.config import DARAJA_TOKEN_STORE, DARAJA_TOKEN_PATH, DARAJA_TOKEN_REFRESH_MARGIN
+
+# One Daraja OAuth token is shared by every thread (and, with the file store, every worker on
+# the host). Refreshing is single-flight: the refresher holds the store's lock and everyone else
+# either keeps using the still-valid token or waits for the lock and then re-reads the store.
+# A background thread refreshes ahead of expiry, so requests normally never fetch a token themselves.
+
+
+class MemoryTokenStore:
+    """Token store for a single worker process."""
+
+    def __init__(self):
+        self._token = None
+        self._lock = threading.Lock()
+
+    def read(self):
+        return self._token
+
+    def write(self, token, expires_at):
+        self._token = (token, expires_at)
+
+    def clear(self):
+        self._token = None
+
+    @contextmanager
+    def lock(self, blocking=True):
+        acquired = self._lock.acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._lock.release()
+
+
+class FileTokenStore:
+    """Token store shared by the workers on one host: a JSON file plus an flock'd lock file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data['access_token'], float(data['expires_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def write(self, token, expires_at):
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp') # Created 0600: the token is a credential
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'access_token': token, 'expires_at': expires_at}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, blocking=True):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+            yield acquired
+        finally:
+            os.close(fd) # Closing the descriptor releases the lock
+
+
+class TokenCache:
+    """
+    fetch() must return (access_token, expires_in_seconds) or None.
+    get() returns a valid token, fetching only when none is valid or the cached one is about to expire.
+    """
+
+    def __init__(self, store, fetch, refresh_margin=DARAJA_TOKEN_REFRESH_MARGIN):
+        self.store = store
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self._local = None # Last token seen by this process, saves a file read per call
+        self._thread_lock = threading.Lock() # Threads of this worker queue here before the store lock
+        self._refresher = None
+        self._refresher_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def _valid(self, entry, margin=0):
+        return entry is not None and entry[1] - margin > time.time()
+
+    def _refresh_locked(self, force=False):
+        """Called with the store lock held. Re-reads first: another worker may have just refreshed."""
+        entry = self.store.read()
+        if not force and self._valid(entry, self.refresh_margin):
+            self._local = entry
+            return entry
+        result = self.fetch()
+        if not result:
+            return entry if self._valid(entry) else None # Keep using a still-valid token
+        token, expires_in = result
+        entry = (token, time.time() + expires_in)
+        self.store.write(*entry)
+        self._local = entry
+        return entry
+
+    def get(self):
+        self._ensure_refresher()
+        if self._valid(self._local, self.refresh_margin):
+            return self._local[0]
+
+        entry = self.store.read()
+        if self._valid(entry, self.refresh_margin):
+            self._local = entry
+            return entry[0]
+
+        if self._valid(entry):
+            # Due for refresh but still usable: the background thread refreshes it, nobody waits
+            self._local = entry
+            self._wake.set()
+            return entry[0]
+
+        # No usable token: wait for whoever is refreshing, or refresh ourselves
+        with self._thread_lock, self.store.lock():
+            entry = self._refresh_locked()
+        return entry[0] if entry else None
+
+    def invalidate(self, token):
+        """Drops a token Daraja rejected, unless another request already replaced it."""
+        with self._thread_lock, self.store.lock():
+            entry = self.store.read()
+            if entry is not None and entry[0] == token:
+                self.store.clear()
+            if self._local is not None and self._local[0] == token:
+                self._local = None
+
+    def _ensure_refresher(self):
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        with self._refresher_lock:
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(target=self._run_refresher, name='daraja-token', daemon=True)
+                self._refresher.start()
+
+    def _run_refresher(self):
+        while True:
+            entry = self._local or self.store.read()
+            # Wake when the token enters its refresh window (or retry shortly after a failed fetch)
+            delay = (entry[1] - self.refresh_margin - time.time()) if self._valid(entry) else 30
+            self._wake.wait(max(delay, 1))
+            self._wake.clear()
+            try:
+                with self._thread_lock, self.store.lock():
+                    self._refresh_locked()
+            except Exception as e:
+                print(f"Background M-Pesa token refresh failed: {e}")
+
+
+def build_token_store():
+    if DARAJA_TOKEN_STORE == 'file':
+        return FileTokenStore(DARAJA_TOKEN_PATH)
+    return MemoryTokenStore()
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from app.models.event import Event
+
+
+def published_events():
+    return Event.query.filter_by(is_published=True)
+
+
+def _parse_datetime_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date or datetime.")
+
+
+def filtered_events(args):
+    """
+    Applies the listing filters from the query string (request.args) to the published events query.
+    Each filter lines up with an index on events: (is_published, date_time) for the date window,
+    (category_id, date_time) and (organizer_id, date_time) for the id filters.
+    Raises ValueError for malformed dates.
+    """
+    query = published_events()
+
+    date_from = _parse_datetime_arg(args, 'from')
+    date_to = _parse_datetime_arg(args, 'to')
+    if date_from:
+        query = query.filter(Event.date_time >= date_from)
+    if date_to:
+        query = query.filter(Event.date_time <= date_to)
+
+    category_id = args.get('category_id', type=int)
+    if category_id is not None:
+        query = query.filter(Event.category_id == category_id)
+
+    organizer_id = args.get('organizer_id', type=int)
+    if organizer_id is not None:
+        query = query.filter(Event.organizer_id == organizer_id)
+
+    location = args.get('location', '').strip()
+    if location:
+        escaped = location.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(Event.location.ilike(f"%{escaped}%", escape='\\'))
+
+    return query
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+from marshmallow import ValidationError
+from sqlalchemy import insert
+from app import db
+from app.config import EVENT_IMPORT_BATCH_SIZE
+from app.models.event import Event
+from app.schemas.event_schema import event_import_schema
+from app.utils.event_search import index_events
+from app.utils.response_cache import response_cache
+
+
+def iter_csv_rows(stream):
+    """Yields one dict per CSV line (header row required) without buffering the whole upload."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    for row in csv.DictReader(text_stream):
+        # Empty cells mean "not provided" so optional fields fall back to their defaults
+        yield {key: value for key, value in row.items() if key and value not in (None, '')}
+
+
+def iter_ndjson_rows(stream):
+    """Yields one dict per non-empty NDJSON line. Unparseable lines are yielded as errors."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8')
+    for line in text_stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            row = ValueError(f"Invalid JSON: {e.msg}")
+        else:
+            if not isinstance(row, dict):
+                row = ValueError("Each line must be a JSON object.")
+        yield row
+
+
+def _flush_batch(batch, organizer_id, report):
+    """Inserts one batch of validated rows with a single executemany and commits it."""
+    if not batch:
+        return
+    line_numbers = [line_number for line_number, _ in batch]
+    # executemany needs the same keys in every row, so optional fields get explicit defaults
+    rows = [{'image_url': None, **values, 'organizer_id': organizer_id} for _, values in batch]
+    try:
+        result = db.session.execute(insert(Event).returning(Event.id), rows)
+        event_ids = list(result.scalars())
+        index_events(event_ids)
+        db.session.commit()
+        report['created'] += len(event_ids)
+        report['event_ids'].extend(event_ids)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Bulk event import batch failed: {e}")
+        for line_number in line_numbers:
+            report['errors'].append({'row': line_number, 'errors': {'_database': [str(e)]}})
+
+
+def import_events(rows, organizer_id, batch_size=EVENT_IMPORT_BATCH_SIZE):
+    """
+    Validates rows with EventSchema and inserts the valid ones in chunked transactions.
+    A failing row never blocks the others; a failing batch only loses that batch.
+    Returns a report with created ids and per-row errors (row numbers are 1-based data rows).
+    """
+    report = {'created': 0, 'failed': 0, 'event_ids': [], 'errors': []}
+    batch = []
+
+    for line_number, row in enumerate(rows, start=1):
+        if isinstance(row, Exception):
+            report['errors'].append({'row': line_number, 'errors': {'_row': [str(row)]}})
+            continue
+        try:
+            batch.append((line_number, event_import_schema.load(row)))
+        except ValidationError as err:
+            report['errors'].append({'row': line_number, 'errors': err.messages})
+            continue
+
+        if len(batch) >= batch_size:
+            _flush_batch(batch, organizer_id, report)
+            batch = []
+
+    _flush_batch(batch, organizer_id, report)
+
+    report['failed'] = len(report['errors'])
+    if report['created']:
+        response_cache.invalidate('events')
+    return report
@@ -0,0 +1,140 @@
+from sqlalchemy import text
+from app import db
+
+# Full-text search over events (name, description, location).
+# Postgres: a weighted tsvector stored in events.search_vector with a GIN index.
+# SQLite: an FTS5 virtual table (events_fts) keyed by the event id, so search works locally.
+# The FTS5 table is created once at startup (ensure_search_index, called from create_app).
+
+FTS_TABLE = 'events_fts'
+TS_CONFIG = 'english'
+RESULT_LIMIT = 50
+
+# Name matches rank above location, which ranks above description
+PG_VECTOR_EXPR = (
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(location, '')), 'B') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'C')"
+)
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def ensure_search_index():
+    """Creates the SQLite FTS5 table if needed. Postgres uses the events.search_vector column instead."""
+    if _dialect() == 'sqlite':
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(name, description, location, tokenize='porter unicode61')"
+        ))
+        db.session.commit()
+
+
+def index_event(event):
+    """
+    Adds or refreshes a single event in the search index.
+    Runs inside the caller's transaction, so it commits (or rolls back) together with the event.
+    """
+    if event.id is None:
+        return
+    if _dialect() == 'postgresql':
+        db.session.execute(
+            text(f"UPDATE events SET search_vector = {PG_VECTOR_EXPR} WHERE id = :id"),
+            {'id': event.id}
+        )
+    elif _dialect() == 'sqlite':
+        db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': event.id})
+        db.session.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description, location) "
+            "VALUES (:id, :name, :description, :location)"
+        ), {
+            'id': event.id,
+            'name': event.name or '',
+            'description': event.description or '',
+            'location': event.location or ''
+        })
+
+
+def index_events(event_ids):
+    """Set-based variant of index_event for bulk inserts: one statement per backend, not one per event."""
+    if not event_ids:
+        return
+    params = {f'id{i}': event_id for i, event_id in enumerate(event_ids)}
+    placeholders = ', '.join(f':{name}' for name in params)
+    if _dialect() == 'postgresql':
+        db.session.execute(
+            text(f"UPDATE events SET search_vector = {PG_VECTOR_EXPR} WHERE id IN ({placeholders})"),
+            params
+        )
+    elif _dialect() == 'sqlite':
+        db.session.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description, location) "
+            f"SELECT id, name, description, location FROM events WHERE id IN ({placeholders})"
+        ), params)
+
+
+def remove_event(event_id):
+    """Removes an event from the search index. On Postgres the vector is deleted with the row."""
+    if event_id is not None and _dialect() == 'sqlite':
+        db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': event_id})
+
+
+def _fts5_query(q):
+    """Turns free text into a safe FTS5 query: every term quoted and prefix-matched."""
+    terms = [term.replace('"', '""') for term in q.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+def search_event_ids(q, limit=RESULT_LIMIT):
+    """
+    Returns a list of (event_id, rank) of published events matching the query, best match first.
+    Higher rank is better on both backends. The published filter is part of the ranked query, so
+    unpublished matches never take up places within the limit.
+    """
+    q = (q or '').strip()
+    if not q:
+        return []
+
+    if _dialect() == 'postgresql':
+        rows = db.session.execute(text(
+            f"SELECT id, ts_rank(search_vector, query) AS rank "
+            f"FROM events, websearch_to_tsquery('{TS_CONFIG}', :q) AS query "
+            "WHERE search_vector @@ query AND is_published "
+            "ORDER BY rank DESC, id ASC LIMIT :limit"
+        ), {'q': q, 'limit': limit})
+        return [(row.id, float(row.rank)) for row in rows]
+
+    if _dialect() == 'sqlite':
+        match = _fts5_query(q)
+        if not match:
+            return []
+        # bm25() is lower-is-better, so negate it; column weights mirror the Postgres A/C/B weights
+        rows = db.session.execute(text(
+            f"SELECT events.id AS id, -bm25({FTS_TABLE}, 10.0, 1.0, 4.0) AS rank "
+            f"FROM {FTS_TABLE} JOIN events ON events.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND events.is_published = 1 "
+            "ORDER BY rank DESC, events.id ASC LIMIT :limit"
+        ), {'match': match, 'limit': limit})
+        return [(row.id, float(row.rank)) for row in rows]
+
+    return []
+
+
+def rebuild_search_index():
+    """Re-indexes every event and returns how many. Use once after deploying search, or to repair the index."""
+    from app.models.event import Event
+
+    if _dialect() == 'postgresql':
+        # One set-based statement instead of a round trip per event
+        count = db.session.execute(text(f"UPDATE events SET search_vector = {PG_VECTOR_EXPR}")).rowcount
+    else:
+        ensure_search_index()
+        db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        count = 0
+        for event in Event.query.yield_per(500):
+            index_event(event)
+            count += 1
+    db.session.commit()
+    return count
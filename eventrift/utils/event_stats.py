@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from sqlalchemy import update, func, event
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.event import Event
+from app.models.event_stats import EventStats
+from app.models.payment import Payment
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.realtime import notify_event_changed
+
+# All increments run inside the caller's transaction, so the stats row commits (or rolls back)
+# together with the tickets or check-in that changed it. Dashboards are only notified once that
+# transaction has committed; a broadcast tick in between would otherwise push the old counters.
+
+_CHANGED_EVENTS = 'event_stats_changed' # session.info key: event ids awaiting the commit
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_committed_changes(session):
+    if session.in_nested_transaction():
+        return # Released savepoint (e.g. _ensure_stats_row); the outer transaction may still roll back
+    for event_id in session.info.pop(_CHANGED_EVENTS, ()):
+        notify_event_changed(event_id) # Dashboards re-read the counters on the next broadcast tick
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_rolled_back_changes(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_CHANGED_EVENTS, None)
+
+
+def _ensure_stats_row(event_id):
+    if db.session.get(EventStats, event_id) is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(EventStats(event_id=event_id, tickets_sold=0, checked_in_count=0, revenue=0))
+    except IntegrityError:
+        pass # Created concurrently by another request
+
+
+def _increment(event_id, **values):
+    _ensure_stats_row(event_id)
+    db.session.execute(
+        update(EventStats)
+        .where(EventStats.event_id == event_id)
+        .values(updated_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.info.setdefault(_CHANGED_EVENTS, set()).add(event_id)
+
+
+def record_tickets_sold(event_id, quantity, amount=0):
+    """
+    Adds issued tickets and the amount actually paid for them to the event's stats. The amount
+    comes from the payment, not the event's current ticket price, which the organizer may have
+    changed since. Complimentary tickets count as sold but add no revenue.
+    """
+    if not amount:
+        _increment(event_id, tickets_sold=EventStats.tickets_sold + quantity)
+        return
+    _increment(
+        event_id,
+        tickets_sold=EventStats.tickets_sold + quantity,
+        revenue=EventStats.revenue + amount
+    )
+
+
+def record_check_ins(event_id, count=1):
+    _increment(event_id, checked_in_count=EventStats.checked_in_count + count)
+
+
+def rebuild_event_stats(event_id=None):
+    """
+    Recomputes stats from tickets and attendance (for reconciliation after incidents or
+    backfilling). Pass an event_id to rebuild a single event. Commits and returns the row count.
+    """
+    sold = (
+        db.session.query(Ticket.event_id, func.count(Ticket.id))
+        .filter(Ticket.status == 'PAID')
+        .group_by(Ticket.event_id)
+    )
+    revenue = (
+        # Complimentary tickets have no payment and add no revenue
+        db.session.query(Payment.event_id, func.sum(Payment.amount))
+        .filter(Payment.status == 'PAID')
+        .group_by(Payment.event_id)
+    )
+    checked_in = (
+        db.session.query(Ticket.event_id, func.count(Attendance.id))
+        .join(Attendance, Attendance.ticket_id == Ticket.id)
+        .filter(Attendance.is_checked_in.is_(True))
+        .group_by(Ticket.event_id)
+    )
+    events = db.session.query(Event.id)
+    if event_id is not None:
+        sold = sold.filter(Ticket.event_id == event_id)
+        revenue = revenue.filter(Payment.event_id == event_id)
+        checked_in = checked_in.filter(Ticket.event_id == event_id)
+        events = events.filter(Event.id == event_id)
+
+    sold_by_event = dict(sold.all())
+    revenue_by_event = dict(revenue.all())
+    checked_in_by_event = dict(checked_in.all())
+
+    count = 0
+    for current_event_id, in events.all():
+        stats = db.session.get(EventStats, current_event_id) or EventStats(event_id=current_event_id)
+        stats.tickets_sold = sold_by_event.get(current_event_id, 0)
+        stats.checked_in_count = checked_in_by_event.get(current_event_id, 0)
+        stats.revenue = revenue_by_event.get(current_event_id) or 0
+        db.session.add(stats)
+        count += 1
+
+    db.session.commit()
+    print(f"Rebuilt stats for {count} events.")
+    return count
@@ -0,0 +1,111 @@
+import decimal
+import threading
+
+from marshmallow import fields, missing
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+
+# Precompiled dump path for marshmallow schemas on hot list endpoints.
+#
+# marshmallow resolves every field through several layers of generic calls per object
+# (accessor lookup, missing/None checks, validators, hooks). For a fixed schema that work is
+# the same on every row, so we resolve it once: each dump field becomes a (key, attribute,
+# formatter) triple and a row is serialized with one getattr and one formatter call per field.
+# Output is identical to schema.dump(); fields we do not know how to specialize fall back to
+# the field's own serialize(), and schemas with dump hooks fall back to schema.dump().
+
+_MISSING = object()
+
+
+def _format_decimal(field):
+    quantum = field.places # marshmallow stores places as the quantum, e.g. Decimal('0.01')
+
+    def format_value(value):
+        number = decimal.Decimal(str(value))
+        if quantum is not None and number.is_finite():
+            number = number.quantize(quantum, rounding=field.rounding)
+        return format(number, 'f') if field.as_string else number
+    return format_value
+
+
+def _format_datetime(field):
+    if field.format not in (None, 'iso', 'iso8601'):
+        return None
+    return lambda value: value.isoformat()
+
+
+def _formatter_for(field):
+    """Returns a value -> serialized value function, or None if the field needs the generic path."""
+    # Order matters: subclasses (Url, Email, Decimal...) are checked before their bases
+    if isinstance(field, fields.Nested):
+        nested = CompiledSchema(field.schema)
+        if field.many:
+            return lambda value: [nested.dump_one(item) for item in value]
+        return nested.dump_one
+    if type(field) in (fields.String, fields.Str, fields.Url, fields.URL, fields.Email):
+        return str
+    if isinstance(field, fields.Decimal):
+        return _format_decimal(field)
+    if type(field) in (fields.Integer, fields.Int) and not field.as_string:
+        return int
+    if type(field) is fields.Float and not field.as_string:
+        return float
+    if type(field) is fields.Raw:
+        return lambda value: value # marshmallow dumps these unchanged
+    if type(field) is fields.DateTime:
+        return _format_datetime(field)
+    return None
+
+
+class CompiledSchema:
+    """
+    Wraps a marshmallow schema instance with a specialized dump(). The plan is built lazily on
+    first use so nested schemas referenced by name are resolved after all schemas are defined.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._plan = None
+        self._fallback = False
+        self._lock = threading.Lock()
+
+    def _compile(self):
+        with self._lock:
+            if self._plan is not None or self._fallback:
+                return
+            if self.schema._hooks.get(PRE_DUMP) or self.schema._hooks.get(POST_DUMP):
+                self._fallback = True
+                return
+
+            plan = []
+            for name, field in self.schema.dump_fields.items():
+                key = field.data_key if field.data_key is not None else name
+                attribute = field.attribute or name
+                formatter = _formatter_for(field) if '.' not in attribute else None
+                plan.append((key, attribute, formatter, field, name))
+            self._plan = plan
+
+    def dump_one(self, obj):
+        if self._plan is None and not self._fallback:
+            self._compile()
+        if self._fallback:
+            return self.schema.dump(obj, many=False)
+
+        result = {}
+        for key, attribute, formatter, field, name in self._plan:
+            if formatter is None:
+                value = field.serialize(name, obj, accessor=self.schema.get_attribute)
+                if value is not missing:
+                    result[key] = value
+                continue
+            value = getattr(obj, attribute, _MISSING)
+            if value is _MISSING:
+                continue # marshmallow omits attributes the object does not have
+            result[key] = None if value is None else formatter(value)
+        return result
+
+    def dump(self, obj, many=None):
+        if many is None:
+            many = self.schema.many
+        if many:
+            return [self.dump_one(item) for item in obj]
+        return self.dump_one(obj)
@@ -0,0 +1,154 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.config import (
+    IMAGE_UPLOAD_BACKEND, IMAGE_UPLOAD_WORKERS, IMAGE_UPLOAD_MAX_ATTEMPTS, IMAGE_UPLOAD_STUB_DIR,
+    IMAGE_UPLOAD_STALE_MINUTES, IMAGE_UPLOAD_SWEEP_INTERVAL
+)
+
+# Event.image_status values
+IMAGE_STATUS_NONE = 'NONE'
+IMAGE_STATUS_PENDING = 'PENDING'
+IMAGE_STATUS_READY = 'READY'
+IMAGE_STATUS_FAILED = 'FAILED'
+
+
+class CloudinaryUploadBackend:
+    """Uploads through the existing Cloudinary utility (resizing/optimization included)."""
+
+    def upload(self, image_bytes, filename):
+        from app.utils.cloudinary_upload import upload_event_image
+        image_file = io.BytesIO(image_bytes)
+        image_file.name = filename
+        return upload_event_image(image_file)
+
+
+class LocalStubUploadBackend:
+    """Writes images to a local directory instead of Cloudinary. For tests and local development."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def upload(self, image_bytes, filename):
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha1(image_bytes).hexdigest()
+        extension = os.path.splitext(filename or '')[1] or '.img'
+        path = os.path.join(self.directory, f"{digest}{extension}")
+        with open(path, 'wb') as f:
+            f.write(image_bytes)
+        return f"file://{path}"
+
+
+class ImageUploadQueue:
+    """
+    Runs event poster uploads on a background thread pool so event creation never waits on
+    Cloudinary. Each job retries with exponential backoff, then records the outcome on the Event.
+    Jobs are only held in memory, so a sweeper thread fails events whose job was lost.
+    """
+
+    def __init__(self, backend, workers=4, max_attempts=3, backoff_seconds=1.0, sweep_interval=IMAGE_UPLOAD_SWEEP_INTERVAL):
+        self.backend = backend
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.sweep_interval = sweep_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload')
+        self._stop = threading.Event()
+        self._sweeper = None
+
+    def enqueue(self, event_id, image_bytes, filename):
+        """Schedules the upload for an already-saved event. Returns a Future."""
+        app = current_app._get_current_object() # The worker thread needs its own app context
+        return self._executor.submit(self._run, app, event_id, image_bytes, filename)
+
+    def _upload_with_retry(self, event_id, image_bytes, filename):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                image_url = self.backend.upload(image_bytes, filename)
+                if image_url:
+                    return image_url
+                print(f"Image upload for event {event_id} returned no URL (attempt {attempt}/{self.max_attempts}).")
+            except Exception as e:
+                print(f"Image upload for event {event_id} failed (attempt {attempt}/{self.max_attempts}): {e}")
+            if attempt < self.max_attempts:
+                time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        return None
+
+    def _run(self, app, event_id, image_bytes, filename):
+        from app.models.event import Event
+
+        image_url = self._upload_with_retry(event_id, image_bytes, filename)
+
+        with app.app_context():
+            event = db.session.get(Event, event_id)
+            if not event:
+                print(f"Event {event_id} was deleted before its image upload finished.")
+                return None
+            event.image_url = image_url
+            event.image_status = IMAGE_STATUS_READY if image_url else IMAGE_STATUS_FAILED
+            event.save()
+            return image_url
+
+    def start_sweeper(self, app):
+        if self._sweeper is not None:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(app,), name='image-upload-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self, app):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                with app.app_context():
+                    fail_stale_uploads()
+            except Exception as e:
+                print(f"Image upload sweep failed: {e}")
+
+    def shutdown(self, wait=True):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        self._executor.shutdown(wait=wait)
+
+
+def fail_stale_uploads(older_than_minutes=IMAGE_UPLOAD_STALE_MINUTES):
+    """
+    Marks events whose upload has been PENDING for longer than any job can take as FAILED, so
+    clients stop waiting for a poster that will never arrive. Commits; returns the count.
+    """
+    from app.models.event import Event
+    from app.utils.response_cache import response_cache
+
+    cutoff = datetime.utcnow() - timedelta(minutes=older_than_minutes)
+    count = db.session.execute(
+        update(Event)
+        .where(Event.image_status == IMAGE_STATUS_PENDING, Event.updated_at < cutoff)
+        .values(image_status=IMAGE_STATUS_FAILED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if count:
+        response_cache.invalidate('events')
+        print(f"Marked {count} stale image uploads as failed.")
+    return count
+
+
+def _build_backend():
+    if IMAGE_UPLOAD_BACKEND == 'stub':
+        return LocalStubUploadBackend(IMAGE_UPLOAD_STUB_DIR)
+    return CloudinaryUploadBackend()
+
+
+image_upload_queue = ImageUploadQueue(
+    _build_backend(),
+    workers=IMAGE_UPLOAD_WORKERS,
+    max_attempts=IMAGE_UPLOAD_MAX_ATTEMPTS
+)
@@ -0,0 +1,68 @@
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+
+from flask import make_response
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError: # Optional speed-up; fall back to the standard library encoder
+    orjson = None
+
+
+def _default(value):
+    """Matches Flask's DefaultJSONProvider for the types orjson does not handle the same way."""
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj):
+    # Datetimes are passed through to _default so they render exactly like Flask's provider
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (used by jsonify and request.get_json)."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for application/json using orjson."""
+    if orjson is None:
+        from flask_restful.representations.json import output_json as restful_output_json
+        return restful_output_json(data, code, headers)
+    response = make_response(dumps_bytes(data), code)
+    response.headers['Content-Type'] = 'application/json'
+    response.headers.extend(headers or {})
+    return response
+
+
+def use_fast_json(api):
+    """Makes a Flask-RESTful Api render its JSON responses with orjson."""
+    api.representations['application/json'] = output_json
+    return api
@@ -0,0 +1,468 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+from flask import current_app
+from app import db
+from app.config import (
+    LIVE_CHECKIN_STORE, LIVE_CHECKIN_DIR, LIVE_CHECKIN_FLUSH_INTERVAL, LIVE_CHECKIN_FLUSH_BATCH,
+    LIVE_CHECKIN_MAX_BACKOFF, LIVE_CHECKIN_MAX_ATTEMPTS
+)
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.checkin_service import check_in_batch
+from app.utils.checkin_log import record_scans, scan_entry, OUTCOME_DUPLICATE, OUTCOME_REJECTED
+
+# Live-event mode for doors-open traffic.
+#
+# At gate open the event's ticket UUID -> (status, checked in) map is loaded into a hot set.
+# Scans are answered from it; accepted check-ins are appended (fsync'd) to a journal and queued,
+# and a background thread writes them to Attendance in batches through check_in_batch().
+# After each committed batch a checkpoint record is journaled. If the process dies, reopening
+# the gate replays every journaled check-in after the last checkpoint before loading the hot
+# set again. Replays are safe because check_in_batch ignores tickets already checked in.
+#
+# A failing flush is retried with exponential backoff. After LIVE_CHECKIN_MAX_ATTEMPTS the batch
+# is written entry by entry and the entries that still fail are appended to the event's
+# dead-letter file, so one bad entry cannot stall the gate. `flask replay-dead-checkins` retries them.
+#
+# Scan outcomes: 'checked_in', 'duplicate', 'not_paid', or 'unknown' (not in the hot set, e.g.
+# sold after gate open; callers fall back to the database path).
+
+
+class MemoryHotSet:
+    """Hot set held in this process. Only correct with a single worker (see _new_store)."""
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self._tickets = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows):
+        with self._lock:
+            self._tickets = {ticket_uuid: [status, bool(is_checked_in)] for ticket_uuid, status, is_checked_in in rows}
+
+    def remember(self, ticket_uuid, status='PAID', is_checked_in=True):
+        with self._lock:
+            self._tickets[ticket_uuid] = [status, is_checked_in]
+
+    def try_check_in(self, ticket_uuid):
+        with self._lock:
+            entry = self._tickets.get(ticket_uuid)
+            if entry is None:
+                return 'unknown'
+            if entry[0] != 'PAID':
+                return 'not_paid'
+            if entry[1]:
+                return 'duplicate'
+            entry[1] = True
+            return 'checked_in'
+
+    def is_active(self):
+        return True
+
+    def destroy(self):
+        with self._lock:
+            self._tickets = {}
+
+
+class SqliteHotSet:
+    """Hot set in a local SQLite file (WAL mode) shared by all workers on the host."""
+
+    def __init__(self, event_id, directory=LIVE_CHECKIN_DIR):
+        self.event_id = event_id
+        self.path = os.path.join(directory, f"event_{event_id}.hotset.db")
+        self._local = threading.local()
+
+    @classmethod
+    def exists(cls, event_id, directory=LIVE_CHECKIN_DIR):
+        return os.path.exists(os.path.join(directory, f"event_{event_id}.hotset.db"))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, rows):
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS tickets (uuid TEXT PRIMARY KEY, status TEXT NOT NULL, checked_in INTEGER NOT NULL)')
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM tickets')
+        conn.executemany(
+            'INSERT INTO tickets (uuid, status, checked_in) VALUES (?, ?, ?)',
+            ((ticket_uuid, status, int(bool(is_checked_in))) for ticket_uuid, status, is_checked_in in rows)
+        )
+        conn.execute('COMMIT')
+
+    def remember(self, ticket_uuid, status='PAID', is_checked_in=True):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO tickets (uuid, status, checked_in) VALUES (?, ?, ?)',
+            (ticket_uuid, status, int(is_checked_in))
+        )
+
+    def try_check_in(self, ticket_uuid):
+        conn = self._conn()
+        # Atomic across workers: only one UPDATE can flip checked_in from 0 to 1
+        if conn.execute(
+            "UPDATE tickets SET checked_in = 1 WHERE uuid = ? AND status = 'PAID' AND checked_in = 0",
+            (ticket_uuid,)
+        ).rowcount == 1:
+            return 'checked_in'
+        row = conn.execute('SELECT status, checked_in FROM tickets WHERE uuid = ?', (ticket_uuid,)).fetchone()
+        if row is None:
+            return 'unknown'
+        return 'not_paid' if row[0] != 'PAID' else 'duplicate'
+
+    def is_active(self):
+        return os.path.exists(self.path)
+
+    def destroy(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+
+class CheckInJournal:
+    """Append-only, fsync'd log of accepted check-ins with checkpoint records after each flush."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = max((entry['seq'] for entry in self.read_entries(path, include_flushed=True)), default=0)
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() > 0:
+            self._file.write('\n') # Terminate a line torn by a crash so the next record parses
+
+    @staticmethod
+    def read_entries(path, include_flushed=False):
+        """Returns journaled check-ins not yet covered by a checkpoint (or all of them)."""
+        if not os.path.exists(path):
+            return []
+        entries, checkpoint = [], 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # A torn final line from a crash mid-write
+                if 'checkpoint' in record:
+                    checkpoint = max(checkpoint, record['checkpoint'])
+                else:
+                    entries.append(record)
+        if include_flushed:
+            return entries
+        return [entry for entry in entries if entry['seq'] > checkpoint]
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, ticket_uuid, user_id, scanned_at, gate_id=None):
+        with self._lock:
+            self._seq += 1
+            self._write({'seq': self._seq, 'ticket_uuid': ticket_uuid, 'user_id': user_id, 'scanned_at': scanned_at.isoformat(), 'gate_id': gate_id})
+            return self._seq
+
+    def checkpoint(self, seq):
+        with self._lock:
+            self._write({'checkpoint': seq})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _dead_letter_path(event_id):
+    return os.path.join(LIVE_CHECKIN_DIR, f"event_{event_id}.dead.jsonl")
+
+
+def _append_dead_letters(event_id, records):
+    """Appends records to the event's dead-letter file (shared by all workers, fsync'd)."""
+    with open(_dead_letter_path(event_id), 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':'), default=lambda value: value.isoformat()) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _check_in_record(ticket_uuid, user_id, scanned_at, gate_id):
+    return {'kind': 'check_in', 'ticket_uuid': ticket_uuid, 'user_id': user_id, 'scanned_at': scanned_at, 'gate_id': gate_id}
+
+
+def _write_check_ins(event_id, entries):
+    """
+    Writes (ticket_uuid, user_id, scanned_at, gate_id) entries to Attendance, one check_in_batch
+    per scanner and gate but a single transaction, so a failed batch is retried whole and never
+    logs the scans of groups that had already committed as duplicates.
+    """
+    by_scanner = {}
+    for ticket_uuid, user_id, scanned_at, gate_id in entries:
+        by_scanner.setdefault((user_id, gate_id), []).append((ticket_uuid, scanned_at))
+    for (user_id, gate_id), scans in by_scanner.items():
+        check_in_batch(scans, user_id, event_id=event_id, gate_id=gate_id, commit=False)
+    db.session.commit()
+
+
+class LiveGate:
+    """Hot set, journal and write-behind flusher for one event in this worker process."""
+
+    def __init__(self, app, event_id, store):
+        self.app = app
+        self.event_id = event_id
+        self.store = store
+        os.makedirs(LIVE_CHECKIN_DIR, exist_ok=True)
+        self.journal = CheckInJournal(os.path.join(LIVE_CHECKIN_DIR, f"event_{event_id}.{os.getpid()}.journal"))
+        self._pending = deque()
+        self._scan_log = deque() # Duplicates and unpaid tickets answered from the hot set (analytics only, not journaled)
+        self._scan_log_failures = 0
+        self._pending_failures = 0 # Consecutive failed attempts of the batch at the head of the queue
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"live-checkin-{event_id}", daemon=True)
+        self._thread.start()
+
+    def scan(self, ticket_uuid, user_id, gate_id=None):
+        outcome = self.store.try_check_in(ticket_uuid)
+        if outcome == 'checked_in':
+            scanned_at = datetime.utcnow()
+            seq = self.journal.append(ticket_uuid, user_id, scanned_at, gate_id) # Durable before we answer
+            self._pending.append((seq, ticket_uuid, user_id, scanned_at, gate_id))
+        elif outcome == 'duplicate':
+            self._scan_log.append(scan_entry(self.event_id, ticket_uuid, OUTCOME_DUPLICATE, datetime.utcnow(), gate_id, user_id))
+        elif outcome == 'not_paid':
+            self._scan_log.append(scan_entry(self.event_id, ticket_uuid, OUTCOME_REJECTED, datetime.utcnow(), gate_id, user_id, 'Ticket is not paid.'))
+        return outcome
+
+    def _flush_scan_log(self):
+        entries = []
+        while self._scan_log and len(entries) < LIVE_CHECKIN_FLUSH_BATCH:
+            entries.append(self._scan_log.popleft())
+        if not entries:
+            return 0
+        try:
+            with self.app.app_context():
+                record_scans(entries)
+                db.session.commit()
+        except Exception as e:
+            with self.app.app_context():
+                db.session.rollback()
+            self._scan_log_failures += 1
+            if self._scan_log_failures < LIVE_CHECKIN_MAX_ATTEMPTS:
+                self._scan_log.extendleft(reversed(entries))
+                print(f"Live scan log flush failed for event {self.event_id}, will retry: {e}")
+                return 0
+            _append_dead_letters(self.event_id, [{'kind': 'scan', **entry} for entry in entries])
+            print(f"Live scan log flush for event {self.event_id} failed {self._scan_log_failures} times, {len(entries)} scans dead-lettered: {e}")
+            self._scan_log_failures = 0
+            return 0
+        self._scan_log_failures = 0
+        return len(entries)
+
+    def _write_one_by_one(self, batch):
+        """Last attempt for a failing batch: isolates the entries that cannot be written and dead-letters them."""
+        failed = []
+        for entry in batch:
+            try:
+                with self.app.app_context():
+                    _write_check_ins(self.event_id, [entry[1:]])
+            except Exception:
+                with self.app.app_context():
+                    db.session.rollback()
+                failed.append(_check_in_record(*entry[1:]))
+        if failed:
+            _append_dead_letters(self.event_id, failed)
+        return failed
+
+    def flush(self):
+        """Writes up to one batch of pending check-ins and logged scans. Returns how many were committed."""
+        with self._flush_lock:
+            logged = self._flush_scan_log()
+            batch = []
+            while self._pending and len(batch) < LIVE_CHECKIN_FLUSH_BATCH:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return logged
+            try:
+                with self.app.app_context():
+                    _write_check_ins(self.event_id, [entry[1:] for entry in batch])
+            except Exception as e:
+                with self.app.app_context():
+                    db.session.rollback()
+                self._pending_failures += 1
+                if self._pending_failures < LIVE_CHECKIN_MAX_ATTEMPTS:
+                    self._pending.extendleft(reversed(batch)) # Retry after the backoff, in order
+                    print(f"Live check-in flush failed for event {self.event_id}, will retry: {e}")
+                    return logged
+                failed = self._write_one_by_one(batch)
+                print(f"Live check-in flush for event {self.event_id} failed {self._pending_failures} times, {len(failed)} check-ins dead-lettered: {e}")
+                batch_written = len(batch) - len(failed)
+            else:
+                batch_written = len(batch)
+            self._pending_failures = 0
+            self.journal.checkpoint(batch[-1][0]) # Dead-lettered entries are durable in their own file
+            return logged + batch_written
+
+    def backoff(self):
+        """Seconds until the next flush: the interval, doubled per consecutive failure up to LIVE_CHECKIN_MAX_BACKOFF."""
+        failures = max(self._pending_failures, self._scan_log_failures)
+        return min(LIVE_CHECKIN_FLUSH_INTERVAL * 2 ** failures, max(LIVE_CHECKIN_MAX_BACKOFF, LIVE_CHECKIN_FLUSH_INTERVAL))
+
+    def _run(self):
+        while not self._stop.wait(self.backoff()):
+            while self.flush():
+                pass
+
+    def stop(self):
+        """Stops the flusher after writing everything still pending."""
+        self._stop.set()
+        self._thread.join()
+        while self.flush():
+            pass
+        if not self._pending:
+            self.journal.close()
+            os.remove(self.journal.path)
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def _new_store(event_id):
+    if LIVE_CHECKIN_STORE == 'sqlite':
+        return SqliteHotSet(event_id)
+    if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+        # Each worker would hold its own copy and admit the same ticket once per worker
+        raise RuntimeError("LIVE_CHECKIN_STORE=memory needs a single worker; use 'sqlite' with WEB_CONCURRENCY > 1.")
+    return MemoryHotSet(event_id)
+
+
+def _owner_alive(journal_path):
+    """True if the journal belongs to another running worker (which is still flushing it)."""
+    try:
+        pid = int(journal_path.rsplit('.', 2)[-2])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_journals(event_id):
+    """Replays check-ins journaled by dead workers but never flushed. Returns the count."""
+    replayed = 0
+    for path in glob.glob(os.path.join(LIVE_CHECKIN_DIR, f"event_{event_id}.*.journal")):
+        if _owner_alive(path):
+            continue
+        entries = CheckInJournal.read_entries(path)
+        if entries:
+            _write_check_ins(event_id, [
+                (entry['ticket_uuid'], entry['user_id'], datetime.fromisoformat(entry['scanned_at']), entry.get('gate_id'))
+                for entry in entries
+            ])
+            replayed += len(entries)
+        os.remove(path)
+    return replayed
+
+
+def replay_dead_letters(event_id):
+    """
+    Writes the event's dead-lettered check-ins and scans in one transaction. Returns the count.
+    On failure the entries are put back in the dead-letter file.
+    """
+    path = _dead_letter_path(event_id)
+    replaying = f"{path}.{os.getpid()}.replaying"
+    try:
+        os.replace(path, replaying) # Workers keep appending to a fresh file meanwhile
+    except FileNotFoundError:
+        return 0
+
+    with open(replaying, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    check_ins, scans = [], []
+    for record in records:
+        scanned_at = datetime.fromisoformat(record['scanned_at'])
+        if record['kind'] == 'check_in':
+            check_ins.append((record['ticket_uuid'], record['user_id'], scanned_at, record['gate_id']))
+        else:
+            scans.append({key: value for key, value in record.items() if key != 'kind'} | {'scanned_at': scanned_at})
+    try:
+        record_scans(scans)
+        _write_check_ins(event_id, check_ins)
+    except Exception:
+        db.session.rollback()
+        _append_dead_letters(event_id, records)
+        os.remove(replaying)
+        raise
+    os.remove(replaying)
+    return len(records)
+
+
+def open_gate(event_id):
+    """Replays any unflushed journal, loads the event's tickets into the hot set and starts the flusher."""
+    with _gates_lock:
+        if event_id in _gates:
+            return _gates[event_id], 0
+
+        os.makedirs(LIVE_CHECKIN_DIR, exist_ok=True)
+        replayed = recover_journals(event_id)
+
+        rows = (
+            db.session.query(Ticket.uuid, Ticket.status, Attendance.is_checked_in)
+            .outerjoin(Attendance, Attendance.ticket_id == Ticket.id)
+            .filter(Ticket.event_id == event_id)
+            .all()
+        )
+        store = _new_store(event_id)
+        store.load(rows)
+
+        gate = LiveGate(current_app._get_current_object(), event_id, store)
+        _gates[event_id] = gate
+        return gate, replayed
+
+
+def get_gate(event_id):
+    """Returns the live gate for an event, attaching to a shared store opened by another worker."""
+    if event_id is None:
+        return None
+    gate = _gates.get(event_id)
+    if gate is not None:
+        if gate.store.is_active():
+            return gate
+        close_gate(event_id, destroy_store=False) # Closed by another worker
+        return None
+    if LIVE_CHECKIN_STORE == 'sqlite' and SqliteHotSet.exists(event_id):
+        with _gates_lock:
+            if event_id not in _gates:
+                _gates[event_id] = LiveGate(current_app._get_current_object(), event_id, SqliteHotSet(event_id))
+            return _gates[event_id]
+    return None
+
+
+def close_gate(event_id, destroy_store=True):
+    """Flushes everything pending and leaves live mode. Returns False if the gate was not open here."""
+    with _gates_lock:
+        gate = _gates.pop(event_id, None)
+    if gate is None:
+        return False
+    gate.stop()
+    if destroy_store:
+        gate.store.destroy()
+    return True
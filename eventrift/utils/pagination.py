@@ -0,0 +1,139 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from app import db
+
+TOTAL_MODES = ('exact', 'approximate', 'none')
+
+
+def encode_cursor(date_time, event_id):
+    """Encodes the (date_time, id) sort key of the last row into an opaque cursor string."""
+    payload = json.dumps([date_time.isoformat(), event_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor back into (date_time, id).
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_time_str, event_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(date_time_str), int(event_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+
+def approximate_row_count(query):
+    """
+    Returns the planner's row estimate for query (Postgres only), taken from EXPLAIN so that
+    every filter on the listing is accounted for. This avoids a COUNT(*) over the matching rows;
+    returns None on other databases.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    compiled = query.order_by(None).statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True}
+    )
+    plan = db.session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(query, mode):
+    """
+    Counts rows for a listing according to mode: 'exact', 'approximate' or 'none'.
+    Raises ValueError for any other mode.
+    """
+    if mode not in TOTAL_MODES:
+        raise ValueError(f"Invalid total mode. Use one of: {', '.join(TOTAL_MODES)}.")
+    if mode == 'exact':
+        return query.order_by(None).count()
+    if mode == 'approximate':
+        return approximate_row_count(query)
+    return None
+
+
+class KeysetPage:
+    """
+    A page of results fetched with keyset (cursor) pagination.
+    Exposes the same attributes as Flask-SQLAlchemy's Pagination so that
+    pagination_schema can serialize both.
+    """
+
+    def __init__(self, items, per_page, has_next, next_cursor, has_prev, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+        self.has_prev = has_prev
+        self.total = total
+        self.page = None # Page numbers are meaningless with cursors
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return max(1, math.ceil(self.total / self.per_page)) if self.per_page else 0
+
+
+class OffsetPage(KeysetPage):
+    """A numbered page fetched with LIMIT/OFFSET; same attributes as KeysetPage."""
+
+    def __init__(self, items, page, per_page, has_next, total=None):
+        super().__init__(items, per_page, has_next, next_cursor=None, has_prev=page > 1, total=total)
+        self.page = page
+
+
+def offset_paginate(query, model, page, per_page, total_mode='exact'):
+    """
+    Paginates query ordered by (date_time, id) with LIMIT/OFFSET. has_next comes from fetching
+    one extra row, so it is right even when no total is counted (total_mode 'none', or
+    'approximate' where no estimate is available).
+    """
+    page, per_page = max(page, 1), max(per_page, 1)
+    total = count_rows(query, total_mode)
+
+    rows = (
+        query.order_by(model.date_time.asc(), model.id.asc())
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+        .all()
+    )
+    return OffsetPage(items=rows[:per_page], page=page, per_page=per_page, has_next=len(rows) > per_page, total=total)
+
+
+def keyset_paginate(query, model, per_page, cursor=None, total_mode='none'):
+    """
+    Paginates query ordered by (date_time, id) using a seek predicate instead of OFFSET.
+    The (date_time, id) composite index on the model makes every page an index range scan.
+    """
+    total = count_rows(query, total_mode)
+
+    ordered = query.order_by(model.date_time.asc(), model.id.asc())
+    if cursor:
+        last_date_time, last_id = decode_cursor(cursor)
+        ordered = ordered.filter(tuple_(model.date_time, model.id) > tuple_(last_date_time, last_id))
+
+    # Fetch one extra row to find out whether another page exists without counting
+    rows = ordered.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_next and items:
+        next_cursor = encode_cursor(items[-1].date_time, items[-1].id)
+
+    return KeysetPage(
+        items=items,
+        per_page=per_page,
+        has_next=has_next,
+        next_cursor=next_cursor,
+        has_prev=bool(cursor),
+        total=total
+    )
@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.payment import Payment, ProcessedCallback
+from app.models.stall_booking import StallPayment, StallBooking
+from app.utils.event_stats import record_tickets_sold
+from app.utils.ticket_issuance import issue_tickets
+from app.utils.ticket_inventory import (
+    confirm_reservation, allocate_tickets, release_reservation_by_checkout, SoldOutError
+)
+
+# Safaricom retries callbacks it did not see acknowledged, so the same result can arrive several
+# times, possibly concurrently. A result is applied at most once:
+#   1. a primary-key lookup in processed_callbacks answers most retries without touching payments;
+#   2. the payment row is locked (SELECT ... FOR UPDATE) and only moved out of PENDING once;
+#   3. the processed_callbacks row is inserted in the same transaction, so a concurrent retry
+#      blocks on its unique key and then sees the committed result.
+
+FINALIZE_OUTCOMES = ('paid', 'failed', 'refund_required', 'duplicate', 'unknown')
+
+# Stall payments move to AWAITING_CONFIRMATION once the STK Push is accepted
+STALL_OPEN_STATUSES = ('PENDING', 'AWAITING_CONFIRMATION')
+
+
+def parse_stk_callback(callback_data):
+    """Flattens a Daraja STK callback body into the fields finalize_payment needs."""
+    stk_callback = (callback_data or {}).get('Body', {}).get('stkCallback', {})
+    callback_metadata = stk_callback.get('CallbackMetadata', {}).get('Item', [])
+
+    def find_item(name):
+        return next((item.get('Value') for item in callback_metadata if item.get('Name') == name), None)
+
+    transaction_date = find_item('TransactionDate')
+    try:
+        transaction_date = datetime.strptime(str(transaction_date), '%Y%m%d%H%M%S') if transaction_date else None
+    except ValueError:
+        transaction_date = None
+
+    return {
+        'checkout_request_id': stk_callback.get('CheckoutRequestID'),
+        'merchant_request_id': stk_callback.get('MerchantRequestID'),
+        'result_code': stk_callback.get('ResultCode'),
+        'result_desc': stk_callback.get('ResultDesc'),
+        'mpesa_receipt_number': find_item('MpesaReceiptNumber'),
+        'amount': find_item('Amount'),
+        'phone_number': find_item('PhoneNumber'),
+        'transaction_date': transaction_date,
+    }
+
+
+def _claim(checkout_request_id, result_code):
+    """Records the callback as processed. False if another request already did."""
+    try:
+        with db.session.begin_nested():
+            db.session.add(ProcessedCallback(checkout_request_id=checkout_request_id, result_code=result_code))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _lock_pending_payment(checkout_request_id):
+    """Returns the payment locked for update, or None if it is unknown or no longer PENDING."""
+    payment = (
+        Payment.query.filter_by(checkout_request_id=checkout_request_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if payment is None or payment.status != 'PENDING':
+        return None
+    return payment
+
+
+def _apply_result(payment, result):
+    payment.result_code = result['result_code']
+    payment.result_desc = (result.get('result_desc') or '')[:255] or None
+    if result.get('mpesa_receipt_number'):
+        payment.mpesa_receipt_number = result['mpesa_receipt_number']
+    if result.get('transaction_date'):
+        payment.transaction_date = result['transaction_date']
+
+
+def finalize_payment(result):
+    """
+    Applies a payment result (see parse_stk_callback) exactly once and commits.
+    On success the held tickets are confirmed and issued; on failure they go back on sale.
+    Returns one of FINALIZE_OUTCOMES.
+    """
+    checkout_request_id = result.get('checkout_request_id')
+    if not checkout_request_id:
+        return 'unknown'
+
+    if db.session.get(ProcessedCallback, checkout_request_id) is not None:
+        return 'duplicate' # Retried callback: one indexed lookup, no writes
+
+    payment = Payment.query.filter_by(checkout_request_id=checkout_request_id).with_for_update().first()
+    if payment is None:
+        db.session.rollback()
+        return 'unknown' # Not recorded: a later retry can still be applied
+    if payment.status != 'PENDING' or not _claim(checkout_request_id, result['result_code']):
+        db.session.rollback()
+        return 'duplicate'
+
+    _apply_result(payment, result)
+
+    if result['result_code'] != 0:
+        payment.status = 'FAILED'
+        release_reservation_by_checkout(checkout_request_id) # Puts the held tickets back on sale, if any were held
+        db.session.commit() # The release only commits when a reservation exists
+        return 'failed'
+
+    try:
+        reservation = confirm_reservation(checkout_request_id)
+        if reservation is None:
+            allocate_tickets(payment.event_id, payment.quantity) # No hold to convert; sell from stock
+        issue_tickets(payment.user_id, payment.event_id, payment.quantity, payment_id=payment.id)
+        record_tickets_sold(payment.event_id, payment.quantity, amount=payment.amount) # Dashboard counters commit with the tickets
+        payment.status = 'PAID'
+        db.session.commit()
+        return 'paid'
+    except SoldOutError as e:
+        db.session.rollback()
+        print(f"Payment {checkout_request_id} succeeded but the event sold out: {e}")
+
+    # Money was taken but there are no tickets left: record it for a refund
+    payment = _lock_pending_payment(checkout_request_id)
+    if payment is None or not _claim(checkout_request_id, result['result_code']):
+        db.session.rollback()
+        return 'duplicate'
+    _apply_result(payment, result)
+    payment.status = 'REFUND_REQUIRED'
+    db.session.commit()
+    return 'refund_required'
+
+
+def finalize_stall_payment(result):
+    """
+    Applies a stall booking payment result exactly once and commits: the booking is confirmed
+    on success and cancelled otherwise. Returns one of FINALIZE_OUTCOMES.
+    """
+    checkout_request_id = result.get('checkout_request_id')
+    if not checkout_request_id:
+        return 'unknown'
+
+    if db.session.get(ProcessedCallback, checkout_request_id) is not None:
+        return 'duplicate'
+
+    payment = StallPayment.query.filter_by(checkout_request_id=checkout_request_id).with_for_update().first()
+    if payment is None:
+        db.session.rollback()
+        return 'unknown'
+    if payment.status not in STALL_OPEN_STATUSES or not _claim(checkout_request_id, result['result_code']):
+        db.session.rollback()
+        return 'duplicate'
+
+    # payment.booking is the list side of the backref; load the one booking explicitly
+    booking = StallBooking.query.filter_by(payment_id=payment.id).with_for_update().first()
+    if result['result_code'] == 0:
+        payment.status = 'PAID'
+        payment.mpesa_receipt_number = result.get('mpesa_receipt_number')
+        payment.transaction_date = result.get('transaction_date')
+        if booking:
+            booking.status = 'CONFIRMED'
+        outcome = 'paid'
+    else:
+        payment.status = 'FAILED'
+        if booking:
+            booking.status = 'CANCELLED'
+        outcome = 'failed'
+    db.session.commit()
+    return outcome
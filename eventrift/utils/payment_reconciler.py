@@ -0,0 +1,184 @@
+import fcntl
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from app import db
+from app.config import (
+    RECONCILE_INTERVAL_SECONDS, RECONCILE_AFTER_SECONDS, RECONCILE_GIVE_UP_SECONDS, RECONCILE_BATCH_SIZE,
+    RECONCILE_CONCURRENCY, RECONCILE_RATE_PER_SECOND, RECONCILE_LOCK_PATH
+)
+from app.models.payment import Payment
+from app.models.stall_booking import StallPayment, StallBooking
+from app.utils.callback_queue import PROCESSORS
+from app.utils.daraja_api import mpesa_api, RateLimiter
+from app.utils.payment_processing import STALL_OPEN_STATUSES
+from app.utils.ticket_inventory import release_unattached_reservations
+
+# Payments whose callback never arrived are settled by asking Daraja (STK Query). Queries run
+# concurrently but rate limited; the results are applied with the callback finalize functions,
+# so a callback arriving later (or concurrently) is a no-op and vice versa.
+
+OPEN_STATUSES = {
+    'ticket': (Payment, ('PENDING',)),
+    'stall': (StallPayment, STALL_OPEN_STATUSES),
+}
+
+GIVE_UP_RESULT_CODE = -1 # Synthetic failure code for payments M-Pesa never reported on
+
+
+@contextmanager
+def _single_pass_lock(path=RECONCILE_LOCK_PATH):
+    """Non-blocking host-wide lock so only one worker reconciles at a time. Yields False if busy."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            acquired = True
+        except BlockingIOError:
+            acquired = False
+        yield acquired
+    finally:
+        os.close(fd)
+
+
+def _fail_never_sent(stale_before):
+    """Fails open payments that never got a CheckoutRequestID (the STK Push was never accepted)."""
+    failed = 0
+    for model, statuses in OPEN_STATUSES.values():
+        failed += db.session.execute(
+            update(model)
+            .where(model.status.in_(statuses), model.checkout_request_id.is_(None), model.created_at < stale_before)
+            .values(status='FAILED')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    # Their held tickets go back on sale and their stall bookings can never be paid now
+    release_unattached_reservations(stale_before)
+    db.session.execute(
+        update(StallBooking)
+        .where(
+            StallBooking.status == 'PENDING_PAYMENT',
+            StallBooking.payment_id.in_(db.session.query(StallPayment.id).filter(StallPayment.status == 'FAILED'))
+        )
+        .values(status='CANCELLED')
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return failed
+
+
+def _stale_payments(stale_before, limit):
+    """Oldest open payments per kind that have waited long enough for their callback."""
+    candidates = []
+    for kind, (model, statuses) in OPEN_STATUSES.items():
+        rows = (
+            db.session.query(model.checkout_request_id, model.created_at)
+            .filter(model.status.in_(statuses), model.checkout_request_id.isnot(None), model.created_at < stale_before)
+            .order_by(model.created_at)
+            .limit(limit)
+            .all()
+        )
+        candidates.extend((kind, checkout_request_id, created_at) for checkout_request_id, created_at in rows)
+    db.session.rollback() # Do not hold a transaction open during the network calls
+    return candidates
+
+
+def reconcile_pending_payments(api=None, limit=RECONCILE_BATCH_SIZE, concurrency=RECONCILE_CONCURRENCY,
+                               rate_per_second=RECONCILE_RATE_PER_SECOND):
+    """
+    One reconciliation pass. Queries stale payments concurrently (network only; no database
+    access from the pool threads), then finalizes them one by one in this thread.
+    Returns a report of outcome counts.
+    """
+    api = api or mpesa_api
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=RECONCILE_AFTER_SECONDS)
+    give_up_before = now - timedelta(seconds=RECONCILE_GIVE_UP_SECONDS)
+
+    report = {'queried': 0, 'paid': 0, 'failed': 0, 'refund_required': 0, 'duplicate': 0,
+              'unknown': 0, 'pending': 0, 'errors': 0}
+    report['failed'] += _fail_never_sent(stale_before)
+
+    candidates = _stale_payments(stale_before, limit)
+    if not candidates:
+        return report
+
+    limiter = RateLimiter(rate_per_second)
+
+    def query(checkout_request_id):
+        limiter.acquire()
+        return api.stk_query(checkout_request_id)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as pool:
+        responses = list(pool.map(query, [checkout_request_id for _, checkout_request_id, _ in candidates]))
+    report['queried'] = len(responses)
+
+    for (kind, checkout_request_id, created_at), response in zip(candidates, responses):
+        if response['success']:
+            result = {
+                'checkout_request_id': checkout_request_id,
+                'result_code': response['result_code'],
+                'result_desc': response.get('result_desc'),
+            }
+        elif created_at < give_up_before:
+            result = {
+                'checkout_request_id': checkout_request_id,
+                'result_code': GIVE_UP_RESULT_CODE,
+                'result_desc': f"No result from M-Pesa after {RECONCILE_GIVE_UP_SECONDS}s: {response.get('message')}",
+            }
+        else:
+            report['pending' if response.get('pending') else 'errors'] += 1
+            continue
+
+        try:
+            report[PROCESSORS[kind](result)] += 1
+        except Exception as e:
+            db.session.rollback()
+            report['errors'] += 1
+            print(f"Reconciling {kind} payment {checkout_request_id} failed: {e}")
+
+    print(f"Payment reconciliation pass: {report}")
+    return report
+
+
+class PaymentReconciler:
+    """Background thread running a reconciliation pass every RECONCILE_INTERVAL_SECONDS."""
+
+    def __init__(self, interval=RECONCILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(app,), name='payment-reconciler', daemon=True)
+        self._thread.start()
+
+    def run_once(self):
+        """Runs a pass unless another worker on this host is already running one. Returns the report or None."""
+        with _single_pass_lock() as acquired:
+            if not acquired:
+                return None
+            return reconcile_pending_payments()
+
+    def _run(self, app):
+        while not self._stop.wait(self.interval):
+            try:
+                with app.app_context():
+                    self.run_once()
+            except Exception as e:
+                print(f"Payment reconciler error: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+payment_reconciler = PaymentReconciler()
@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import time
+import uuid
+
+from app.config import QR_SIGNING_KEYS, QR_SIGNING_ACTIVE_KEY_ID, QR_ACCEPT_LEGACY_CODES
+
+# Signed QR format: "v1.<key_id>.<payload>.<signature>" (payload and signature base64url, unpadded)
+#   payload   = ticket UUID (16 bytes) + event_id (uint32, 0 = any event) + expires_at (uint32 unix, 0 = never)
+#   signature = first 16 bytes of HMAC-SHA256(key, "v1.<key_id>." + payload)
+# Everything needed to reject a forged, tampered, expired or wrong-event code is in the code
+# itself, so the check-in path can do it without touching the database.
+
+QR_VERSION = 'v1'
+_PAYLOAD = struct.Struct('>16sII')
+_SIGNATURE_BYTES = 16
+
+
+class InvalidQRCode(Exception):
+    """Raised when a QR payload fails verification. The message is safe to show to gate staff."""
+
+
+def _load_keys(spec=QR_SIGNING_KEYS, active_key_id=QR_SIGNING_ACTIVE_KEY_ID):
+    """
+    Parses the "key_id:secret" list. Raises RuntimeError at import for a malformed list or an
+    active key id that is not in it, so a bad deploy fails at startup instead of on every ticket.
+    """
+    keys = {}
+    for position, pair in enumerate(spec.split(','), start=1):
+        if not pair.strip():
+            continue
+        key_id, _, secret = pair.partition(':')
+        if not key_id.strip() or not secret.strip():
+            raise RuntimeError(f"QR_SIGNING_KEYS entry {position} is not in 'key_id:secret' form.")
+        keys[key_id.strip()] = secret.strip().encode()
+    if not keys:
+        # No keys configured: derive one from the app secret so development setups work unconfigured
+        secret = os.environ.get('SECRET_KEY', 'another-default-secret')
+        keys[active_key_id] = hashlib.sha256(f"qr-signing:{secret}".encode()).digest()
+    elif active_key_id not in keys:
+        raise RuntimeError(
+            f"QR_SIGNING_ACTIVE_KEY_ID '{active_key_id}' is not one of the QR_SIGNING_KEYS ids ({', '.join(keys)})."
+        )
+    return keys
+
+
+_KEYS = _load_keys()
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(key, key_id, payload):
+    message = f"{QR_VERSION}.{key_id}.".encode() + payload
+    return hmac.new(key, message, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def sign_ticket_qr(ticket_uuid, event_id=None, expires_at=None):
+    """
+    Returns the signed QR content for a ticket. event_id scopes the code to one event;
+    expires_at (datetime or unix seconds) makes it expire.
+    """
+    if expires_at is not None and not isinstance(expires_at, (int, float)):
+        expires_at = expires_at.timestamp()
+    key_id = QR_SIGNING_ACTIVE_KEY_ID
+    payload = _PAYLOAD.pack(uuid.UUID(str(ticket_uuid)).bytes, event_id or 0, int(expires_at or 0))
+    signature = _sign(_KEYS[key_id], key_id, payload)
+    return f"{QR_VERSION}.{key_id}.{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def _decode_legacy(qr_data):
+    try:
+        return str(uuid.UUID(base64.b64decode(qr_data.encode(), validate=True).decode()))
+    except Exception:
+        raise InvalidQRCode("Invalid QR code format.")
+
+
+def verify_ticket_qr(qr_data, event_id=None, now=None):
+    """
+    Verifies QR content and returns the ticket UUID string. Raises InvalidQRCode otherwise.
+    If event_id is given, codes scoped to a different event are rejected.
+    Legacy base64(UUID) codes are accepted while QR_ACCEPT_LEGACY_CODES is on.
+    """
+    if not isinstance(qr_data, str) or not qr_data:
+        raise InvalidQRCode("Invalid QR code format.")
+
+    if not qr_data.startswith(QR_VERSION + '.'):
+        if QR_ACCEPT_LEGACY_CODES:
+            return _decode_legacy(qr_data)
+        raise InvalidQRCode("Unsigned QR codes are no longer accepted.")
+
+    parts = qr_data.split('.')
+    if len(parts) != 4:
+        raise InvalidQRCode("Invalid QR code format.")
+    _, key_id, payload_text, signature_text = parts
+
+    key = _KEYS.get(key_id)
+    if key is None:
+        raise InvalidQRCode("QR code was signed with an unknown key.")
+
+    try:
+        payload = _b64decode(payload_text)
+        signature = _b64decode(signature_text)
+        ticket_bytes, scoped_event_id, expires_at = _PAYLOAD.unpack(payload)
+    except Exception:
+        raise InvalidQRCode("Invalid QR code format.")
+
+    if not hmac.compare_digest(signature, _sign(key, key_id, payload)):
+        raise InvalidQRCode("QR code signature is invalid.")
+    if expires_at and expires_at < (now if now is not None else time.time()):
+        raise InvalidQRCode("QR code has expired.")
+    if event_id is not None and scoped_event_id and scoped_event_id != int(event_id):
+        raise InvalidQRCode("Ticket is for a different event.")
+
+    return str(uuid.UUID(bytes=ticket_bytes))
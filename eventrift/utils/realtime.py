@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+
+from app import db
+from app.config import REALTIME_COALESCE_MS, REALTIME_CHANGE_BUS, REALTIME_CHANGE_BUS_PATH
+from app.extensions import socketio
+
+# Pushes per-event ticket sales and check-in counters to organizer dashboards.
+#
+# Writers only call notify_event_changed(event_id), which records "this event changed" on a
+# change bus. Every REALTIME_COALESCE_MS each worker drains the bus, reads the current counters
+# for all changed events with one event_stats query, and emits one message per event to the
+# event's room. A burst of thousands of scans therefore costs at most one broadcast per event
+# per interval (per worker), whatever the scan rate.
+
+
+def event_room(event_id):
+    return f"event_{event_id}"
+
+
+class LocalChangeBus:
+    """Change notifications within this process."""
+
+    def __init__(self):
+        self._changed = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_id):
+        with self._lock:
+            self._changed.add(event_id)
+
+    def drain(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+
+class SqliteChangeBus:
+    """
+    Local stand-in for a message queue: workers on one host append change rows to a shared
+    SQLite file and each worker reads the rows it has not seen yet, so a check-in handled by
+    one worker reaches dashboards connected to any other worker.
+    Publishers prune rows older than RETENTION_SECONDS (at most every PRUNE_INTERVAL_SECONDS), so
+    the log stays bounded even while no dashboard is connected and nothing drains it.
+    """
+
+    RETENTION_SECONDS = 60
+    PRUNE_INTERVAL_SECONDS = 10
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_id = None
+        self._last_prune = 0.0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS event_changes '
+                '(id INTEGER PRIMARY KEY AUTOINCREMENT, event_id INTEGER NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def _prune(self, conn, now):
+        self._last_prune = now
+        conn.execute('DELETE FROM event_changes WHERE created_at < ?', (now - self.RETENTION_SECONDS,))
+
+    def publish(self, event_id):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('INSERT INTO event_changes (event_id, created_at) VALUES (?, ?)', (event_id, now))
+        if now - self._last_prune >= self.PRUNE_INTERVAL_SECONDS:
+            self._prune(conn, now)
+
+    def drain(self):
+        conn = self._conn()
+        if self._last_id is None:
+            # Start from the current end of the log; counters are re-read from the database anyway
+            self._last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM event_changes').fetchone()[0]
+            return set()
+        rows = conn.execute('SELECT id, event_id FROM event_changes WHERE id > ?', (self._last_id,)).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        self._prune(conn, time.time())
+        return {event_id for _, event_id in rows}
+
+
+class CounterBroadcaster:
+    def __init__(self, bus, interval_seconds):
+        self.bus = bus
+        self.interval_seconds = interval_seconds
+        self._app = None
+        self._started = False
+        self._start_lock = threading.Lock()
+        self.broadcasts_sent = 0
+
+    def start(self, app):
+        """Starts the coalescing loop once per worker (called when a dashboard joins)."""
+        with self._start_lock:
+            if self._started:
+                return
+            self._app = app
+            self._started = True
+        socketio.start_background_task(self._run)
+
+    def notify(self, event_id):
+        try:
+            self.bus.publish(event_id)
+        except Exception as e:
+            print(f"Could not publish realtime change for event {event_id}: {e}") # Never fail the write path
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.interval_seconds)
+            try:
+                with self._app.app_context():
+                    self.broadcast(self.bus.drain())
+            except Exception as e:
+                print(f"Realtime broadcast failed: {e}")
+
+    def broadcast(self, event_ids):
+        if not event_ids:
+            return 0
+        for event_id, payload in snapshot_counters(event_ids).items():
+            socketio.emit('event_counters', payload, to=event_room(event_id))
+            self.broadcasts_sent += 1
+        return len(event_ids)
+
+
+def snapshot_counters(event_ids):
+    """Current counters for the given events from event_stats (one query)."""
+    from app.models.event_stats import EventStats
+
+    rows = EventStats.query.filter(EventStats.event_id.in_(list(event_ids))).all()
+    found = {
+        row.event_id: {
+            'event_id': row.event_id,
+            'tickets_sold': row.tickets_sold,
+            'checked_in_count': row.checked_in_count,
+            'revenue': str(row.revenue)
+        }
+        for row in rows
+    }
+    for event_id in event_ids:
+        found.setdefault(event_id, {'event_id': event_id, 'tickets_sold': 0, 'checked_in_count': 0, 'revenue': '0.00'})
+    return found
+
+
+def _build_bus():
+    if REALTIME_CHANGE_BUS == 'sqlite':
+        return SqliteChangeBus(REALTIME_CHANGE_BUS_PATH)
+    return LocalChangeBus()
+
+
+counter_broadcaster = CounterBroadcaster(_build_bus(), REALTIME_COALESCE_MS / 1000.0)
+
+
+def notify_event_changed(event_id):
+    counter_broadcaster.notify(event_id)
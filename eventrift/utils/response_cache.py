@@ -0,0 +1,157 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request
+from app.config import RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_URL
+
+
+class LRUCacheBackend:
+    """In-process LRU cache with a per-entry TTL. Each gunicorn worker has its own copy."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {} # Kept apart from the entries so LRU eviction never resets them
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        """Atomically increments a counter that never expires (used for namespace generations)."""
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCacheBackend:
+    """Shared cache backend so every worker sees the same entries and invalidations."""
+
+    def __init__(self, url):
+        import redis # Optional dependency, only needed when RESPONSE_CACHE_URL is set
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(key, pickle.dumps(value), ex=ttl)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def get_counter(self, key):
+        raw = self._client.get(key)
+        return int(raw) if raw is not None else 0
+
+    def clear(self):
+        for key in self._client.scan_iter(match='resp:*'):
+            self._client.delete(key)
+
+
+class ResponseCache:
+    """
+    Caches serialized responses of public read endpoints, keyed by namespace + query parameters.
+
+    Invalidation bumps a per-namespace generation number that is part of every key, so one
+    counter increment makes all entries of that namespace unreachable (on any backend).
+    """
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def _record(self, namespace, outcome):
+        with self._stats_lock:
+            counters = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'invalidations': 0})
+            counters[outcome] += 1
+
+    def _key(self, namespace, params):
+        generation = self.backend.get_counter(f"gen:{namespace}")
+        return f"resp:{namespace}:{generation}:{params}"
+
+    def get(self, namespace, params):
+        """Returns the cached value for (namespace, params) or None, counting a hit or miss."""
+        key = self._key(namespace, params)
+        value = self.backend.get(key)
+        self._record(namespace, 'hits' if value is not None else 'misses')
+        return key, value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, namespace):
+        self.backend.incr(f"gen:{namespace}")
+        self._record(namespace, 'invalidations')
+
+    def stats(self):
+        """Hit/miss counters for this worker process."""
+        with self._stats_lock:
+            return {namespace: dict(counters) for namespace, counters in self._stats.items()}
+
+
+def _build_backend():
+    if RESPONSE_CACHE_URL:
+        try:
+            return RedisCacheBackend(RESPONSE_CACHE_URL)
+        except Exception as e:
+            print(f"Shared response cache unavailable, falling back to in-process cache: {e}")
+    return LRUCacheBackend(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_build_backend(), ttl=RESPONSE_CACHE_TTL)
+
+
+def cached_response(namespace):
+    """
+    Decorator for Resource.get methods returning (body, status).
+    Only 200 responses are cached; the key is built from the view arguments and query string.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            params = repr((sorted(kwargs.items()), sorted(request.args.items(multi=True))))
+            key, body = response_cache.get(namespace, params)
+            if body is not None:
+                return body, 200
+
+            body, status = fn(*args, **kwargs)
+            if status == 200:
+                response_cache.set(key, body)
+            return body, status
+        return decorator
+    return wrapper
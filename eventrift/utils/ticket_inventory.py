@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.config import TICKET_RESERVATION_TTL_SECONDS
+from app.models.event import Event
+from app.models.ticket_inventory import EventInventory, TicketReservation
+
+# Every counter change below is a single UPDATE whose WHERE clause carries the capacity check.
+# The database serializes concurrent updates of the same inventory row and re-checks the
+# condition, so there is never a read-modify-write window in which two buyers see the same stock.
+
+
+class SoldOutError(Exception):
+    """Raised when an event does not have enough tickets left for the request."""
+
+
+def _capacity(event_id):
+    return select(Event.capacity).where(Event.id == event_id).scalar_subquery()
+
+
+def _ensure_inventory_row(event_id):
+    """Creates the counter row on first use. A concurrent insert by another worker is fine."""
+    if db.session.get(EventInventory, event_id) is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(EventInventory(event_id=event_id, sold=0, reserved=0))
+    except IntegrityError:
+        pass # Another request created it first
+
+
+def _execute(stmt):
+    return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def _try_hold(event_id, quantity):
+    return _execute(
+        update(EventInventory)
+        .where(
+            EventInventory.event_id == event_id,
+            EventInventory.sold + EventInventory.reserved + quantity <= _capacity(event_id)
+        )
+        .values(reserved=EventInventory.reserved + quantity)
+    ) == 1
+
+
+def _try_sell_directly(event_id, quantity):
+    return _execute(
+        update(EventInventory)
+        .where(
+            EventInventory.event_id == event_id,
+            EventInventory.sold + EventInventory.reserved + quantity <= _capacity(event_id)
+        )
+        .values(sold=EventInventory.sold + quantity)
+    ) == 1
+
+
+def _transition(reservation_id, from_status, to_status):
+    """Moves a reservation between states only if nobody else moved it first."""
+    return _execute(
+        update(TicketReservation)
+        .where(TicketReservation.id == reservation_id, TicketReservation.status == from_status)
+        .values(status=to_status, updated_at=datetime.utcnow())
+    ) == 1
+
+
+def _return_held(event_id, quantity):
+    _execute(
+        update(EventInventory)
+        .where(EventInventory.event_id == event_id)
+        .values(reserved=EventInventory.reserved - quantity)
+    )
+
+
+def release_expired_reservations(event_id=None):
+    """
+    Expires HELD reservations past their deadline and returns their tickets to stock.
+    Does not commit. Returns the number of tickets released.
+    """
+    query = db.session.query(TicketReservation.id, TicketReservation.event_id, TicketReservation.quantity).filter(
+        TicketReservation.status == 'HELD',
+        TicketReservation.expires_at < datetime.utcnow()
+    )
+    if event_id is not None:
+        query = query.filter(TicketReservation.event_id == event_id)
+
+    released = 0
+    for reservation_id, reservation_event_id, quantity in query.all():
+        if _transition(reservation_id, 'HELD', 'EXPIRED'):
+            _return_held(reservation_event_id, quantity)
+            released += quantity
+    return released
+
+
+def release_unattached_reservations(created_before):
+    """
+    Releases HELD reservations created before created_before that never got a CheckoutRequestID,
+    i.e. their STK Push was never accepted. Does not commit. Returns the number of tickets released.
+    """
+    query = db.session.query(TicketReservation.id, TicketReservation.event_id, TicketReservation.quantity).filter(
+        TicketReservation.status == 'HELD',
+        TicketReservation.checkout_request_id.is_(None),
+        TicketReservation.created_at < created_before
+    )
+
+    released = 0
+    for reservation_id, event_id, quantity in query.all():
+        if _transition(reservation_id, 'HELD', 'RELEASED'):
+            _return_held(event_id, quantity)
+            released += quantity
+    return released
+
+
+def reserve_tickets(event_id, user_id, quantity, ttl_seconds=TICKET_RESERVATION_TTL_SECONDS):
+    """
+    Holds quantity tickets for the buyer and commits immediately so the inventory row lock
+    is held for as short a time as possible. Raises SoldOutError if there is not enough stock.
+    """
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1.")
+
+    _ensure_inventory_row(event_id)
+
+    if not _try_hold(event_id, quantity):
+        # Reclaim abandoned STK Pushes before declaring the event sold out
+        if not (release_expired_reservations(event_id) and _try_hold(event_id, quantity)):
+            db.session.rollback()
+            raise SoldOutError(f"Not enough tickets left for event {event_id}.")
+
+    reservation = TicketReservation(
+        event_id=event_id,
+        user_id=user_id,
+        quantity=quantity,
+        status='HELD',
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds)
+    )
+    db.session.add(reservation)
+    db.session.commit()
+    return reservation
+
+
+def attach_checkout(reservation, checkout_request_id):
+    """Links the hold to the STK Push so the callback can find it."""
+    reservation.checkout_request_id = checkout_request_id
+    db.session.commit()
+
+
+def release_reservation(reservation):
+    """Returns a HELD reservation's tickets to stock (failed or cancelled payment) and commits."""
+    if _transition(reservation.id, 'HELD', 'RELEASED'):
+        _return_held(reservation.event_id, reservation.quantity)
+    db.session.commit()
+
+
+def release_reservation_by_checkout(checkout_request_id):
+    reservation = TicketReservation.query.filter_by(checkout_request_id=checkout_request_id).first()
+    if reservation:
+        release_reservation(reservation)
+    return reservation
+
+
+def allocate_tickets(event_id, quantity):
+    """
+    Takes quantity tickets straight from stock without a hold (complimentary tickets).
+    Runs inside the caller's transaction. Raises SoldOutError if there is not enough stock.
+    """
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1.")
+
+    _ensure_inventory_row(event_id)
+
+    if not _try_sell_directly(event_id, quantity):
+        if not (release_expired_reservations(event_id) and _try_sell_directly(event_id, quantity)):
+            raise SoldOutError(f"Not enough tickets left for event {event_id}.")
+
+
+def confirm_reservation(checkout_request_id):
+    """
+    Converts the hold behind a successful payment into sold tickets.
+    Runs inside the caller's transaction (the callback commits it together with the tickets).
+    Returns the reservation if this call confirmed it, or None if there is nothing to issue
+    (unknown checkout or already confirmed). Raises SoldOutError if the hold had lapsed and
+    the stock has since been sold to someone else; that payment must be refunded.
+    """
+    reservation = TicketReservation.query.filter_by(checkout_request_id=checkout_request_id).first()
+    if not reservation:
+        return None
+
+    if _transition(reservation.id, 'HELD', 'CONFIRMED'):
+        _execute(
+            update(EventInventory)
+            .where(EventInventory.event_id == reservation.event_id)
+            .values(
+                sold=EventInventory.sold + reservation.quantity,
+                reserved=EventInventory.reserved - reservation.quantity
+            )
+        )
+        return reservation
+
+    # The hold expired or was released before the payment arrived; sell from remaining stock
+    for lapsed_status in ('EXPIRED', 'RELEASED'):
+        if _transition(reservation.id, lapsed_status, 'CONFIRMED'):
+            if not _try_sell_directly(reservation.event_id, reservation.quantity):
+                # The caller's rollback also undoes the status change above
+                raise SoldOutError(f"Reservation {reservation.id} lapsed and event {reservation.event_id} is sold out.")
+            return reservation
+
+    return None
@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+from app import db
+from app.models.ticket_attendance import Ticket, Attendance
+
+# Tickets are issued with one multi-row INSERT ... RETURNING for the tickets and one for their
+# attendance rows, instead of a flush per ORM object. UUIDs are generated here, so the statement
+# carries everything the database cannot default and only the ids have to come back.
+
+COMP_TICKET_TYPE = 'Complimentary'
+
+
+def issue_tickets(user_id, event_id, quantity, payment_id=None, status='PAID', ticket_type='General Admission'):
+    """
+    Inserts quantity tickets and their attendance rows. Runs inside the caller's transaction
+    (the callback commits it together with the reservation and stats updates).
+    payment_id is None for complimentary tickets. Returns the issued ticket UUIDs.
+    """
+    if quantity < 1:
+        return []
+
+    now = datetime.utcnow()
+    ticket_rows = [
+        {
+            'uuid': str(uuid.uuid4()),
+            'user_id': user_id,
+            'event_id': event_id,
+            'payment_id': payment_id,
+            'status': status,
+            'ticket_type': ticket_type,
+            'created_at': now,
+            'updated_at': now,
+        }
+        for _ in range(quantity)
+    ]
+    # SQLAlchemy batches an executemany with RETURNING into multi-row VALUES statements
+    ticket_ids = db.session.execute(insert(Ticket).returning(Ticket.id), ticket_rows).scalars().all()
+
+    db.session.execute(
+        insert(Attendance),
+        [{'ticket_id': ticket_id, 'is_checked_in': False, 'created_at': now} for ticket_id in ticket_ids]
+    )
+    return [row['uuid'] for row in ticket_rows]
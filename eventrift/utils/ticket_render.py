@@ -0,0 +1,237 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+from flask import request, make_response
+from app.config import TICKET_RENDER_CACHE_DIR, TICKET_RENDER_CACHE_MAX_BYTES
+
+try:
+    import qrcode
+except ImportError: # Optional dependency; rendering endpoints answer 501 without it
+    qrcode = None
+
+# Server-side rendering of ticket QR codes (PNG, SVG) and printable ticket PDFs.
+# qrcode only provides the module matrix; the three output formats are written directly,
+# so no imaging or PDF library is needed.
+#
+# Rendered files are cached on disk at <cache dir>/<ticket uuid>/<content hash>.<ext>. The hash
+# covers the QR content, the ticket details printed on the PDF and RENDER_VERSION, so any change
+# produces a new file and stale ones simply age out of the size-bounded LRU eviction.
+#
+# The hash is also the HTTP ETag. The render URL stays the same when the content changes (new
+# event details, re-signed QR code), so clients may store responses but must revalidate them.
+
+RENDER_VERSION = '1'
+QR_BORDER = 4 # Quiet zone in modules
+PNG_MODULE_PIXELS = 8
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+
+class RenderingUnavailable(Exception):
+    """Raised when the optional qrcode dependency is not installed."""
+
+
+def _qr_matrix(content):
+    if qrcode is None:
+        raise RenderingUnavailable("Install the 'qrcode' package to render tickets.")
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=QR_BORDER)
+    qr.add_data(content)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def render_png(matrix, module_pixels=PNG_MODULE_PIXELS):
+    """1-bit grayscale PNG; dark modules are 0 (black)."""
+    size = len(matrix) * module_pixels
+    raw_rows = []
+    for row in matrix:
+        bits = ''.join(('0' if dark else '1') * module_pixels for dark in row)
+        bits += '1' * (-len(bits) % 8)
+        packed = int(bits, 2).to_bytes(len(bits) // 8, 'big')
+        raw_rows.extend([b'\x00' + packed] * module_pixels) # Filter type 0 per scanline
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', size, size, 1, 0, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(b''.join(raw_rows), 9)) + chunk(b'IEND', b'')
+
+
+def render_svg(matrix):
+    size = len(matrix)
+    # One path for all dark modules keeps the file small
+    path = ''.join(f"M{x} {y}h1v1h-1z" for y, row in enumerate(matrix) for x, dark in enumerate(row) if dark)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{path}" fill="#000"/></svg>'
+    ).encode()
+
+
+def _pdf_text(value):
+    text = str(value if value is not None else '').encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def render_pdf(matrix, details):
+    """
+    A6 printable ticket: event details as text and the QR code drawn as filled squares.
+    details is a list of (label, value) lines.
+    """
+    page_width, page_height = 298, 420 # A6 in points
+    qr_size = 220
+    module = qr_size / len(matrix)
+    qr_x, qr_y = (page_width - qr_size) / 2, 40
+
+    ops = ['0 g']
+    for y, row in enumerate(matrix):
+        for x, dark in enumerate(row):
+            if dark:
+                ops.append(f"{qr_x + x * module:.2f} {qr_y + (len(matrix) - 1 - y) * module:.2f} {module:.2f} {module:.2f} re")
+    ops.append('f')
+
+    text_y = page_height - 40
+    for index, (label, value) in enumerate(details):
+        font_size = 14 if index == 0 else 9
+        line = _pdf_text(value) if index == 0 else f"{_pdf_text(label)}: {_pdf_text(value)}"
+        ops.append(f"BT /F1 {font_size} Tf 24 {text_y} Td ({line}) Tj ET")
+        text_y -= 22 if index == 0 else 14
+
+    stream = '\n'.join(ops).encode('latin-1')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width} {page_height}] '
+        '/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>'.encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream',
+    ]
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
+
+
+class RenderCache:
+    """Disk cache for rendered artifacts, bounded in total size with least-recently-used eviction."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._approx_bytes = None # Lazily measured, then tracked per write
+        self._lock = threading.Lock()
+
+    def path_for(self, ticket_uuid, content_hash, fmt):
+        return os.path.join(self.directory, ticket_uuid, f"{content_hash}.{fmt}")
+
+    def get(self, path):
+        """Returns the cached bytes, or None on a miss."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path) # mtime doubles as "last used" for eviction
+        except OSError:
+            return None
+        return data
+
+    def put(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path) # Readers never see a half-written file
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += len(data)
+            if self._approx_bytes is None or self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes least recently used files until the cache is below 90% of its limit."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file_path))
+
+        total = sum(size for _, size, _ in files)
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            for _, size, file_path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(file_path)
+                    total -= size
+                    os.rmdir(os.path.dirname(file_path)) # Only succeeds once a ticket's directory is empty
+                except OSError:
+                    pass
+        self._approx_bytes = total
+
+
+render_cache = RenderCache(TICKET_RENDER_CACHE_DIR, TICKET_RENDER_CACHE_MAX_BYTES)
+
+
+def render_ticket(ticket_uuid, qr_content, fmt, details=None):
+    """
+    Returns (data, content_hash) of the rendered artifact, rendering it only on a cache miss.
+    fmt is 'png', 'svg' or 'pdf'; details (label, value lines) are only used for the PDF.
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported format '{fmt}'.")
+
+    fingerprint = repr((RENDER_VERSION, fmt, qr_content, details if fmt == 'pdf' else None))
+    content_hash = hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+    path = render_cache.path_for(ticket_uuid, content_hash, fmt)
+
+    data = render_cache.get(path)
+    if data is None:
+        matrix = _qr_matrix(qr_content)
+        if fmt == 'png':
+            data = render_png(matrix)
+        elif fmt == 'svg':
+            data = render_svg(matrix)
+        else:
+            data = render_pdf(matrix, details or [])
+        render_cache.put(path, data)
+
+    return data, content_hash
+
+
+RENDER_CACHE_CONTROL = 'private, no-cache'
+
+
+def render_response(data, content_hash, fmt, filename=None):
+    """
+    HTTP response for a rendered artifact, or a bodyless 304 if the client's If-None-Match
+    matches. Both carry the ETag and Cache-Control so the stored copy stays revalidatable.
+    """
+    if request.if_none_match.contains(content_hash):
+        response = make_response('', 304)
+    else:
+        response = make_response(data)
+        response.headers['Content-Type'] = CONTENT_TYPES[fmt]
+        if filename:
+            response.headers['Content-Disposition'] = f'inline; filename="{filename}"'
+    response.set_etag(content_hash)
+    response.headers['Cache-Control'] = RENDER_CACHE_CONTROL
+    return response
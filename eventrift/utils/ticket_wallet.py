@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.models.ticket_attendance import Ticket, Attendance
+from app.models.event import Event
+from app.utils.conditional import aggregate_version
+
+# A user's tickets ("wallet"), newest first. Relationships are eager loaded so the number of SQL
+# statements for a page (count, page, events, users) stays the same however many tickets it has.
+
+
+def wallet_query(user_id, upcoming=False):
+    """The user's tickets with attendance, event and user loaded; upcoming=True keeps events not yet started."""
+    query = Ticket.query.filter_by(user_id=user_id)
+    if upcoming:
+        # Stays on the (user_id, event_id) index instead of joining every event row
+        upcoming_events = select(Event.id).where(Event.date_time >= datetime.utcnow())
+        query = query.filter(Ticket.event_id.in_(upcoming_events))
+    return query.options(
+        joinedload(Ticket.attendance),
+        selectinload(Ticket.event),
+        selectinload(Ticket.user)
+    ).order_by(Ticket.id.desc())
+
+
+def wallet_version(user_id, upcoming=False):
+    """Data version of the wallet for conditional GETs (see utils/conditional.py)."""
+    # Check-ins only touch Attendance and the tickets embed event details, so both timestamps are part of the version
+    query = Ticket.query.filter_by(user_id=user_id).outerjoin(Attendance).join(Event, Event.id == Ticket.event_id)
+    version = aggregate_version(query, Ticket.updated_at, Attendance.checked_in_at, Event.updated_at)
+    if upcoming:
+        # The upcoming filter depends on the clock: the version moves on when the next of these events starts
+        next_start = (
+            db.session.query(func.min(Event.date_time))
+            .filter(Event.id.in_(select(Ticket.event_id).where(Ticket.user_id == user_id)), Event.date_time >= datetime.utcnow())
+            .scalar()
+        )
+        version += (next_start,)
+    return version
@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from flask import Flask
+from sqlalchemy import event as sa_event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Local files (render cache, live check-in journals, token store) stay out of the working tree
+os.environ.setdefault('TICKET_RENDER_CACHE_DIR', tempfile.mkdtemp(prefix='eventrift-render-'))
+os.environ.setdefault('LIVE_CHECKIN_DIR', tempfile.mkdtemp(prefix='eventrift-live-'))
+os.environ.setdefault('RECONCILE_LOCK_PATH', os.path.join(tempfile.mkdtemp(prefix='eventrift-lock-'), 'reconcile.lock'))
+os.environ.setdefault('DARAJA_TOKEN_STORE', 'memory')
+
+# The package modules import each other as `app` (the directory was renamed to eventrift/ for
+# deployment, see DEPLOYMENT.md), so load them under that name.
+import eventrift
+sys.modules['app'] = eventrift
+from app.extensions import db
+eventrift.db = db
+
+from app.models.user import User
+from app.models.event import Event
+from app.models.event_category import EventCategory
+from app.models.event_stats import EventStats
+from app.models.ticket_attendance import Ticket, Attendance
+from app.models.ticket_inventory import EventInventory, TicketReservation
+from app.models.payment import Payment, ProcessedCallback
+from app.models.stall_booking import StallType, StallPayment, StallBooking
+from app.models.callback_outbox import CallbackOutbox
+from app.models.checkin_log import CheckInEvent, CheckInRollup
+from app.utils.event_search import ensure_search_index
+
+# TEST_DATABASE_URL runs the suite against Postgres; the default is a SQLite file per test
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+def _sqlite_transactions(engine):
+    """
+    pysqlite starts transactions lazily and releases SAVEPOINTs as commits; the inventory and
+    payment code relies on real nested transactions. BEGIN IMMEDIATE also takes the write lock
+    up front so concurrent test threads queue on the busy timeout instead of deadlocking.
+    """
+    @sa_event.listens_for(engine, 'connect')
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @sa_event.listens_for(engine, 'begin')
+    def _begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+@pytest.fixture
+def flask_app(tmp_path):
+    flask_app = Flask(__name__)
+    flask_app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=TEST_DATABASE_URL or f"sqlite:///{tmp_path / 'test.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={} if TEST_DATABASE_URL else {'connect_args': {'timeout': 30}},
+        JWT_SECRET_KEY='test-secret-key-with-enough-length',
+    )
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            _sqlite_transactions(db.engine)
+        db.create_all()
+        ensure_search_index() # Done once at startup by create_app
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(flask_app):
+    user = User(email='goer@example.com', username='goer', role='Goer')
+    user.password_hash = 'secret'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def make_event(flask_app, user):
+    def make_event(**values):
+        values.setdefault('name', 'Nairobi Jazz Night')
+        values.setdefault('description', 'Live music')
+        values.setdefault('location', 'Nairobi')
+        values.setdefault('date_time', datetime_in(days=7))
+        values.setdefault('ticket_price', 1000)
+        values.setdefault('capacity', 100)
+        values.setdefault('is_published', True)
+        event = Event(organizer_id=user.id, **values)
+        db.session.add(event)
+        db.session.commit()
+        return event
+    return make_event
+
+
+def datetime_in(**delta):
+    from datetime import datetime, timedelta
+    return datetime.utcnow() + timedelta(**delta)
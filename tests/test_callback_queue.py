@@ -0,0 +1,117 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import db
+from app.models.callback_outbox import CallbackOutbox
+from app.models.payment import Payment
+from app.utils import callback_queue
+from app.utils.callback_queue import enqueue_callback, process_batch, requeue_dead_callbacks
+
+
+def _stk_body(checkout_request_id, result_code=0):
+    body = {'Body': {'stkCallback': {
+        'MerchantRequestID': '29115-34620561-1',
+        'CheckoutRequestID': checkout_request_id,
+        'ResultCode': result_code,
+        'ResultDesc': 'The service request is processed successfully.',
+    }}}
+    if result_code == 0:
+        body['Body']['stkCallback']['CallbackMetadata'] = {'Item': [
+            {'Name': 'Amount', 'Value': 2000},
+            {'Name': 'MpesaReceiptNumber', 'Value': f"R{checkout_request_id[-6:].upper()}"},
+            {'Name': 'TransactionDate', 'Value': 20260314180102},
+            {'Name': 'PhoneNumber', 'Value': 254700000000},
+        ]}
+    return json.dumps(body)
+
+
+def _enqueue(checkout_request_id, result_code=0):
+    enqueue_callback('ticket', _stk_body(checkout_request_id, result_code), checkout_request_id)
+    return CallbackOutbox.query.filter_by(checkout_request_id=checkout_request_id).order_by(CallbackOutbox.id.desc()).first().id
+
+
+def _pending_payment(event, user, checkout_request_id):
+    db.session.add(Payment(
+        user_id=user.id, event_id=event.id, quantity=2, amount=2000, phone_number='254700000000',
+        checkout_request_id=checkout_request_id, status='PENDING'
+    ))
+    db.session.commit()
+
+
+def _entry(entry_id):
+    db.session.expire_all()
+    return db.session.get(CallbackOutbox, entry_id)
+
+
+def _make_due(entry_id):
+    db.session.execute(update(CallbackOutbox).where(CallbackOutbox.id == entry_id).values(next_attempt_at=datetime.utcnow()))
+    db.session.commit()
+
+
+def test_stored_callbacks_are_applied_once(make_event, user):
+    _pending_payment(make_event(), user, 'ws_CO_queued')
+    first, retried = _enqueue('ws_CO_queued'), _enqueue('ws_CO_queued')
+
+    assert process_batch() == 2
+    assert process_batch() == 0
+
+    assert [(_entry(i).status, _entry(i).outcome, _entry(i).attempts) for i in (first, retried)] == [
+        ('DONE', 'paid', 1), ('DONE', 'duplicate', 1)
+    ]
+    assert Payment.query.filter_by(checkout_request_id='ws_CO_queued').one().status == 'PAID'
+
+
+def test_failing_callback_backs_off_then_is_dead_lettered(make_event, user, monkeypatch):
+    monkeypatch.setattr(callback_queue, 'CALLBACK_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(callback_queue, 'CALLBACK_RETRY_BACKOFF', 10)
+    entry_id = _enqueue('ws_CO_early') # Arrived before its payment was saved
+
+    backoffs = []
+    for attempt in (1, 2):
+        before = datetime.utcnow()
+        assert process_batch() == 1
+        entry = _entry(entry_id)
+        assert (entry.status, entry.attempts, entry.locked_at) == ('PENDING', attempt, None)
+        assert 'ws_CO_early' in entry.last_error
+        backoffs.append(round((entry.next_attempt_at - before).total_seconds()))
+        assert process_batch() == 0 # Not due until the backoff has passed
+        _make_due(entry_id)
+
+    assert backoffs == [10, 20]
+
+    assert process_batch() == 1
+    assert (_entry(entry_id).status, _entry(entry_id).attempts) == ('DEAD', 3)
+    _make_due(entry_id)
+    assert process_batch() == 0 # Dead letters are never claimed
+
+    # Once the payment exists, a requeued callback gets a fresh attempt budget and applies
+    _pending_payment(make_event(), user, 'ws_CO_early')
+    assert requeue_dead_callbacks() == 1
+    assert process_batch() == 1
+    entry = _entry(entry_id)
+    assert (entry.status, entry.outcome, entry.attempts) == ('DONE', 'paid', 1)
+
+
+def test_rows_of_a_crashed_worker_are_reclaimed_after_the_lease(make_event, user):
+    _pending_payment(make_event(), user, 'ws_CO_crashed')
+    entry_id = _enqueue('ws_CO_crashed')
+    lease = timedelta(seconds=callback_queue.CALLBACK_LEASE_SECONDS)
+
+    def claimed_by_a_worker(ago):
+        db.session.execute(
+            update(CallbackOutbox).where(CallbackOutbox.id == entry_id)
+            .values(status='PROCESSING', attempts=1, locked_at=datetime.utcnow() - ago)
+        )
+        db.session.commit()
+
+    claimed_by_a_worker(lease - timedelta(seconds=5))
+    assert process_batch() == 0 # Its worker may still be running it
+    assert _entry(entry_id).status == 'PROCESSING'
+
+    claimed_by_a_worker(lease + timedelta(seconds=5))
+    assert process_batch() == 1
+
+    entry = _entry(entry_id)
+    assert (entry.status, entry.outcome, entry.attempts, entry.locked_at) == ('DONE', 'paid', 2, None)
@@ -0,0 +1,135 @@
+import uuid
+from datetime import datetime
+
+from app import db
+from app.models.checkin_log import CheckInEvent, CheckInRollup
+from app.utils.checkin_log import (
+    RejectedScanLog, record_scans, scan_entry, arrival_histogram,
+    OUTCOME_CHECKED_IN, OUTCOME_DUPLICATE, OUTCOME_REJECTED
+)
+
+DOORS_OPEN = datetime(2026, 3, 14, 18, 0)
+
+
+def _at(minute, second=0):
+    return DOORS_OPEN.replace(minute=minute, second=second)
+
+
+def _scan(event, outcome, minute, gate_id='north', second=0, user=None):
+    ticket_uuid = str(uuid.uuid4()) if outcome != OUTCOME_REJECTED else None
+    return scan_entry(event.id, ticket_uuid, outcome, _at(minute, second), gate_id, user.id if user else None)
+
+
+def test_record_scans_logs_every_scan_and_counts_it_into_its_minute(make_event, user):
+    event = make_event()
+    record_scans([
+        _scan(event, OUTCOME_CHECKED_IN, 1, second=5, user=user),
+        _scan(event, OUTCOME_CHECKED_IN, 1, second=50, user=user),
+        _scan(event, OUTCOME_DUPLICATE, 1, second=55, user=user),
+        _scan(event, OUTCOME_CHECKED_IN, 1, gate_id=None, user=user),
+        _scan(event, OUTCOME_REJECTED, 2, user=user),
+    ])
+    db.session.commit()
+
+    assert CheckInEvent.query.filter_by(event_id=event.id).count() == 5
+    rollups = {
+        (row.bucket_start, row.gate_id): (row.checked_in, row.duplicates, row.rejected)
+        for row in CheckInRollup.query.filter_by(event_id=event.id)
+    }
+    assert rollups == {
+        (_at(1), 'north'): (2, 1, 0),
+        (_at(1), ''): (1, 0, 0),
+        (_at(2), 'north'): (0, 0, 1),
+    }
+
+
+def test_record_scans_adds_to_existing_rollup_rows(make_event):
+    event = make_event()
+    record_scans([_scan(event, OUTCOME_CHECKED_IN, 3)])
+    db.session.commit()
+    record_scans([_scan(event, OUTCOME_CHECKED_IN, 3, second=30), _scan(event, OUTCOME_DUPLICATE, 3)])
+    db.session.commit()
+
+    row = db.session.get(CheckInRollup, (event.id, _at(3), 'north'))
+    assert (row.checked_in, row.duplicates, row.rejected) == (2, 1, 0)
+
+
+def test_rejected_scans_without_an_event_stay_in_the_raw_log_only(flask_app):
+    record_scans([scan_entry(None, None, OUTCOME_REJECTED, _at(0), reason='Invalid signature.')])
+    db.session.commit()
+
+    assert CheckInEvent.query.filter_by(event_id=None).one().reason == 'Invalid signature.'
+    assert CheckInRollup.query.count() == 0
+
+
+def test_arrival_histogram_merges_minutes_into_aligned_buckets(make_event):
+    event = make_event()
+    other_event = make_event(name='Other')
+    record_scans(
+        [_scan(event, OUTCOME_CHECKED_IN, minute) for minute in (1, 2, 2, 4, 6)]
+        + [_scan(event, OUTCOME_CHECKED_IN, 2, gate_id='south'), _scan(event, OUTCOME_REJECTED, 7, gate_id='south')]
+        + [_scan(other_event, OUTCOME_CHECKED_IN, 1)]
+    )
+    db.session.commit()
+
+    histogram = arrival_histogram(event.id, bucket_minutes=5)
+
+    assert histogram['buckets'] == [
+        {'start': _at(0).isoformat(), 'checked_in': 5, 'duplicates': 0, 'rejected': 0},
+        {'start': _at(5).isoformat(), 'checked_in': 1, 'duplicates': 0, 'rejected': 1},
+    ]
+    assert histogram['gates'] == [
+        {'gate_id': 'north', 'checked_in': 5, 'duplicates': 0, 'rejected': 0, 'peak_per_minute': 2},
+        {'gate_id': 'south', 'checked_in': 1, 'duplicates': 0, 'rejected': 1, 'peak_per_minute': 1},
+    ]
+
+
+def test_arrival_histogram_filters_by_gate_and_time_range(make_event):
+    event = make_event()
+    record_scans([_scan(event, OUTCOME_CHECKED_IN, minute, gate_id=gate) for minute in (1, 2, 3) for gate in ('north', 'south')])
+    db.session.commit()
+
+    histogram = arrival_histogram(event.id, gate_id='south', since=_at(2), until=_at(3))
+
+    assert histogram['buckets'] == [{'start': _at(2).isoformat(), 'checked_in': 1, 'duplicates': 0, 'rejected': 0}]
+    assert [gate['gate_id'] for gate in histogram['gates']] == ['south']
+
+
+def test_rejected_scans_are_buffered_until_the_flusher_writes_them(flask_app, make_event):
+    event = make_event()
+    scan_log = RejectedScanLog(interval=3600, batch_size=2)
+    scan_log.add([_scan(event, OUTCOME_REJECTED, 1) for _ in range(3)])
+
+    assert CheckInEvent.query.count() == 0 # Nothing written on the request thread
+    db.session.close() # The flusher writes through its own session
+    assert scan_log.flush() == 2
+    scan_log.stop()
+
+    assert scan_log.pending() == 0
+    assert CheckInEvent.query.filter_by(outcome=OUTCOME_REJECTED).count() == 3
+    assert db.session.get(CheckInRollup, (event.id, _at(1), 'north')).rejected == 3
+
+
+def test_failed_flush_keeps_the_batch_for_the_next_tick(flask_app, make_event):
+    event = make_event()
+    scan_log = RejectedScanLog(interval=3600)
+    scan_log.add([_scan(event, OUTCOME_REJECTED, 1), scan_entry(event.id, None, 'UNKNOWN_OUTCOME', _at(1))])
+    db.session.close()
+
+    assert scan_log.flush() == 0
+    assert scan_log.pending() == 2
+    scan_log._entries.pop() # Drop the entry that cannot be written
+    scan_log.stop()
+
+    assert scan_log.pending() == 0
+    assert CheckInEvent.query.count() == 1
+
+
+def test_buffer_drops_the_oldest_entries_past_its_limit(flask_app, make_event):
+    event = make_event()
+    scan_log = RejectedScanLog(interval=3600, limit=2)
+    scan_log.add([_scan(event, OUTCOME_REJECTED, minute) for minute in (1, 2, 3)])
+    db.session.close()
+    scan_log.stop()
+
+    assert sorted(row.bucket_start for row in CheckInRollup.query) == [_at(2), _at(3)]
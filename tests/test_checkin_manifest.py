@@ -0,0 +1,83 @@
+import base64
+import bisect
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.checkin_manifest import build_manifest, verify_manifest, manifest_public_key, sign_manifest, _load_signing_key
+
+
+def _ticket(event, user, status='PAID', checked_in=None):
+    ticket = Ticket(user_id=user.id, event_id=event.id, status=status)
+    db.session.add(ticket)
+    db.session.flush()
+    if checked_in is not None:
+        db.session.add(Attendance(ticket_id=ticket.id, is_checked_in=checked_in, checked_in_at=datetime(2026, 3, 14, 18) if checked_in else None))
+    return ticket.uuid
+
+
+def _scanner_lookup(manifest, ticket_uuid):
+    """What a scanner does offline: binary-search the sorted UUIDs, then read the ticket's bit."""
+    tickets = base64.b64decode(manifest['tickets'])
+    bitmap = base64.b64decode(manifest['checked_in'])
+    keys = [tickets[i:i + 16] for i in range(0, len(tickets), 16)]
+    key = uuid.UUID(ticket_uuid).bytes
+    index = bisect.bisect_left(keys, key)
+    if index == len(keys) or keys[index] != key:
+        return None
+    return bool(bitmap[index // 8] >> (index % 8) & 1)
+
+
+def test_manifest_lists_paid_tickets_with_their_check_in_bit(make_event, user):
+    event, other_event = make_event(), make_event(name='Other Night')
+    checked_in = [_ticket(event, user, checked_in=True) for _ in range(5)]
+    not_checked_in = [_ticket(event, user, checked_in=False) for _ in range(4)] + [_ticket(event, user) for _ in range(4)]
+    left_out = [_ticket(event, user, status='PENDING'), _ticket(event, user, status='CANCELLED'), _ticket(other_event, user)]
+    db.session.commit()
+
+    manifest = build_manifest(event.id)
+
+    assert (manifest['event_id'], manifest['count']) == (event.id, 13)
+    assert len(base64.b64decode(manifest['tickets'])) == 13 * 16
+    assert len(base64.b64decode(manifest['checked_in'])) == 2 # 13 bits
+    assert {ticket_uuid: _scanner_lookup(manifest, ticket_uuid) for ticket_uuid in checked_in + not_checked_in + left_out} == {
+        **{ticket_uuid: True for ticket_uuid in checked_in},
+        **{ticket_uuid: False for ticket_uuid in not_checked_in},
+        **{ticket_uuid: None for ticket_uuid in left_out},
+    }
+
+
+def test_empty_manifest(make_event):
+    manifest = build_manifest(make_event().id)
+
+    assert (manifest['count'], manifest['tickets'], manifest['checked_in']) == (0, '', '')
+    assert verify_manifest(manifest)
+
+
+def test_scanners_verify_with_the_public_key_only(make_event, user):
+    event = make_event()
+    ticket_uuid = _ticket(event, user, checked_in=True)
+    db.session.commit()
+    manifest = build_manifest(event.id)
+
+    assert verify_manifest(manifest, public_key=manifest_public_key())
+
+    # Clearing a check-in bit would let the ticket in twice
+    tampered = dict(manifest, checked_in=base64.b64encode(b'\x00').decode())
+    assert (_scanner_lookup(manifest, ticket_uuid), _scanner_lookup(tampered, ticket_uuid)) == (True, False)
+    assert not verify_manifest(tampered)
+
+    # A manifest signed with any other key is refused
+    forged = dict(manifest, signature=sign_manifest(manifest, _load_signing_key(base64.b64encode(os.urandom(32)).decode())))
+    assert not verify_manifest(forged)
+    assert not verify_manifest(dict(manifest, signature='not base64!'))
+
+
+@pytest.mark.parametrize('encoded', ['short', base64.b64encode(b'x' * 31).decode()])
+def test_malformed_signing_key_fails_at_startup(encoded):
+    with pytest.raises(RuntimeError, match='32-byte Ed25519'):
+        _load_signing_key(encoded)
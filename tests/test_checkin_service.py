@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from app import db
+from app.models.checkin_log import CheckInEvent
+from app.models.event_stats import EventStats
+from app.models.ticket_attendance import Ticket
+from app.utils.checkin_service import check_in_batch
+
+
+def _tickets(event, user, count, status='PAID'):
+    tickets = [Ticket(user_id=user.id, event_id=event.id, status=status) for _ in range(count)]
+    db.session.add_all(tickets)
+    db.session.commit()
+    return [ticket.uuid for ticket in tickets]
+
+
+def _at(minute):
+    return datetime(2026, 3, 14, 18, minute)
+
+
+def _entry(ticket_uuid):
+    db.session.expire_all()
+    attendance = Ticket.query.filter_by(uuid=ticket_uuid).one().attendance
+    return attendance.is_checked_in, attendance.checked_in_at
+
+
+def _checked_in_count(event_id):
+    return db.session.get(EventStats, event_id).checked_in_count
+
+
+def _logged_outcomes():
+    return [row.outcome for row in CheckInEvent.query.order_by(CheckInEvent.id)]
+
+
+def test_duplicates_within_a_batch_admit_the_earliest_scan_once(make_event, user):
+    event = make_event()
+    event_id = event.id
+    ticket_uuid, = _tickets(event, user, 1)
+
+    # Scanners upload out of order; the earliest scan is the admitting one whatever its position
+    results = check_in_batch([(ticket_uuid, _at(5)), (ticket_uuid, _at(1)), (ticket_uuid, _at(3))], user.id, event_id=event_id)
+
+    assert [result['status'] for result in results] == ['duplicate', 'checked_in', 'duplicate']
+    assert {result['checked_in_at'] for result in results} == {_at(1).isoformat()}
+    assert _entry(ticket_uuid) == (True, _at(1))
+    assert _checked_in_count(event_id) == 1
+    assert _logged_outcomes() == ['DUPLICATE', 'CHECKED_IN', 'DUPLICATE']
+
+
+def test_an_earlier_offline_scan_moves_the_entry_time_back(make_event, user):
+    event = make_event()
+    event_id = event.id
+    ticket_uuid, = _tickets(event, user, 1)
+    assert check_in_batch([(ticket_uuid, _at(10))], user.id, event_id=event_id)[0]['status'] == 'checked_in'
+
+    # A gate that was offline saw the ticket first
+    earlier, = check_in_batch([(ticket_uuid, _at(2))], user.id, event_id=event_id, gate_id='south')
+    assert (earlier['status'], earlier['checked_in_at'], earlier['resolved']) == ('checked_in', _at(2).isoformat(), 'earliest_scan_wins')
+
+    later, = check_in_batch([(ticket_uuid, _at(20))], user.id, event_id=event_id)
+    assert (later['status'], later['checked_in_at']) == ('duplicate', _at(2).isoformat())
+
+    assert _entry(ticket_uuid) == (True, _at(2))
+    assert _checked_in_count(event_id) == 1 # The ticket was admitted once, whichever scan came first
+    assert _logged_outcomes() == ['CHECKED_IN', 'DUPLICATE', 'DUPLICATE']
+
+
+def test_batch_rejects_unreadable_foreign_and_unpaid_tickets_in_place(make_event, user):
+    event, other_event = make_event(), make_event(name='Other Night')
+    event_id = event.id
+    good, = _tickets(event, user, 1)
+    unpaid, = _tickets(event, user, 1, status='PENDING')
+    foreign, = _tickets(other_event, user, 1)
+
+    results = check_in_batch(
+        [(None, _at(1)), (foreign, _at(1)), (good, _at(2)), (unpaid, _at(3)), ('00000000-0000-4000-8000-000000000000', _at(4))],
+        user.id, event_id=event_id
+    )
+
+    assert [(result['status'], result.get('reason')) for result in results] == [
+        ('rejected', 'Invalid QR code or scan data.'),
+        ('rejected', 'Ticket not found.'),
+        ('checked_in', None),
+        ('rejected', "Ticket status is 'PENDING'."),
+        ('rejected', 'Ticket not found.'),
+    ]
+    assert _checked_in_count(event_id) == 1
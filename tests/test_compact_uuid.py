@@ -0,0 +1,90 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.commands import migrate_ticket_uuids_command
+from app.models.ticket_attendance import Ticket
+
+
+def _ticket(event, user, ticket_uuid=None):
+    ticket = Ticket(user_id=user.id, event_id=event.id, status='PAID', uuid=ticket_uuid)
+    db.session.add(ticket)
+    db.session.commit()
+    return ticket.id
+
+
+def _stored_type(ticket_id):
+    return db.session.execute(text("SELECT typeof(uuid) FROM tickets WHERE id = :id"), {'id': ticket_id}).scalar()
+
+
+def test_uuid_round_trips_as_the_canonical_string(make_event, user):
+    event = make_event()
+    ticket_uuid = str(uuid.uuid4())
+    ticket_id = _ticket(event, user, ticket_uuid.upper())
+    generated_id = _ticket(event, user)
+    db.session.expunge_all()
+
+    assert db.session.get(Ticket, ticket_id).uuid == ticket_uuid
+    assert str(uuid.UUID(db.session.get(Ticket, generated_id).uuid)) == db.session.get(Ticket, generated_id).uuid
+    if db.engine.dialect.name == 'sqlite':
+        assert _stored_type(ticket_id) == 'blob'
+        assert len(db.session.execute(text("SELECT uuid FROM tickets WHERE id = :id"), {'id': ticket_id}).scalar()) == 16
+
+
+def test_lookups_accept_strings_and_uuid_objects(make_event, user):
+    event = make_event()
+    ticket_uuid = str(uuid.uuid4())
+    ticket_id = _ticket(event, user, ticket_uuid)
+
+    assert Ticket.query.filter_by(uuid=ticket_uuid).one().id == ticket_id
+    assert Ticket.query.filter_by(uuid=uuid.UUID(ticket_uuid)).one().id == ticket_id
+    assert Ticket.query.filter(Ticket.uuid.in_([ticket_uuid.upper()])).one().id == ticket_id
+
+
+def test_malformed_lookup_matches_nothing(make_event, user):
+    _ticket(make_event(), user)
+
+    assert Ticket.query.filter_by(uuid='not-a-uuid').first() is None
+    assert Ticket.query.filter_by(uuid='').first() is None
+
+
+def _invoke(flask_app, *args):
+    db.session.close() # The command runs in its own app context
+    flask_app.cli.add_command(migrate_ticket_uuids_command)
+    return flask_app.test_cli_runner().invoke(args=['migrate-ticket-uuids', *args])
+
+
+def test_migration_converts_text_rows_in_batches(flask_app, make_event, user):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('Postgres converts the column type in one ALTER TABLE')
+    event = make_event()
+    legacy = {}
+    for _ in range(5):
+        ticket_uuid = str(uuid.uuid4())
+        ticket_id = _ticket(event, user, ticket_uuid)
+        db.session.execute(text("UPDATE tickets SET uuid = :value WHERE id = :id"), {'value': ticket_uuid, 'id': ticket_id})
+        legacy[ticket_id] = ticket_uuid
+    converted_id = _ticket(event, user)
+    db.session.commit()
+
+    # Text rows still read back, but lookups bind 16-byte values and miss them
+    some_id, some_uuid = next(iter(legacy.items()))
+    assert db.session.get(Ticket, some_id).uuid == some_uuid
+    assert Ticket.query.filter_by(uuid=some_uuid).first() is None
+
+    check = _invoke(flask_app, '--check')
+    assert check.exit_code == 1
+    assert check.output.strip() == '5 ticket uuids still stored as text.'
+
+    result = _invoke(flask_app, '--batch-size', '2')
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == 'Converted 5 ticket uuids to 16-byte binary.'
+
+    assert {_stored_type(ticket_id) for ticket_id in [*legacy, converted_id]} == {'blob'}
+    for ticket_id, ticket_uuid in legacy.items():
+        assert Ticket.query.filter_by(uuid=ticket_uuid).one().id == ticket_id
+
+    assert _invoke(flask_app, '--check').exit_code == 0
+    assert _invoke(flask_app).output.strip() == 'Converted 0 ticket uuids to 16-byte binary.'
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+
+from app import db
+from app.models.event import Event
+from app.models.event_category import EventCategory
+from app.models.user import User
+from app.utils.event_filters import filtered_events
+from tests.conftest import datetime_in
+
+EVENTS = 5000
+
+
+@pytest.fixture
+def seeded_events(flask_app, user):
+    """5000 events over a year, 20 categories, 50 organizers, about 90% published."""
+    random.seed(7)
+    db.session.execute(insert(EventCategory), [{'name': f"Category {i}"} for i in range(20)])
+    db.session.execute(insert(User), [
+        {'email': f"organizer{i}@example.com", 'username': f"organizer{i}", '_password_hash': 'x', 'role': 'Organizer'}
+        for i in range(50)
+    ])
+    category_ids = [row[0] for row in db.session.query(EventCategory.id)]
+    organizer_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'Organizer')]
+    db.session.execute(insert(Event), [
+        {
+            'organizer_id': random.choice(organizer_ids),
+            'category_id': random.choice(category_ids),
+            'name': f"Event {i}",
+            'description': 'Seeded',
+            'location': random.choice(['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret']),
+            'date_time': datetime_in(days=random.randint(-30, 330), minutes=random.randint(0, 1440)),
+            'ticket_price': 500,
+            'capacity': 200,
+            'is_published': random.random() < 0.9,
+        }
+        for i in range(EVENTS)
+    ])
+    db.session.commit()
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(db.text('ANALYZE'))
+    else:
+        db.session.execute(db.text('ANALYZE events'))
+    db.session.commit()
+    return category_ids, organizer_ids
+
+
+def _plan(args):
+    """SQLite's EXPLAIN QUERY PLAN for the first page of the listing with these filters."""
+    query = filtered_events(MultiDict(args)).order_by(Event.date_time.asc(), Event.id.asc()).limit(13)
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return ' | '.join(row[-1] for row in rows)
+
+
+def _week():
+    return {'from': datetime_in(days=5).isoformat(), 'to': datetime_in(days=12).isoformat()}
+
+
+@pytest.mark.parametrize('filters, index', [
+    (lambda categories, organizers: {}, 'ix_events_is_published_date_time'),
+    (lambda categories, organizers: _week(), 'ix_events_is_published_date_time'),
+    (lambda categories, organizers: dict(_week(), location='Nairobi'), 'ix_events_is_published_date_time'),
+    (lambda categories, organizers: {'category_id': categories[3]}, 'ix_events_category_id_date_time'),
+    (lambda categories, organizers: dict(_week(), category_id=categories[3]), 'ix_events_category_id_date_time'),
+    (lambda categories, organizers: {'organizer_id': organizers[4]}, 'ix_events_organizer_id_date_time'),
+], ids=['published', 'date-window', 'date-window-location', 'category', 'category-date-window', 'organizer'])
+def test_listing_filters_use_their_index(flask_app, seeded_events, filters, index):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip("Plan assertions are written against SQLite's planner")
+
+    plan = _plan(filters(*seeded_events))
+
+    assert f"USING INDEX {index}" in plan, plan
+    assert 'SCAN events' not in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan # Rows come out in (date_time, id) order, no sort
+
+
+def test_filters_narrow_the_listing(flask_app, seeded_events):
+    category_ids, _ = seeded_events
+    args = dict(_week(), category_id=category_ids[3], location='nairobi')
+
+    events = filtered_events(MultiDict(args)).all()
+
+    assert events
+    for event in events:
+        assert event.is_published and event.category_id == category_ids[3] and event.location == 'Nairobi'
+        assert args['from'] <= event.date_time.isoformat() <= args['to']
+
+
+def test_malformed_date_is_rejected(flask_app):
+    with pytest.raises(ValueError):
+        filtered_events(MultiDict({'from': 'next friday'}))
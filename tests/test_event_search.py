@@ -0,0 +1,76 @@
+from app import db
+from app.commands import rebuild_search_index_command
+from app.models.event import Event
+from app.utils.event_search import search_event_ids, rebuild_search_index, FTS_TABLE
+from tests.conftest import datetime_in
+
+
+def _event(user, name, description='An evening out', location='Nairobi', is_published=True):
+    event = Event(
+        organizer_id=user.id, name=name, description=description, location=location,
+        date_time=datetime_in(days=7), ticket_price=1000, capacity=100, is_published=is_published
+    )
+    event.save() # Indexes the event in the same transaction
+    return event.id
+
+
+def test_name_matches_rank_above_location_and_description(user):
+    in_description = _event(user, 'Sunday Brunch', description='Brunch with a jazz trio')
+    in_name = _event(user, 'Jazz Night')
+    in_location = _event(user, 'Open Mic', location='Jazz Cafe, Westlands')
+    _event(user, 'Comedy Night')
+
+    assert [event_id for event_id, _ in search_event_ids('jazz')] == [in_name, in_location, in_description]
+
+
+def test_terms_are_prefix_matched_and_stemmed(user):
+    event_id = _event(user, 'Photography Workshop', description='Bring your cameras')
+
+    assert [event_id for event_id, _ in search_event_ids('photo')] == [event_id]
+    assert [event_id for event_id, _ in search_event_ids('camera workshops')] == [event_id]
+    assert search_event_ids('"') == []
+    assert search_event_ids('   ') == []
+
+
+def test_unpublished_events_never_take_places_within_the_limit(user):
+    for index in range(5):
+        _event(user, f"Jazz Jazz Jazz Rehearsal {index}", is_published=False)
+    published = [_event(user, 'Jazz Night'), _event(user, 'Brunch', description='Live jazz')]
+
+    ranked = search_event_ids('jazz', limit=2)
+
+    assert [event_id for event_id, _ in ranked] == published
+
+
+def test_saving_and_deleting_keep_the_index_current(user):
+    event_id = _event(user, 'Jazz Night')
+    event = db.session.get(Event, event_id)
+    event.name = 'Blues Night'
+    event.save()
+
+    assert search_event_ids('jazz') == []
+    assert [event_id for event_id, _ in search_event_ids('blues')] == [event_id]
+
+    event.delete()
+    assert search_event_ids('blues') == []
+
+
+def test_rebuild_repopulates_the_index(user):
+    ids = [_event(user, 'Jazz Night'), _event(user, 'Jazz Brunch')]
+    db.session.execute(db.text(f"DELETE FROM {FTS_TABLE}"))
+    db.session.commit()
+    assert search_event_ids('jazz') == []
+
+    assert rebuild_search_index() == 2
+    assert sorted(event_id for event_id, _ in search_event_ids('jazz')) == sorted(ids)
+
+
+def test_rebuild_command(flask_app, user):
+    _event(user, 'Jazz Night')
+    db.session.close() # The command runs in its own app context
+    flask_app.cli.add_command(rebuild_search_index_command)
+
+    result = flask_app.test_cli_runner().invoke(args=['rebuild-search-index'])
+
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == 'Search index rebuilt for 1 events.'
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from app import db
+from app.models.event_stats import EventStats
+from app.models.payment import Payment
+from app.utils.event_stats import record_tickets_sold, rebuild_event_stats
+from app.utils.payment_processing import finalize_payment
+from app.utils.ticket_issuance import issue_tickets
+
+
+def _pay(event, user, checkout_request_id, quantity, amount, succeeds=True):
+    db.session.add(Payment(
+        user_id=user.id, event_id=event.id, quantity=quantity, amount=amount, phone_number='254700000000',
+        checkout_request_id=checkout_request_id, status='PENDING'
+    ))
+    db.session.commit()
+    return finalize_payment({
+        'checkout_request_id': checkout_request_id,
+        'result_code': 0 if succeeds else 1032,
+        'result_desc': 'The service request is processed successfully.',
+        'mpesa_receipt_number': f"R{checkout_request_id[-8:].upper()}" if succeeds else None,
+        'transaction_date': None,
+    })
+
+
+def _stats(event_id):
+    db.session.expire_all()
+    stats = db.session.get(EventStats, event_id)
+    return (stats.tickets_sold, stats.revenue)
+
+
+def test_revenue_is_the_amount_paid_not_the_current_price(make_event, user):
+    event = make_event(ticket_price=1000, capacity=20)
+    event_id = event.id
+
+    assert _pay(event, user, 'ws_CO_early_bird', quantity=2, amount=1600) == 'paid' # Paid under an earlier price
+    event.ticket_price = 1500
+    db.session.commit()
+    assert _pay(event, user, 'ws_CO_full_price', quantity=1, amount=1500) == 'paid'
+    assert _pay(event, user, 'ws_CO_cancelled', quantity=4, amount=6000, succeeds=False) == 'failed'
+
+    issue_tickets(user.id, event_id, 3) # Complimentary
+    record_tickets_sold(event_id, 3)
+    db.session.commit()
+
+    assert _stats(event_id) == (6, Decimal('3100.00'))
+
+    # A rebuild from the stored payments agrees with the running counters
+    db.session.get(EventStats, event_id).revenue = 0
+    db.session.commit()
+    assert rebuild_event_stats(event_id) == 1
+    assert _stats(event_id) == (6, Decimal('3100.00'))
+
+
+def test_rebuild_of_an_event_with_only_comp_tickets(make_event, user):
+    event_id = make_event().id
+    issue_tickets(user.id, event_id, 2)
+    db.session.commit()
+
+    rebuild_event_stats()
+
+    assert _stats(event_id) == (2, Decimal('0.00'))
@@ -0,0 +1,129 @@
+import decimal
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from marshmallow import Schema, fields
+
+from app import db
+from app.models.stall_booking import StallType, StallPayment, StallBooking
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.fast_serializers import CompiledSchema
+
+
+class RowSchema(Schema):
+    id = fields.Integer()
+    name = fields.String()
+    price = fields.Decimal(places=2, as_string=True)
+    starts_at = fields.DateTime()
+    is_published = fields.Boolean()
+    extra = fields.Raw()
+
+
+@pytest.mark.parametrize('is_published', [True, False, 1, 0, None, 'yes'])
+def test_compiled_dump_matches_marshmallow(is_published):
+    row = SimpleNamespace(
+        id=7, name='Jazz Night', price=decimal.Decimal('1500.5'), starts_at=datetime(2026, 11, 6, 19, 30),
+        is_published=is_published, extra={'a': 1}
+    )
+    schema = RowSchema(many=True)
+
+    assert CompiledSchema(schema).dump([row, row]) == schema.dump([row, row])
+
+
+# The shipped ticket and stall booking schemas are flask-marshmallow auto schemas. These declare
+# the fields those schemas generate from the models, with the same Nested options.
+
+class AttendanceShapeSchema(Schema):
+    id = fields.Integer()
+    is_checked_in = fields.Boolean()
+    checked_in_at = fields.DateTime()
+    created_at = fields.DateTime()
+    checked_in_by_user = fields.Nested('UserSchema', only=('id', 'username'), required=False)
+
+
+class TicketShapeSchema(Schema):
+    id = fields.Integer()
+    status = fields.String()
+    ticket_type = fields.String()
+    created_at = fields.DateTime()
+    updated_at = fields.DateTime()
+    qr_code_content = fields.String(attribute='encoded_qr_data', dump_only=True)
+    user = fields.Nested('UserSchema', only=('id', 'username', 'email'))
+    event = fields.Nested('EventSchema', only=('id', 'name', 'date_time', 'location'))
+    attendance = fields.Nested(AttendanceShapeSchema, required=False)
+
+
+class StallTypeShapeSchema(Schema):
+    id = fields.Integer()
+    name = fields.String()
+    price = fields.Float()
+    size = fields.String()
+    description = fields.String()
+
+
+class StallPaymentShapeSchema(Schema):
+    amount = fields.Float()
+    phone_number = fields.String()
+    status = fields.String()
+    mpesa_receipt_number = fields.String()
+    transaction_date = fields.DateTime()
+    created_at = fields.DateTime()
+    updated_at = fields.DateTime()
+
+
+class StallBookingShapeSchema(Schema):
+    id = fields.Integer()
+    vendor_id = fields.Integer()
+    event_id = fields.Integer()
+    stall_type_id = fields.Integer()
+    payment_id = fields.Integer()
+    status = fields.String()
+    business_name = fields.String()
+    products_offered = fields.String()
+    stall_location = fields.String()
+    created_at = fields.DateTime()
+    stall_type = fields.Nested(StallTypeShapeSchema, only=('name', 'price', 'size'))
+    payment = fields.Nested(StallPaymentShapeSchema, only=('status', 'mpesa_receipt_number', 'amount'))
+
+
+def test_nested_ticket_dump_matches_marshmallow(make_event, user):
+    import app.schemas.user_schema # noqa: F401 Registers the schemas nested by name
+    import app.schemas.event_schema # noqa: F401
+
+    event = make_event()
+    checked_in = Ticket(user_id=user.id, event_id=event.id, status='PAID', ticket_type='VIP')
+    checked_in.attendance = Attendance(is_checked_in=True, checked_in_at=datetime(2026, 11, 6, 19, 45), checked_in_by_user_id=user.id)
+    not_checked_in = Ticket(user_id=user.id, event_id=event.id, status='PAID')
+    db.session.add_all([checked_in, not_checked_in])
+    db.session.commit()
+
+    tickets = Ticket.query.order_by(Ticket.id).all()
+    schema = TicketShapeSchema(many=True)
+    dumped = CompiledSchema(schema).dump(tickets)
+
+    assert dumped == schema.dump(tickets)
+    assert dumped[0]['event'] == {
+        'id': event.id, 'name': event.name, 'date_time': event.date_time.isoformat(), 'location': event.location
+    }
+    assert dumped[0]['attendance']['is_checked_in'] is True
+    assert dumped[1]['attendance'] is None
+
+
+def test_nested_stall_booking_dump_matches_marshmallow(make_event, user):
+    event = make_event()
+    stall_type = StallType(name='Food', price=5000.0, size='3m x 3m')
+    paid = StallPayment(amount=5000.0, phone_number='254700000000', status='PAID', mpesa_receipt_number='QGH7XYZ')
+    db.session.add_all([
+        StallBooking(vendor_id=user.id, event_id=event.id, stall_type=stall_type, payment=paid, status='CONFIRMED', business_name='Nyama Choma Co.'),
+        StallBooking(vendor_id=user.id, event_id=event.id, stall_type=stall_type, business_name='Chapati Hub', products_offered=None),
+    ])
+    db.session.commit()
+
+    bookings = StallBooking.query.order_by(StallBooking.id).all()
+    schema = StallBookingShapeSchema(many=True)
+    dumped = CompiledSchema(schema).dump(bookings)
+
+    assert dumped == schema.dump(bookings)
+    assert dumped[0]['payment'] == {'status': 'PAID', 'mpesa_receipt_number': 'QGH7XYZ', 'amount': 5000.0}
+    assert dumped[1]['payment'] is None
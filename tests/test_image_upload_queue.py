@@ -0,0 +1,70 @@
+from sqlalchemy import update
+
+from app import db
+from app.models.event import Event
+from app.utils.image_upload_queue import (
+    ImageUploadQueue, LocalStubUploadBackend, fail_stale_uploads,
+    IMAGE_STATUS_PENDING, IMAGE_STATUS_READY, IMAGE_STATUS_FAILED
+)
+from tests.conftest import datetime_in
+
+
+class FailingBackend:
+    def __init__(self):
+        self.calls = 0
+
+    def upload(self, image_bytes, filename):
+        self.calls += 1
+        raise ConnectionError('Cloudinary unreachable')
+
+
+def _status(event_id):
+    db.session.expire_all()
+    event = db.session.get(Event, event_id)
+    return event.image_status, event.image_url
+
+
+def _upload(flask_app, backend, event_id):
+    queue = ImageUploadQueue(backend, workers=1, max_attempts=3, backoff_seconds=0)
+    db.session.close() # The upload thread saves the event through its own session
+    try:
+        return queue.enqueue(event_id, b'poster bytes', 'poster.png').result(timeout=30)
+    finally:
+        queue.shutdown()
+
+
+def test_upload_marks_the_event_ready(flask_app, make_event, tmp_path):
+    event_id = make_event(image_status=IMAGE_STATUS_PENDING).id
+
+    image_url = _upload(flask_app, LocalStubUploadBackend(str(tmp_path)), event_id)
+
+    assert image_url.startswith(f"file://{tmp_path}") and image_url.endswith('.png')
+    assert _status(event_id) == (IMAGE_STATUS_READY, image_url)
+
+
+def test_upload_that_keeps_failing_marks_the_event_failed(flask_app, make_event):
+    event_id = make_event(image_status=IMAGE_STATUS_PENDING).id
+    backend = FailingBackend()
+
+    assert _upload(flask_app, backend, event_id) is None
+    assert backend.calls == 3
+    assert _status(event_id) == (IMAGE_STATUS_FAILED, None)
+
+
+def test_sweep_fails_only_uploads_pending_for_too_long(make_event):
+    lost = make_event(image_status=IMAGE_STATUS_PENDING).id
+    in_flight = make_event(image_status=IMAGE_STATUS_PENDING).id
+    done = make_event(image_status=IMAGE_STATUS_READY).id
+    db.session.execute(
+        update(Event).where(Event.id.in_([lost, done]))
+        .values(updated_at=datetime_in(hours=-1))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    assert fail_stale_uploads(older_than_minutes=15) == 1
+
+    assert [_status(event_id)[0] for event_id in (lost, in_flight, done)] == [
+        IMAGE_STATUS_FAILED, IMAGE_STATUS_PENDING, IMAGE_STATUS_READY
+    ]
+    assert fail_stale_uploads(older_than_minutes=15) == 0
@@ -0,0 +1,173 @@
+import glob
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils import live_checkin
+from app.utils.live_checkin import CheckInJournal, open_gate, close_gate, replay_dead_letters, LIVE_CHECKIN_DIR
+
+
+@pytest.fixture(autouse=True)
+def live_dir(monkeypatch):
+    """Empty journal directory, and a flusher thread that only runs when a test calls flush()."""
+    def clear():
+        for path in glob.glob(os.path.join(LIVE_CHECKIN_DIR, 'event_*')):
+            os.remove(path)
+    clear()
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_FLUSH_INTERVAL', 3600)
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_MAX_BACKOFF', 3600)
+    yield
+    clear()
+
+
+def _paid_tickets(event, user, count):
+    tickets = [Ticket(user_id=user.id, event_id=event.id, status='PAID') for _ in range(count)]
+    db.session.add_all(tickets)
+    db.session.commit()
+    return [ticket.uuid for ticket in tickets]
+
+
+def _checked_in(ticket_uuids):
+    return {
+        ticket.uuid: bool(ticket.attendance and ticket.attendance.is_checked_in)
+        for ticket in Ticket.query.filter(Ticket.uuid.in_(ticket_uuids))
+    }
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_reopening_the_gate_replays_check_ins_journaled_after_the_last_checkpoint(make_event, user):
+    event = make_event()
+    event_id = event.id
+    flushed, unflushed, also_unflushed, never_scanned = _paid_tickets(event, user, 4)
+
+    # A worker that died after flushing the first check-in, with a torn write at the end
+    dead_path = os.path.join(LIVE_CHECKIN_DIR, f"event_{event_id}.{_dead_pid()}.journal")
+    journal = CheckInJournal(dead_path)
+    first = journal.append(flushed, user.id, datetime(2026, 3, 14, 18, 1), 'north')
+    journal.checkpoint(first)
+    journal.append(unflushed, user.id, datetime(2026, 3, 14, 18, 2), 'north')
+    journal.append(also_unflushed, user.id, datetime(2026, 3, 14, 18, 3), 'south')
+    journal._file.write('{"seq": 4, "ticket_uu')
+    journal.close()
+
+    gate, replayed = open_gate(event_id)
+    try:
+        assert replayed == 2
+        assert not os.path.exists(dead_path)
+        assert _checked_in([flushed, unflushed, also_unflushed, never_scanned]) == {
+            flushed: False, # Covered by the checkpoint, so assumed written
+            unflushed: True,
+            also_unflushed: True,
+            never_scanned: False,
+        }
+        assert Attendance.query.filter(Attendance.is_checked_in.is_(True)).count() == 2
+
+        # The hot set is loaded after the replay
+        assert gate.scan(unflushed, user.id) == 'duplicate'
+        assert gate.scan(never_scanned, user.id) == 'checked_in'
+    finally:
+        db.session.close() # The flusher writes through its own session
+        close_gate(event_id)
+
+    assert _checked_in([never_scanned]) == {never_scanned: True}
+
+
+def test_journals_of_running_workers_are_left_to_them(make_event, user):
+    event = make_event()
+    event_id = event.id
+    ticket_uuid, = _paid_tickets(event, user, 1)
+    live_path = os.path.join(LIVE_CHECKIN_DIR, f"event_{event_id}.{os.getppid()}.journal")
+    journal = CheckInJournal(live_path)
+    journal.append(ticket_uuid, user.id, datetime(2026, 3, 14, 18, 1))
+    journal.close()
+
+    _, replayed = open_gate(event_id)
+    db.session.close()
+    close_gate(event_id)
+
+    assert replayed == 0
+    assert os.path.exists(live_path)
+
+
+def test_failing_flushes_back_off_then_dead_letter_the_batch(make_event, user, monkeypatch):
+    event = make_event()
+    event_id = event.id
+    ticket_uuids = _paid_tickets(event, user, 2)
+    gate, _ = open_gate(event_id)
+    for ticket_uuid in ticket_uuids:
+        assert gate.scan(ticket_uuid, user.id, 'north') == 'checked_in'
+    db.session.close()
+
+    write_check_ins = live_checkin._write_check_ins
+    def database_down(event_id, entries):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(live_checkin, '_write_check_ins', database_down)
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_MAX_BACKOFF', 5)
+
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_FLUSH_INTERVAL', 1) # The running flusher keeps waiting out its hour
+    assert gate.backoff() == 1
+    delays = []
+    for _ in range(3):
+        assert gate.flush() == 0
+        delays.append(gate.backoff())
+
+    assert delays == [2, 4, 1] # Capped retries, then reset once the batch is dead-lettered
+    assert list(gate._pending) == []
+    assert CheckInJournal.read_entries(gate.journal.path) == [] # Checkpointed past the dead letters
+
+    monkeypatch.setattr(live_checkin, '_write_check_ins', write_check_ins)
+    assert replay_dead_letters(event_id) == 2
+    assert replay_dead_letters(event_id) == 0
+    assert _checked_in(ticket_uuids) == {ticket_uuid: True for ticket_uuid in ticket_uuids}
+
+    db.session.close()
+    close_gate(event_id)
+
+
+def test_only_entries_that_still_fail_alone_are_dead_lettered(make_event, user, monkeypatch):
+    event = make_event()
+    event_id = event.id
+    good, poison = _paid_tickets(event, user, 2)
+    gate, _ = open_gate(event_id)
+    gate.scan(good, user.id)
+    gate.scan(poison, user.id)
+    db.session.close()
+
+    write_check_ins = live_checkin._write_check_ins
+    def reject_poison(event_id, entries):
+        if any(entry[0] == poison for entry in entries):
+            raise ValueError('cannot write this one')
+        write_check_ins(event_id, entries)
+    monkeypatch.setattr(live_checkin, '_write_check_ins', reject_poison)
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_MAX_ATTEMPTS', 1)
+
+    assert gate.flush() == 1
+
+    with open(live_checkin._dead_letter_path(event_id), encoding='utf-8') as f:
+        assert [line.count(poison) for line in f] == [1]
+    assert _checked_in([good, poison]) == {good: True, poison: False}
+
+    db.session.close()
+    close_gate(event_id)
+
+
+def test_memory_store_refuses_to_run_with_several_workers(monkeypatch):
+    monkeypatch.setattr(live_checkin, 'LIVE_CHECKIN_STORE', 'memory')
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+
+    with pytest.raises(RuntimeError):
+        live_checkin._new_store(1)
+
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    assert isinstance(live_checkin._new_store(1), live_checkin.MemoryHotSet)
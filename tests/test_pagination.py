@@ -0,0 +1,51 @@
+import pytest
+
+from app.models.event import Event
+from app.utils.pagination import offset_paginate, keyset_paginate
+from tests.conftest import datetime_in
+
+
+@pytest.fixture
+def listing(make_event):
+    for day in range(1, 6):
+        make_event(name=f"Night {day}", date_time=datetime_in(days=day))
+    return Event.query
+
+
+def _names(page):
+    return [event.name for event in page.items]
+
+
+@pytest.mark.parametrize('total_mode', ['none', 'approximate']) # No estimate on SQLite, so both skip the count
+def test_offset_pages_know_whether_more_follow_without_a_total(listing, total_mode):
+    pages = [offset_paginate(listing, Event, page, 2, total_mode=total_mode) for page in (1, 2, 3, 4)]
+
+    assert [_names(page) for page in pages] == [['Night 1', 'Night 2'], ['Night 3', 'Night 4'], ['Night 5'], []]
+    assert [(page.has_prev, page.has_next) for page in pages] == [(False, True), (True, True), (True, False), (True, False)]
+    assert [(page.total, page.pages) for page in pages] == [(None, None)] * 4
+
+
+def test_offset_page_with_an_exact_total(listing):
+    page = offset_paginate(listing, Event, 2, 2)
+
+    assert (page.page, page.total, page.pages, page.has_next, page.next_cursor) == (2, 5, 3, True, None)
+
+    # A page that ends exactly on the last row has nothing after it
+    assert offset_paginate(listing, Event, 1, 5).has_next is False
+
+
+def test_unknown_total_mode_is_rejected_in_both_modes(listing):
+    with pytest.raises(ValueError):
+        offset_paginate(listing, Event, 1, 2, total_mode='estimate')
+    with pytest.raises(ValueError):
+        keyset_paginate(listing, Event, 2, cursor='', total_mode='estimate')
+
+
+def test_cursor_pages_walk_the_listing(listing):
+    names, cursor = [], ''
+    while cursor is not None:
+        page = keyset_paginate(listing, Event, 2, cursor=cursor)
+        names += _names(page)
+        cursor = page.next_cursor
+
+    assert names == [f"Night {day}" for day in range(1, 6)]
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models.event_stats import EventStats
+from app.models.payment import Payment, ProcessedCallback
+from app.models.stall_booking import StallType, StallPayment, StallBooking
+from app.models.ticket_attendance import Ticket
+from app.models.ticket_inventory import EventInventory, TicketReservation
+from app.utils.payment_processing import finalize_payment, finalize_stall_payment
+from app.utils.ticket_inventory import reserve_tickets, attach_checkout
+
+RETRIES = 16
+
+
+def _held_payment(event, user, checkout_request_id, quantity=2):
+    reservation = reserve_tickets(event.id, user.id, quantity)
+    attach_checkout(reservation, checkout_request_id)
+    payment = Payment(
+        user_id=user.id, event_id=event.id, quantity=quantity, amount=quantity * 1000, phone_number='254700000000',
+        checkout_request_id=checkout_request_id, status='PENDING'
+    )
+    db.session.add(payment)
+    db.session.commit()
+    return payment.id
+
+
+def _callback(checkout_request_id, result_code=0):
+    return {
+        'checkout_request_id': checkout_request_id,
+        'result_code': result_code,
+        'result_desc': 'The service request is processed successfully.' if result_code == 0 else 'Request cancelled by user',
+        'mpesa_receipt_number': f"R{checkout_request_id[-8:].upper()}" if result_code == 0 else None,
+        'transaction_date': None,
+    }
+
+
+def _deliver_concurrently(flask_app, finalize, result, count=RETRIES):
+    """Delivers the same callback count times at once, each in its own app context and session."""
+    def deliver(_):
+        with flask_app.app_context():
+            try:
+                return finalize(dict(result))
+            finally:
+                db.session.remove()
+
+    db.session.close() # The test's own transaction would otherwise hold the SQLite write lock
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(deliver, range(count)))
+
+
+def _state(event_id, payment_id):
+    db.session.expire_all()
+    inventory = db.session.get(EventInventory, event_id)
+    stats = db.session.get(EventStats, event_id)
+    return {
+        'status': db.session.get(Payment, payment_id).status,
+        'tickets': Ticket.query.filter_by(payment_id=payment_id).count(),
+        'sold': inventory.sold,
+        'reserved': inventory.reserved,
+        'stats_sold': stats.tickets_sold if stats else 0,
+        'claims': ProcessedCallback.query.count(),
+    }
+
+
+def test_retried_callback_is_applied_once(flask_app, make_event, user):
+    event = make_event(capacity=10)
+    event_id = event.id
+    payment_id = _held_payment(event, user, 'ws_CO_retried')
+
+    outcomes = [finalize_payment(_callback('ws_CO_retried')) for _ in range(3)]
+
+    assert outcomes == ['paid', 'duplicate', 'duplicate']
+    assert _state(event_id, payment_id) == {'status': 'PAID', 'tickets': 2, 'sold': 2, 'reserved': 0, 'stats_sold': 2, 'claims': 1}
+
+
+def test_concurrent_callbacks_allocate_and_count_once(flask_app, make_event, user):
+    event = make_event(capacity=10)
+    event_id = event.id
+    payment_id = _held_payment(event, user, 'ws_CO_concurrent')
+
+    outcomes = _deliver_concurrently(flask_app, finalize_payment, _callback('ws_CO_concurrent'))
+
+    assert sorted(outcomes) == ['duplicate'] * (RETRIES - 1) + ['paid']
+    assert _state(event_id, payment_id) == {'status': 'PAID', 'tickets': 2, 'sold': 2, 'reserved': 0, 'stats_sold': 2, 'claims': 1}
+
+
+def test_concurrent_callbacks_without_a_hold_sell_from_stock_once(flask_app, make_event, user):
+    event = make_event(capacity=10)
+    event_id = event.id
+    payment = Payment(
+        user_id=user.id, event_id=event_id, quantity=3, amount=3000, phone_number='254700000000',
+        checkout_request_id='ws_CO_no_hold', status='PENDING'
+    )
+    db.session.add(payment)
+    db.session.commit()
+    payment_id = payment.id
+
+    outcomes = _deliver_concurrently(flask_app, finalize_payment, _callback('ws_CO_no_hold'))
+
+    assert outcomes.count('paid') == 1
+    assert _state(event_id, payment_id) == {'status': 'PAID', 'tickets': 3, 'sold': 3, 'reserved': 0, 'stats_sold': 3, 'claims': 1}
+
+
+def test_concurrent_failure_callbacks_release_the_hold_once(flask_app, make_event, user):
+    event = make_event(capacity=10)
+    event_id = event.id
+    other_hold = reserve_tickets(event_id, user.id, 1).id
+    payment_id = _held_payment(event, user, 'ws_CO_cancelled')
+
+    outcomes = _deliver_concurrently(flask_app, finalize_payment, _callback('ws_CO_cancelled', result_code=1032))
+
+    assert outcomes.count('failed') == 1
+    assert _state(event_id, payment_id) == {'status': 'FAILED', 'tickets': 0, 'sold': 0, 'reserved': 1, 'stats_sold': 0, 'claims': 1}
+    assert db.session.get(TicketReservation, other_hold).status == 'HELD'
+
+
+def test_concurrent_stall_callbacks_confirm_the_booking_once(flask_app, make_event, user):
+    event = make_event()
+    stall_type = StallType(name='Food', price=5000)
+    payment = StallPayment(amount=5000, phone_number='254700000000', status='AWAITING_CONFIRMATION', checkout_request_id='ws_CO_stall')
+    db.session.add_all([stall_type, payment])
+    db.session.flush()
+    booking = StallBooking(vendor_id=user.id, event_id=event.id, stall_type_id=stall_type.id, payment_id=payment.id, business_name='Vendor')
+    db.session.add(booking)
+    db.session.commit()
+    payment_id, booking_id = payment.id, booking.id
+
+    outcomes = _deliver_concurrently(flask_app, finalize_stall_payment, _callback('ws_CO_stall'))
+
+    db.session.expire_all()
+    assert outcomes.count('paid') == 1 and outcomes.count('duplicate') == RETRIES - 1
+    assert db.session.get(StallPayment, payment_id).status == 'PAID'
+    assert db.session.get(StallBooking, booking_id).status == 'CONFIRMED'
+    assert ProcessedCallback.query.count() == 1
@@ -0,0 +1,92 @@
+from app import db
+from app.models.payment import Payment
+from app.models.stall_booking import StallType, StallPayment, StallBooking
+from app.models.ticket_inventory import EventInventory, TicketReservation
+from app.utils.payment_reconciler import reconcile_pending_payments
+from app.utils.ticket_inventory import reserve_tickets, attach_checkout
+from tests.conftest import datetime_in
+
+
+class FakeDaraja:
+    """Answers STK Query from a CheckoutRequestID -> result code map; missing ids are still processing."""
+
+    def __init__(self, results):
+        self.results = results
+        self.queried = []
+
+    def stk_query(self, checkout_request_id):
+        self.queried.append(checkout_request_id)
+        if checkout_request_id not in self.results:
+            return {'success': False, 'pending': True, 'message': 'The transaction is being processed'}
+        return {'success': True, 'result_code': self.results[checkout_request_id], 'result_desc': 'Done'}
+
+
+def _ticket_payment(event, user, checkout_request_id=None, age_minutes=10, quantity=2):
+    reservation = reserve_tickets(event.id, user.id, quantity)
+    payment = Payment(
+        user_id=user.id, event_id=event.id, quantity=quantity, amount=2000, phone_number='254700000000',
+        checkout_request_id=checkout_request_id, status='PENDING'
+    )
+    db.session.add(payment)
+    if checkout_request_id:
+        attach_checkout(reservation, checkout_request_id)
+    reservation.created_at = payment.created_at = datetime_in(minutes=-age_minutes)
+    db.session.commit()
+    return payment.id, reservation.id
+
+
+def _stall_booking(event, user, checkout_request_id):
+    stall_type = StallType(name=f"Stall {checkout_request_id}", price=5000)
+    payment = StallPayment(
+        amount=5000, phone_number='254700000000', status='AWAITING_CONFIRMATION',
+        checkout_request_id=checkout_request_id, created_at=datetime_in(minutes=-10)
+    )
+    db.session.add_all([stall_type, payment])
+    db.session.flush()
+    booking = StallBooking(
+        vendor_id=user.id, event_id=event.id, stall_type_id=stall_type.id, payment_id=payment.id, business_name='Vendor'
+    )
+    db.session.add(booking)
+    db.session.commit()
+    return payment.id, booking.id
+
+
+def test_never_sent_payments_fail_and_release_their_tickets(flask_app, make_event, user):
+    event = make_event(capacity=10)
+    stale_payment_id, stale_reservation_id = _ticket_payment(event, user)
+    fresh_payment_id, fresh_reservation_id = _ticket_payment(event, user, age_minutes=0) # STK Push may still be in flight
+
+    report = reconcile_pending_payments(api=FakeDaraja({}))
+
+    db.session.expire_all()
+    assert report['failed'] == 1
+    assert db.session.get(Payment, stale_payment_id).status == 'FAILED'
+    assert db.session.get(TicketReservation, stale_reservation_id).status == 'RELEASED'
+    assert db.session.get(Payment, fresh_payment_id).status == 'PENDING'
+    assert db.session.get(TicketReservation, fresh_reservation_id).status == 'HELD'
+    assert db.session.get(EventInventory, event.id).reserved == 2
+
+
+def test_query_results_finalize_ticket_and_stall_payments(flask_app, make_event, user):
+    event = make_event(capacity=10)
+    paid_id, _ = _ticket_payment(event, user, 'ws_CO_paid')
+    cancelled_id, _ = _ticket_payment(event, user, 'ws_CO_cancelled')
+    processing_id, _ = _ticket_payment(event, user, 'ws_CO_processing')
+    stall_payment_id, booking_id = _stall_booking(event, user, 'ws_CO_stall')
+    api = FakeDaraja({'ws_CO_paid': 0, 'ws_CO_cancelled': 1032, 'ws_CO_stall': 0})
+
+    report = reconcile_pending_payments(api=api)
+
+    db.session.expire_all()
+    assert (report['paid'], report['failed'], report['pending']) == (2, 1, 1)
+    assert db.session.get(Payment, paid_id).status == 'PAID'
+    assert db.session.get(Payment, cancelled_id).status == 'FAILED'
+    assert db.session.get(Payment, processing_id).status == 'PENDING'
+    assert db.session.get(StallPayment, stall_payment_id).status == 'PAID'
+    assert db.session.get(StallBooking, booking_id).status == 'CONFIRMED'
+    assert db.session.get(EventInventory, event.id).sold == 2
+
+    # Settled payments are not queried again
+    second = FakeDaraja({})
+    reconcile_pending_payments(api=second)
+    assert second.queried == ['ws_CO_processing']
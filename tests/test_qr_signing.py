@@ -0,0 +1,28 @@
+import pytest
+
+from app.utils.qr_signing import _load_keys, sign_ticket_qr, verify_ticket_qr, InvalidQRCode
+
+TICKET_UUID = '8c3f1e7a-4f1e-4c3e-9d8e-1a2b3c4d5e6f'
+
+
+def test_active_key_must_be_configured():
+    with pytest.raises(RuntimeError, match="'k3' is not one of the QR_SIGNING_KEYS ids"):
+        _load_keys('k1:old-secret,k2:new-secret', 'k3')
+
+
+def test_malformed_key_list_does_not_fall_back():
+    with pytest.raises(RuntimeError, match='entry 2'):
+        _load_keys('k1:secret,just-a-secret', 'k1')
+
+
+def test_unconfigured_keys_fall_back_to_derived_key():
+    keys = _load_keys('', 'k1')
+    assert list(keys) == ['k1'] and len(keys['k1']) == 32
+
+
+def test_signed_code_round_trip():
+    qr_data = sign_ticket_qr(TICKET_UUID, event_id=7)
+
+    assert verify_ticket_qr(qr_data, event_id=7) == TICKET_UUID
+    with pytest.raises(InvalidQRCode, match='different event'):
+        verify_ticket_qr(qr_data, event_id=8)
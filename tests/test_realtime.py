@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from app import db
+from app.models.event_stats import EventStats
+from app.utils import realtime
+from app.utils.realtime import LocalChangeBus, SqliteChangeBus, CounterBroadcaster, event_room
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    messages = []
+    monkeypatch.setattr(realtime.socketio, 'emit', lambda name, payload, to=None: messages.append((name, payload, to)))
+    return messages
+
+
+def _row_count(bus):
+    return bus._conn().execute('SELECT count(*) FROM event_changes').fetchone()[0]
+
+
+def test_a_burst_of_changes_is_broadcast_once_per_event(make_event, emitted):
+    busy, quiet = make_event().id, make_event(name='Quiet Night').id
+    db.session.add(EventStats(event_id=busy, tickets_sold=40, checked_in_count=12, revenue=40000))
+    db.session.commit()
+    broadcaster = CounterBroadcaster(LocalChangeBus(), interval_seconds=0.5)
+
+    for _ in range(1000):
+        broadcaster.notify(busy)
+    broadcaster.notify(quiet)
+
+    assert broadcaster.broadcast(broadcaster.bus.drain()) == 2
+    assert sorted(emitted, key=lambda message: message[2]) == [
+        ('event_counters', {'event_id': busy, 'tickets_sold': 40, 'checked_in_count': 12, 'revenue': '40000.00'}, event_room(busy)),
+        ('event_counters', {'event_id': quiet, 'tickets_sold': 0, 'checked_in_count': 0, 'revenue': '0.00'}, event_room(quiet)),
+    ]
+    assert broadcaster.broadcast(broadcaster.bus.drain()) == 0 # Nothing changed since
+    assert broadcaster.broadcasts_sent == 2
+
+
+def test_sqlite_bus_delivers_changes_from_other_workers_coalesced(tmp_path):
+    path = str(tmp_path / 'realtime.db')
+    publisher, subscriber = SqliteChangeBus(path), SqliteChangeBus(path)
+    publisher.publish(1)
+    assert subscriber.drain() == set() # Starts from the current end of the log
+
+    for event_id in [1, 2, 1, 1, 2, 3]:
+        publisher.publish(event_id)
+
+    assert subscriber.drain() == {1, 2, 3}
+    assert subscriber.drain() == set()
+
+
+def test_publishing_prunes_old_changes_without_any_subscriber(tmp_path):
+    bus = SqliteChangeBus(str(tmp_path / 'realtime.db'))
+    stale = time.time() - bus.RETENTION_SECONDS - 1
+    bus._conn().executemany('INSERT INTO event_changes (event_id, created_at) VALUES (?, ?)', [(1, stale)] * 500)
+
+    bus.publish(2)
+
+    assert _row_count(bus) == 1
+
+    # Pruning is throttled: within the interval, publishes only append
+    bus._conn().execute('INSERT INTO event_changes (event_id, created_at) VALUES (?, ?)', (1, stale))
+    bus.publish(2)
+    assert _row_count(bus) == 3
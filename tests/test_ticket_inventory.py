@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models.ticket_inventory import EventInventory, TicketReservation
+from app.utils.ticket_inventory import (
+    reserve_tickets, allocate_tickets, release_expired_reservations, SoldOutError
+)
+
+BUYERS = 300
+WORKERS = 32
+
+
+def _run_in_parallel(flask_app, fn, count):
+    """Calls fn(i) for i in range(count) on a thread pool, each call in its own app context and session."""
+    def attempt(i):
+        with flask_app.app_context():
+            try:
+                return fn(i)
+            except SoldOutError:
+                db.session.rollback()
+                return 0
+            finally:
+                db.session.remove()
+
+    db.session.close() # The test's own transaction would otherwise hold the SQLite write lock
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        return list(pool.map(attempt, range(count)))
+
+
+def _inventory(event_id):
+    db.session.expire_all()
+    return db.session.get(EventInventory, event_id)
+
+
+def test_parallel_buyers_never_oversell(flask_app, make_event, user):
+    event = make_event(capacity=100)
+    event_id, user_id = event.id, user.id
+
+    held = _run_in_parallel(flask_app, lambda i: reserve_tickets(event_id, user_id, 1).quantity, BUYERS)
+
+    inventory = _inventory(event_id)
+    assert sum(held) == 100
+    assert inventory.reserved == 100 and inventory.sold == 0
+    assert TicketReservation.query.filter_by(event_id=event_id, status='HELD').count() == 100
+
+
+def test_holds_and_direct_sales_share_capacity(flask_app, make_event, user):
+    event = make_event(capacity=150)
+    event_id, user_id = event.id, user.id
+
+    def buy(i):
+        quantity = i % 3 + 1
+        if i % 2:
+            return reserve_tickets(event_id, user_id, quantity).quantity
+        allocate_tickets(event_id, quantity) # Complimentary tickets and callbacks without a hold
+        db.session.commit()
+        return quantity
+
+    taken = _run_in_parallel(flask_app, buy, BUYERS)
+
+    inventory = _inventory(event_id)
+    held = sum(r.quantity for r in TicketReservation.query.filter_by(event_id=event_id, status='HELD'))
+    assert inventory.sold + inventory.reserved == sum(taken) <= 150
+    assert inventory.reserved == held
+    assert sum(taken) > 150 - 3 # Only a remainder smaller than the largest request may stay unsold
+
+
+def test_expired_holds_return_to_stock(flask_app, make_event, user):
+    event = make_event(capacity=2)
+    reserve_tickets(event.id, user.id, 2, ttl_seconds=-1)
+
+    released = release_expired_reservations(event.id)
+    db.session.commit()
+
+    assert released == 2
+    assert _inventory(event.id).reserved == 0
+    assert reserve_tickets(event.id, user.id, 2).quantity == 2
@@ -0,0 +1,106 @@
+import os
+import struct
+
+import pytest
+from flask import Flask
+
+from app.utils import ticket_render
+from app.utils.ticket_render import RenderCache, render_ticket, render_response, QR_BORDER, PNG_MODULE_PIXELS
+
+TICKET_UUID = '6f1c2b1e-8d4a-4c5e-9a57-0b7e4d9f3a21'
+QR_CONTENT = 'v1.k1.bXktdGlja2V0.c2lnbmF0dXJl'
+DETAILS = [('Event', 'Nairobi Jazz Night'), ('Date', 'Sat 14 Mar 2026, 18:00'), ('Ticket', TICKET_UUID)]
+
+pytest.importorskip('qrcode')
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path / 'renders'), max_bytes=1024 * 1024)
+    monkeypatch.setattr(ticket_render, 'render_cache', cache)
+    return cache
+
+
+def test_renders_each_format(cache):
+    png, _ = render_ticket(TICKET_UUID, QR_CONTENT, 'png')
+    svg, _ = render_ticket(TICKET_UUID, QR_CONTENT, 'svg')
+    pdf, _ = render_ticket(TICKET_UUID, QR_CONTENT, 'pdf', DETAILS)
+
+    modules = len(ticket_render._qr_matrix(QR_CONTENT))
+    assert png.startswith(b'\x89PNG\r\n\x1a\n')
+    assert struct.unpack('>II', png[16:24]) == (modules * PNG_MODULE_PIXELS,) * 2
+    assert modules > 2 * QR_BORDER
+    assert svg.startswith(b'<svg') and f'viewBox="0 0 {modules} {modules}"'.encode() in svg
+    assert pdf.startswith(b'%PDF-1.4') and pdf.rstrip().endswith(b'%%EOF')
+    assert b'(Nairobi Jazz Night) Tj' in pdf
+
+
+def test_second_render_is_served_from_the_cache(cache, monkeypatch):
+    data, content_hash = render_ticket(TICKET_UUID, QR_CONTENT, 'png')
+    assert os.path.exists(cache.path_for(TICKET_UUID, content_hash, 'png'))
+
+    def no_render(content):
+        raise AssertionError('rendered again')
+    monkeypatch.setattr(ticket_render, '_qr_matrix', no_render)
+
+    assert render_ticket(TICKET_UUID, QR_CONTENT, 'png') == (data, content_hash)
+
+
+def test_content_hash_follows_what_is_drawn(cache):
+    _, png_hash = render_ticket(TICKET_UUID, QR_CONTENT, 'png')
+    _, resigned_hash = render_ticket(TICKET_UUID, QR_CONTENT + 'x', 'png')
+    _, pdf_hash = render_ticket(TICKET_UUID, QR_CONTENT, 'pdf', DETAILS)
+    _, moved_pdf_hash = render_ticket(TICKET_UUID, QR_CONTENT, 'pdf', DETAILS + [('Location', 'Mombasa')])
+
+    assert len({png_hash, resigned_hash, pdf_hash, moved_pdf_hash}) == 4
+    assert render_ticket(TICKET_UUID, QR_CONTENT, 'png')[1] == png_hash
+
+
+def test_cache_evicts_least_recently_used_files(tmp_path):
+    cache = RenderCache(str(tmp_path / 'renders'), max_bytes=250)
+    paths = [cache.path_for(TICKET_UUID, f"hash{i}", 'png') for i in range(3)]
+    for index, path in enumerate(paths):
+        cache.put(path, b'x' * 100)
+        os.utime(path, (index, index))
+
+    cache.put(cache.path_for(TICKET_UUID, 'hash3', 'png'), b'x' * 100)
+
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+
+
+@pytest.fixture
+def request_app():
+    return Flask(__name__)
+
+
+def test_response_carries_validators_that_force_revalidation(request_app):
+    with request_app.test_request_context():
+        response = render_response(b'%PDF-1.4', 'abc123', 'pdf', f"ticket-{TICKET_UUID}.pdf")
+
+    assert response.status_code == 200
+    assert response.data == b'%PDF-1.4'
+    assert response.headers['Content-Type'] == 'application/pdf'
+    assert response.headers['ETag'] == '"abc123"'
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert 'immutable' not in response.headers['Cache-Control']
+    assert response.headers['Content-Disposition'] == f'inline; filename="ticket-{TICKET_UUID}.pdf"'
+
+
+def test_matching_etag_gets_a_bodyless_304_with_the_same_headers(request_app):
+    with request_app.test_request_context(headers={'If-None-Match': '"other", "abc123"'}):
+        response = render_response(b'png bytes', 'abc123', 'png')
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == '"abc123"'
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_stale_etag_gets_the_new_rendering(request_app):
+    with request_app.test_request_context(headers={'If-None-Match': '"old-hash"'}):
+        response = render_response(b'<svg/>', 'new-hash', 'svg')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'image/svg+xml'
+    assert response.headers['ETag'] == '"new-hash"'
+    assert 'Content-Disposition' not in response.headers
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event as sa_event
+
+from app import db
+from app.models.ticket_attendance import Ticket, Attendance
+from app.utils.ticket_wallet import wallet_query, wallet_version
+from tests.conftest import datetime_in
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith(('BEGIN', 'SAVEPOINT', 'RELEASE')):
+            statements.append(statement)
+
+    engine = db.engine
+    sa_event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', record)
+
+
+def _issue(user, events, per_event, checked_in_every=3):
+    count = 0
+    for event in events:
+        for _ in range(per_event):
+            ticket = Ticket(user_id=user.id, event_id=event.id, status='PAID')
+            if count % checked_in_every == 0:
+                ticket.attendance = Attendance(is_checked_in=True, checked_in_at=datetime_in(minutes=-count))
+            db.session.add(ticket)
+            count += 1
+    db.session.commit()
+
+
+def _load_wallet_page(user_id, upcoming=False):
+    """Loads a page and touches everything the ticket schema dumps."""
+    db.session.expunge_all() # Nothing may come from the identity map
+    with count_queries() as statements:
+        page = wallet_query(user_id, upcoming=upcoming).paginate(page=1, per_page=50, error_out=False)
+        for ticket in page.items:
+            ticket.event.name, ticket.event.date_time, ticket.event.location
+            ticket.user.username, ticket.user.email
+            ticket.attendance and ticket.attendance.is_checked_in
+            ticket.encoded_qr_data
+    return page, len(statements)
+
+
+def test_wallet_query_count_does_not_grow_with_tickets(flask_app, make_event, user):
+    _issue(user, [make_event()], per_event=2)
+    small_page, small_count = _load_wallet_page(user.id)
+
+    _issue(user, [make_event(name=f"Event {i}") for i in range(12)], per_event=3)
+    large_page, large_count = _load_wallet_page(user.id)
+
+    assert len(small_page.items) == 2 and len(large_page.items) == 38
+    assert small_count == large_count == 4 # count, page (with attendance), events, users
+
+
+def test_upcoming_wallet_skips_started_events(flask_app, make_event, user):
+    past, future = make_event(date_time=datetime_in(days=-1)), make_event(date_time=datetime_in(days=3))
+    future_id = future.id
+    _issue(user, [past, future], per_event=2)
+    _, all_count = _load_wallet_page(user.id)
+
+    page, upcoming_count = _load_wallet_page(user.id, upcoming=True)
+
+    assert {ticket.event_id for ticket in page.items} == {future_id}
+    assert upcoming_count == all_count
+
+
+def test_wallet_version_follows_event_edits(flask_app, make_event, user):
+    event = make_event()
+    _issue(user, [event], per_event=1)
+    before = wallet_version(user.id)
+
+    event.location = 'Mombasa'
+    event.updated_at = datetime_in(seconds=1)
+    db.session.commit()
+
+    assert wallet_version(user.id) != before